@@ -1,32 +1,24 @@
 import os
-import pickle
-import numpy as np
-import faiss
-import google.generativeai as genai
-from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path # <<< NEW IMPORT
 
-# ==========================================
-# Simple Text Splitter (No change needed)
-# ==========================================
-class SimpleTextSplitter:
-    """Splits text into overlapping chunks for embedding & retrieval"""
-    def __init__(self, chunk_size=500, chunk_overlap=50):
-        self.chunk_size = chunk_size
-        self.chunk_overlap = chunk_overlap
-
-    def split_text(self, text):
-        chunks = []
-        start = 0
-        while start < len(text):
-            end = min(start + self.chunk_size, len(text))
-            chunk = text[start:end].strip()
-            if chunk:
-                chunks.append(chunk)
-            start += self.chunk_size - self.chunk_overlap
-        return chunks
-
+from app import config
+from app.response_cache import ResponseCache, normalize_query
+from app.single_flight import SingleFlight
+from app.embedding_batcher import RetrievalBatcher, encode_and_search
+from app.embedding_backends import LazyEmbeddingModel, embedding_model_id, load_embedding_model
+from app.context_assembly import ContextAssembler
+from app.knowledge_base import ScopedSearcher, load_or_build_knowledge_base, store_fingerprint
+from app.lexical_index import BM25Index, reciprocal_rank_fusion
+from app.llm import CallPolicy, PromptLLM, make_context_cache
+from app.llm_providers import make_provider
+from app.metrics import stage
+from app.prompts import PromptPrefixCache, prompt_suffix
+from app.retrieval_service import RetrievalClient
+from app.schemas import ChatMode
 
 # ==========================================
 # Main Coach Carter AI Engine
@@ -34,159 +26,500 @@ class SimpleTextSplitter:
 class CoachCarterAI:
     """
     Hybrid AI Brain:
-    - SentenceTransformer + FAISS for embeddings (local)
-    - Google Gemini for response generation (cloud)
+    - SentenceTransformer (torch or ONNX int8) + FAISS for embeddings (local),
+      fused with a BM25 keyword index (COACH_RETRIEVAL_MODE, see lexical_index.py)
+    - Google Gemini for response generation (cloud), or the local stub
+      provider (COACH_LLM_PROVIDER, see llm_providers.py)
     """
 
-    def __init__(self, rebuild_embeddings=False):
+    def __init__(self, rebuild_embeddings=False, progress=None, *, llm=None, quick_llm=None,
+                 embedding_model=None, data_dir=None):
+        """
+        progress(stage) is called as each loading stage starts (see EngineLoader).
+        llm, quick_llm and embedding_model replace the configured providers and
+        local embedding model, data_dir replaces backend/data (tests inject
+        fakes and a tmp dir this way).
+        """
+        progress = progress or (lambda stage: None)
         print("🧠 Initializing Coach Carter Hybrid AI...")
 
+        # Heavy imports (the Gemini SDK in the provider, torch / onnxruntime
+        # in load_embedding_model) are deferred so importing app.main stays fast
+        progress("imports")
+
         # --- PATH DEFINITION (New Absolute Path Logic) ---
         # Get the absolute path to the directory containing this script (backend/app)
         self.APP_DIR = Path(__file__).parent 
         # Get the absolute path to the data folder (backend/data)
-        self.DATA_DIR = self.APP_DIR.parent / "data" 
+        self.DATA_DIR = Path(data_dir) if data_dir else self.APP_DIR.parent / "data"
         # Create data directory if it doesn't exist
         os.makedirs(self.DATA_DIR, exist_ok=True) 
         # --- END PATH DEFINITION ---
 
-        # Step 1: Load API key
-        load_dotenv()
-        self.api_key = os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
-            raise ValueError("❌ GEMINI_API_KEY not found in .env")
-
-        genai.configure(api_key=self.api_key)
-        print(f"✅ Google API key loaded: {self.api_key[:10]}...")
+        # Step 1: LLM provider (Gemini checks GEMINI_API_KEY here, before the slow stages)
+        self.llm = llm if llm is not None else make_provider()
 
         # Step 2: Initialize models
-        print("📚 Loading local embedding model (SentenceTransformer)...")
-        self.embedding_model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+        progress("embedding_model")
+        self.sidecar = None
+        if config.RETRIEVAL_SIDECAR:
+            # Queries are embedded + searched by the shared sidecar process;
+            # the local model only loads if this worker has to retrieve itself
+            self.embedding_model = embedding_model if embedding_model is not None else LazyEmbeddingModel()
+        elif embedding_model is not None:
+            self.embedding_model = embedding_model
+        else:
+            print(f"📚 Loading local embedding model ({config.EMBEDDING_BACKEND})...")
+            self.embedding_model = load_embedding_model()
+
+        progress("llm_client")
+        print(f"🤖 Using {self.llm.name} model {self.llm.model_name} (for responses)...")
+        # Static prompt prefix (system instruction + profile) rendered once per
+        # profile version; calls get deadlines, retries and hedging (see llm.py)
+        self.prompt_prefixes = PromptPrefixCache(config.PROMPT_PREFIX_CACHE_SIZE)
+        self.generator = PromptLLM(self.llm, make_context_cache(),
+                                   max_output_tokens=config.LLM_MAX_OUTPUT_TOKENS)
+        # Quick tips: capped output and a shorter deadline, optionally on a
+        # lighter model; their own CallPolicy keeps hedge delays per tier
+        if quick_llm is None:
+            quick_llm = make_provider(model_name=config.QUICK_TIP_MODEL) if config.QUICK_TIP_MODEL else self.llm
+        self.quick_generator = PromptLLM(
+            quick_llm, make_context_cache(),
+            policy=CallPolicy(timeout_s=config.QUICK_TIP_TIMEOUT_SECONDS),
+            max_output_tokens=config.QUICK_TIP_MAX_OUTPUT_TOKENS
+        )
 
-        print("🤖 Loading Gemini model (for responses)...")
-        self.llm = genai.GenerativeModel("gemini-2.0-flash")
+        # Async path: embedding + FAISS run on a bounded pool off the event loop,
+        # and at most MAX_CONCURRENT_CHATS generations are in flight at once.
+        self._retrieval_executor = ThreadPoolExecutor(
+            max_workers=config.RETRIEVAL_WORKERS,
+            thread_name_prefix="coach-retrieval"
+        )
+        self._generation_slots = asyncio.Semaphore(config.MAX_CONCURRENT_CHATS)
+
+        # Identical chats in flight at once share one generation (see single_flight.py)
+        self.in_flight = SingleFlight()
+
+        # Answers for repeated / near-identical questions (see response_cache.py)
+        self.response_cache = ResponseCache(
+            max_entries=config.RESPONSE_CACHE_SIZE,
+            ttl_seconds=config.RESPONSE_CACHE_TTL_SECONDS,
+            similarity_threshold=config.RESPONSE_CACHE_SIMILARITY,
+            persist_path=config.RESPONSE_CACHE_PATH or None,
+            mode_thresholds={ChatMode.QUICK_TIP.value: config.QUICK_TIP_CACHE_SIMILARITY}
+            if config.QUICK_TIP_CACHE_SIMILARITY else None
+        )
 
         # Step 3: Load or build knowledge base
+        progress("knowledge_base")
         print("📖 Loading expert knowledge base...")
-        # Pass the force_new flag to the loader
+        # Pass the force_new flag to the loader (also builds self.lexical_index)
+        self.lexical_index = None
         self.vector_store = self._load_or_build_knowledge_base(force_new=rebuild_embeddings) 
+        # Searches only the athlete's sport / injury chunks when given a scope
+        self.searcher = ScopedSearcher(self.vector_store) if self.vector_store else None
+        if config.RETRIEVAL_SIDECAR:
+            # After the store loads: the sidecar must serve the same chunks
+            self.sidecar = self._connect_sidecar()
+        # Deduplicated, diverse context packed under a per-mode token budget
+        self.context_assembler = None
+        if self.vector_store and config.CONTEXT_ASSEMBLY:
+            self.context_assembler = ContextAssembler(
+                self.vector_store,
+                budgets={"quick-tip": config.CONTEXT_BUDGET_QUICK_TIP, "in-depth": config.CONTEXT_BUDGET_IN_DEPTH},
+                mmr_lambda=config.CONTEXT_MMR_LAMBDA,
+                dup_threshold=config.CONTEXT_DUP_THRESHOLD
+            )
+
+        # Concurrent queries share one encode() + index.search call
+        self.retrieval_batcher = None
+        if config.EMBED_BATCH_MAX_SIZE > 1:
+            self.retrieval_batcher = RetrievalBatcher(
+                retrieve=self._retrieve,
+                max_batch_size=config.EMBED_BATCH_MAX_SIZE,
+                max_wait_ms=config.EMBED_BATCH_MAX_WAIT_MS
+            )
         print("✅ Coach Carter is ready!\n")
 
     # ==========================================
-    # Knowledge Base Builder / Loader (UPDATED)
+    # Knowledge Base Builder / Loader
     # ==========================================
     def _load_or_build_knowledge_base(self, force_new=False):
         """
-        Loads saved FAISS embeddings if they exist,
-        else rebuilds them and saves for reuse.
+        Loads the FAISS store for expert_knowledge.txt, re-embedding only
+        new or changed chunks (see knowledge_base.py).
         Uses absolute paths defined in __init__.
         """
-        # --- ABSOLUTE PATHS ---
-        faiss_path = self.DATA_DIR / "faiss_index.bin"
-        meta_path = self.DATA_DIR / "vector_meta.pkl"
-        text_path = self.DATA_DIR / "expert_knowledge.txt"
-        # --- END ABSOLUTE PATHS ---
-
-        # --- Load from cache ---
-        if not force_new and faiss_path.exists() and meta_path.exists():
-            print("   ✅ Found saved FAISS embeddings. Loading...")
-            index = faiss.read_index(str(faiss_path)) # FAISS needs a string path
-            with open(meta_path, "rb") as f:
-                meta = pickle.load(f)
-            print("   ✅ Loaded embeddings from cache")
-            return {
-                "index": index,
-                "chunks": meta["chunks"],
-                "embeddings": meta["embeddings"]
-            }
-
-        # --- Rebuild from text ---
-        if not text_path.exists():
-            print("⚠️  expert_knowledge.txt not found at absolute path! Using empty base.")
-            return None
+        store = load_or_build_knowledge_base(
+            self.DATA_DIR, self.embedding_model, embedding_model_id(), force_new=force_new,
+            index_spec=config.KB_INDEX, nprobe=config.KB_NPROBE, ef_search=config.KB_EF_SEARCH
+        )
+        # BM25 over the same chunks, kept in memory (rebuilt in ms from the store)
+        if store and config.RETRIEVAL_MODE in ("hybrid", "fast"):
+            self.lexical_index = BM25Index.from_store(store)
+            print(f"   🔤 BM25 index ready ({len(self.lexical_index.idf)} terms, {config.RETRIEVAL_MODE} retrieval)")
+        return store
+
+    def _connect_sidecar(self):
+        """RetrievalClient for COACH_RETRIEVAL_SIDECAR, falling back to in-process retrieval"""
+        sidecar = RetrievalClient(
+            config.RETRIEVAL_SIDECAR,
+            pool_size=config.RETRIEVAL_SIDECAR_POOL_SIZE,
+            timeout=config.RETRIEVAL_SIDECAR_TIMEOUT_SECONDS,
+            health_interval=config.RETRIEVAL_SIDECAR_HEALTH_SECONDS,
+            fallback=self._local_retrieve,
+            expected_model=embedding_model_id(),
+            expected_store=store_fingerprint(self.vector_store)
+        )
+        if sidecar.check_health():
+            print(f"🔌 Using retrieval sidecar at {config.RETRIEVAL_SIDECAR} (no local embedding model)")
+        else:
+            print(f"⚠️  Retrieval sidecar at {config.RETRIEVAL_SIDECAR} not reachable, retrieving in-process")
+        sidecar.start_health_checks()
+        return sidecar
 
-        with open(text_path, "r", encoding="utf-8") as f:
-            text = f.read()
+    def warmup(self):
+        """Runs one dummy query through embedding + search so the first user doesn't pay for it"""
+        self._retrieve(["warmup: beginner strength program"], [3], [None])
 
-        splitter = SimpleTextSplitter(chunk_size=500, chunk_overlap=50)
-        chunks = splitter.split_text(text)
-        print(f"   ✅ Split into {len(chunks)} chunks")
+    # ==========================================
+    # Retrieval and prompt building
+    # ==========================================
+    def _candidates(self, top_k=None, mode="in-depth"):
+        """Chunks retrieved per query: a wider set for the assembler to choose from, else the mode's top-k"""
+        if top_k:
+            return top_k
+        if self.context_assembler:
+            return config.CONTEXT_CANDIDATES
+        if mode == ChatMode.QUICK_TIP.value:
+            return config.RETRIEVAL_TOP_K_QUICK_TIP
+        return config.RETRIEVAL_TOP_K_IN_DEPTH
+
+    def _embed_and_search(self, query, top_k=None, scope=None, mode="in-depth"):
+        """
+        Returns (query_emb, top_k chunk ids), via the micro-batcher when enabled.
+        scope (knowledge_base.retrieval_scope) limits the search to the
+        athlete's sport and injuries. query_emb is None when a confident
+        BM25 result made the embedding unnecessary (fast mode).
+        """
+        top_k = self._candidates(top_k, mode)
+        lexical = self._lexical_search(query, top_k, scope)
+        if self._lexical_is_enough(lexical):
+            return None, lexical.ids
+
+        if self.retrieval_batcher:
+            query_emb, indices = self.retrieval_batcher.retrieve(query, top_k, scope)
+            return query_emb, self._fuse(indices, lexical, top_k)
+
+        query_emb, indices = self._retrieve([query], [top_k], [scope])
+        return query_emb, self._fuse(indices[0], lexical, top_k)
+
+    def _retrieve(self, queries, top_ks, scopes):
+        """(query embeddings, per-query chunk ids): on the retrieval sidecar when configured"""
+        if self.sidecar is not None:
+            return self.sidecar.retrieve(queries, top_ks, scopes)
+        return self._local_retrieve(queries, top_ks, scopes)
+
+    def _local_retrieve(self, queries, top_ks, scopes):
+        return encode_and_search(
+            lambda texts: self.embedding_model.encode(texts, convert_to_numpy=True),
+            self.searcher.search if self.searcher else None,
+            queries, top_ks, scopes
+        )
 
-        embeddings = self.embedding_model.encode(chunks, convert_to_numpy=True, show_progress_bar=True)
+    def _lexical_search(self, query, top_k, scope):
+        """BM25 hits for hybrid / fast retrieval, None in vector mode"""
+        if self.lexical_index is None or config.RETRIEVAL_MODE == "vector":
+            return None
+        with stage("bm25_search"):
+            return self.lexical_index.search(query, top_k, self.searcher.allowed_ids(scope))
 
-        # Build FAISS index
-        dim = embeddings.shape[1]
-        index = faiss.IndexFlatL2(dim)
-        index.add(embeddings)
-        print("   ✅ FAISS vector database created")
+    def _lexical_is_enough(self, lexical):
+        return (config.RETRIEVAL_MODE == "fast" and lexical is not None
+                and lexical.confident(config.LEXICAL_MIN_COVERAGE, config.LEXICAL_MIN_SCORE))
 
-        # Save for reuse
-        faiss.write_index(index, str(faiss_path)) # FAISS needs a string path
-        with open(meta_path, "wb") as f:
-            pickle.dump({"chunks": chunks, "embeddings": embeddings}, f)
-        print("   💾 Saved FAISS index and embeddings for future use")
+    def _fuse(self, indices, lexical, top_k):
+        """Vector ranking merged with the BM25 one (reciprocal-rank fusion)"""
+        if lexical is None or indices is None:
+            return indices
+        return reciprocal_rank_fusion([indices, lexical.ids], k=config.RRF_K)[:top_k]
 
-        return {"index": index, "chunks": chunks, "embeddings": embeddings}
+    def _context_from_ids(self, indices, query_emb=None, mode="in-depth"):
+        if not self.vector_store or indices is None:
+            return ""
+        if self.context_assembler is not None:
+            return self.context_assembler.assemble(query_emb[0] if query_emb is not None else None, indices, mode)
+        results = [self.vector_store["chunks"][i] for i in indices if i >= 0]
+        return "\n\n".join(results)
 
-    # ==========================================
-    # Remaining methods are unchanged:
-    # _retrieve_context, _build_prompt, get_ai_response
-    # ==========================================
-    def _retrieve_context(self, query, top_k=3):
-        # ... (unchanged)
+    def _retrieve_context(self, query, top_k=None, scope=None, mode="in-depth"):
         if not self.vector_store:
             return ""
 
-        query_emb = self.embedding_model.encode([query], convert_to_numpy=True)
-        distances, indices = self.vector_store["index"].search(query_emb, top_k)
-        results = [self.vector_store["chunks"][i] for i in indices[0]]
-        return "\n\n".join(results)
+        query_emb, indices = self._embed_and_search(query, top_k, scope, mode)
+        return self._context_from_ids(indices, query_emb, mode)
+
+    def _lookup_or_retrieve(self, user_query, mode, profile_key, top_k=None, scope=None):
+        """
+        Cache-aware retrieval, returns (cached_answer, context, query_emb).
+        Order: exact cache hit -> embed query -> semantic cache hit -> FAISS.
+        profile_key=None means the caller opted out of caching.
+        """
+        if profile_key is None:
+            return None, self._retrieve_context(user_query, top_k, scope, mode), None
+
+        cached = self.response_cache.get(user_query, mode, profile_key)
+        if cached is not None:
+            return cached, "", None
+
+        query_emb, indices = self._embed_and_search(user_query, top_k, scope, mode)
+        return self._semantic_lookup_or_context(user_query, mode, profile_key, query_emb, indices)
+
+    def _semantic_lookup_or_context(self, user_query, mode, profile_key, query_emb, indices):
+        """Second half of _lookup_or_retrieve, once the query is embedded + searched"""
+        vector = query_emb[0] if query_emb is not None else None  # None: lexical fast path
+        cached = self.response_cache.get(user_query, mode, profile_key, vector)
+        if cached is not None:
+            return cached, "", query_emb
+        return None, self._context_from_ids(indices, query_emb, mode), query_emb
+
+    def _remember(self, user_query, mode, profile_key, answer, query_emb):
+        """Stores a fresh answer in the response cache"""
+        if profile_key is None or not answer:
+            return
+        vector = query_emb[0] if query_emb is not None else None
+        self.response_cache.put(user_query, mode, profile_key, answer, vector)
+
+    def _generator(self, mode):
+        """PromptLLM for the mode: the quick-tip tier or the default (in-depth) one"""
+        if mode == ChatMode.QUICK_TIP.value and self.quick_generator is not None:
+            return self.quick_generator
+        return self.generator
 
     def _build_prompt(self, user_query, mode="in-depth", context="", user_profile=None):
-        # ... (unchanged)
-        if mode == "quick":
-            system_instruction = (
-                "You are Coach Carter, a friendly AI fitness coach.\n"
-                "🎯 QUICK TIP MODE: Give concise, actionable advice (2–3 sentences, <150 words)."
-            )
-        else:
-            system_instruction = (
-                "You are Coach Carter, an elite sports coach with 20+ years of experience.\n"
-                "🎯 IN-DEPTH PLAN MODE: Create complete, structured training programs.\n"
-                "Use markdown formatting with sections like:\n"
-                "- Program Overview\n"
-                "- Weekly Breakdown\n"
-                "- Warm-up & Cool-down\n"
-                "- Progression Plan\n"
-                "- Safety Notes"
+        """(cached PromptPrefix, per-request suffix); user_profile is an AthleteProfile or profile text"""
+        return self.prompt_prefixes.get(mode, user_profile), prompt_suffix(user_query, context)
+
+    def get_ai_response(self, user_query, mode="in-depth", user_profile=None, profile_key=None,
+                        scope=None):
+        print(f"\n💬 Processing query: {user_query[:80]}...")
+
+        with stage("retrieval", mode):
+            cached, context, query_emb = self._lookup_or_retrieve(user_query, mode, profile_key, scope=scope)
+        if cached is not None:
+            print("⚡ Served from response cache\n")
+            return cached
+
+        prefix, suffix = self._build_prompt(user_query, mode, context, user_profile)
+
+        with stage("generation", mode):
+            text = self._generator(mode).generate(prefix, suffix)
+        print("✅ Response generated!\n")
+        self._remember(user_query, mode, profile_key, text, query_emb)
+        return text
+
+    # ==========================================
+    # Async pipeline (used by the FastAPI chat endpoint)
+    # ==========================================
+    async def _alookup_or_retrieve(self, user_query, mode, profile_key, top_k=None, scope=None):
+        """
+        Async _lookup_or_retrieve. With batching on, requests await the shared
+        batcher directly (no pool thread is held while the batch fills);
+        otherwise the whole lookup runs on the retrieval pool.
+        """
+        loop = asyncio.get_running_loop()
+        if self.retrieval_batcher is None or profile_key is None:
+            return await loop.run_in_executor(
+                self._retrieval_executor, self._lookup_or_retrieve, user_query, mode, profile_key, top_k, scope
             )
 
-        profile_text = ""
-        if user_profile:
-            profile_text = f"\n\nUSER PROFILE:\n{user_profile}\n"
+        cached = self.response_cache.get(user_query, mode, profile_key)
+        if cached is not None:
+            return cached, "", None
 
-        return (
-            f"{system_instruction}\n\n"
-            f"Relevant Knowledge:\n{context}\n\n"
-            f"User Question: {user_query}\n"
-            f"{profile_text}\n"
-            f"Your Response:"
+        # BM25 is cheap enough (well under a millisecond) to run on the loop
+        top_k = self._candidates(top_k, mode)
+        lexical = self._lexical_search(user_query, top_k, scope)
+        if self._lexical_is_enough(lexical):
+            return self._semantic_lookup_or_context(user_query, mode, profile_key, None, lexical.ids)
+
+        query_emb, indices = await asyncio.wrap_future(
+            self.retrieval_batcher.submit(user_query, top_k, scope)
         )
+        indices = self._fuse(indices, lexical, top_k)
+        return self._semantic_lookup_or_context(user_query, mode, profile_key, query_emb, indices)
 
-    def get_ai_response(self, user_query, mode="in-depth", user_profile=None):
-        # ... (unchanged)
-        print(f"\n💬 Processing query: {user_query[:80]}...")
+    def _flight_key(self, user_query, mode, profile_key):
+        """
+        Single-flight key, or None when the caller opted out of sharing answers.
+        profile_key is profile_fingerprint(): training fields only, so teammates share a flight.
+        """
+        if profile_key is None or not config.COALESCE_CHATS:
+            return None
+        return normalize_query(user_query), mode, profile_key
+
+    async def aget_ai_response(self, user_query, mode="in-depth", user_profile=None, profile_key=None,
+                               scope=None):
+        """Async version of get_ai_response - never blocks the event loop"""
+        key = self._flight_key(user_query, mode, profile_key)
+        if key is None:
+            return await self._aget_ai_response(user_query, mode, user_profile, profile_key, scope)
+        return await self.in_flight.do(
+            key, lambda: self._aget_ai_response(user_query, mode, user_profile, profile_key, scope)
+        )
+
+    async def _aget_ai_response(self, user_query, mode, user_profile, profile_key, scope):
+        print(f"\n💬 Processing query (async): {user_query[:80]}...")
+
+        with stage("retrieval", mode):
+            cached, context, query_emb = await self._alookup_or_retrieve(user_query, mode, profile_key, scope=scope)
+        if cached is not None:
+            print("⚡ Served from response cache\n")
+            return cached
 
-        context = self._retrieve_context(user_query)
-        prompt = self._build_prompt(user_query, mode, context, user_profile)
+        prefix, suffix = self._build_prompt(user_query, mode, context, user_profile)
 
-        response = self.llm.generate_content(prompt)
+        async with self._generation_slots:
+            with stage("generation", mode):
+                text = await self._generator(mode).agenerate(prefix, suffix)
         print("✅ Response generated!\n")
-        return response.text
+        self._remember(user_query, mode, profile_key, text, query_emb)
+        return text
+
+    async def astream_ai_response(self, user_query, mode="in-depth", user_profile=None, profile_key=None,
+                                  scope=None):
+        """Yields LLM output text chunks as they are generated"""
+        key = self._flight_key(user_query, mode, profile_key)
+        if key is None:
+            chunks = self._astream_ai_response(user_query, mode, user_profile, profile_key, scope)
+        else:
+            chunks = self.in_flight.stream(
+                ("stream",) + key,
+                lambda: self._astream_ai_response(user_query, mode, user_profile, profile_key, scope)
+            )
+        async for text in chunks:
+            yield text
+
+    async def _astream_ai_response(self, user_query, mode, user_profile, profile_key, scope):
+        print(f"\n💬 Streaming query: {user_query[:80]}...")
+
+        with stage("retrieval", mode):
+            cached, context, query_emb = await self._alookup_or_retrieve(user_query, mode, profile_key, scope=scope)
+        if cached is not None:
+            print("⚡ Served from response cache\n")
+            yield cached
+            return
+
+        prefix, suffix = self._build_prompt(user_query, mode, context, user_profile)
+
+        parts = []
+        async with self._generation_slots:
+            # Includes the time the client takes to read each chunk
+            with stage("generation", mode):
+                async for text in self._generator(mode).astream(prefix, suffix):
+                    parts.append(text)
+                    yield text
+        print("✅ Response streamed!\n")
+        self._remember(user_query, mode, profile_key, "".join(parts), query_emb)
 
 
 # ==========================================
-# Command-line and Helper (No change needed)
+# Lazy engine loading
+# ==========================================
+class EngineUnavailable(RuntimeError):
+    """The engine failed to load, or is still loading"""
+
+
+class EngineLoader:
+    """
+    Builds CoachCarterAI once, on a background thread, then warms it up.
+    Started from the FastAPI lifespan (or by the first request) so the
+    server answers liveness probes while models and the index load.
+    status() reports the current stage and how long each one took.
+    """
+
+    STAGES = ("imports", "embedding_model", "llm_client", "knowledge_base", "warmup")
+
+    def __init__(self, factory=CoachCarterAI):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = None
+        self.engine = None
+        self.error = None
+        self.stage = "not started"
+        self.timings = {}
+        self._started_at = None
+        self._stage_started_at = None
+
+    def start(self):
+        """Starts loading in the background (no-op if already started)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._started_at = time.perf_counter()
+            self._thread = threading.Thread(target=self._load, name="coach-engine-loader", daemon=True)
+            self._thread.start()
+
+    def get(self, timeout=None) -> CoachCarterAI:
+        """The loaded engine, waiting for it if needed"""
+        self.start()
+        self._done.wait(timeout)
+        if self.engine is None:
+            raise EngineUnavailable(self.error or "AI engine is still loading")
+        return self.engine
+
+    async def aget(self) -> CoachCarterAI:
+        """get() for the event loop: polls instead of parking a thread per waiting request"""
+        self.start()
+        while not self._done.is_set():
+            await asyncio.sleep(0.05)
+        return self.get()
+
+    def status(self) -> dict:
+        if self.engine is not None:
+            state = "ready"
+        elif self.error is not None:
+            state = "failed"
+        else:
+            state = "loading" if self._thread else "not started"
+        completed = sum(1 for stage in self.STAGES if stage in self.timings)
+        return {
+            "state": state,
+            "stage": self.stage,
+            "progress": f"{completed}/{len(self.STAGES)}",
+            "elapsed_seconds": round(time.perf_counter() - self._started_at, 3) if self._started_at else 0.0,
+            "timings": dict(self.timings),
+            "error": self.error,
+        }
+
+    def _progress(self, stage):
+        now = time.perf_counter()
+        if self._stage_started_at is not None:
+            self.timings[self.stage] = round(now - self._stage_started_at, 3)
+        self.stage = stage
+        self._stage_started_at = now
+
+    def _load(self):
+        try:
+            engine = self._factory(progress=self._progress)
+            self._progress("warmup")
+            engine.warmup()
+            self._progress("ready")
+            self.engine = engine
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.stage = "failed"
+            print(f"❌ AI engine failed to load: {self.error}")
+        finally:
+            self._done.set()
+
+
+engine_loader = EngineLoader()
+
+
+# ==========================================
+# Command-line and Helper
 # ==========================================
 if __name__ == "__main__":
     import sys
@@ -200,11 +533,86 @@ if __name__ == "__main__":
     # Example usage
     answer = coach_ai.get_ai_response("Create a 4-week fat loss plan for beginners.")
     print("\n🗣️ Response:\n", answer)
-else:
-    # If imported, initialize once
-    coach_ai = CoachCarterAI()
 
 
-def get_ai_response(user_query: str, mode: str = "in-depth", user_profile: dict = None):
-    """Helper for external use"""
-    return coach_ai.get_ai_response(user_query, mode, user_profile)
\ No newline at end of file
+def start_engine():
+    """Begins loading the engine in the background"""
+    engine_loader.start()
+
+
+def get_engine() -> CoachCarterAI:
+    """The shared engine, loading it on first use"""
+    return engine_loader.get()
+
+
+async def wait_for_engine():
+    """Awaits the engine; raises EngineUnavailable if it failed to load"""
+    await engine_loader.aget()
+
+
+def engine_status() -> dict:
+    """Loading state / stage / per-stage timings for the readiness probe"""
+    return engine_loader.status()
+
+
+def get_ai_response(user_query: str, mode: str = "in-depth", user_profile: dict = None,
+                    profile_key: str = None, scope: tuple = None):
+    """
+    Helper for external use (pass profile_key to enable the response cache,
+    scope from knowledge_base.retrieval_scope to pre-filter retrieval)
+    """
+    return get_engine().get_ai_response(user_query, mode, user_profile, profile_key, scope)
+
+
+async def aget_ai_response(user_query: str, mode: str = "in-depth", user_profile: dict = None,
+                           profile_key: str = None, scope: tuple = None):
+    """Async helper for external use"""
+    engine = await engine_loader.aget()
+    return await engine.aget_ai_response(user_query, mode, user_profile, profile_key, scope)
+
+
+async def astream_ai_response(user_query: str, mode: str = "in-depth", user_profile: dict = None,
+                              profile_key: str = None, scope: tuple = None):
+    """Streaming helper for external use (async generator of text chunks)"""
+    engine = await engine_loader.aget()
+    async for text in engine.astream_ai_response(user_query, mode, user_profile, profile_key, scope):
+        yield text
+
+
+def response_cache_stats() -> dict:
+    """Hit/miss counters of the LLM response cache (None until the engine is loaded)"""
+    if engine_loader.engine is None:
+        return None
+    return engine_loader.engine.response_cache.stats()
+
+
+def prompt_cache_stats() -> dict:
+    """Prompt prefix reuse and LLM input token / context cache accounting (None until loaded)"""
+    if engine_loader.engine is None:
+        return None
+    engine = engine_loader.engine
+    return {
+        "prefixes": engine.prompt_prefixes.stats(),
+        "llm": engine.generator.stats(),
+        "llm_quick_tip": engine.quick_generator.stats(),
+    }
+
+
+def coalescing_stats() -> dict:
+    """Single-flight counters: identical in-flight chats that shared a generation (None until loaded)"""
+    if engine_loader.engine is None:
+        return None
+    return engine_loader.engine.in_flight.stats()
+
+
+def retrieval_sidecar_stats() -> dict:
+    """Retrieval sidecar health and fallback counters (None until loaded, or without a sidecar)"""
+    if engine_loader.engine is None or engine_loader.engine.sidecar is None:
+        return None
+    return engine_loader.engine.sidecar.stats()
+
+
+def save_response_cache():
+    """Persists the response cache (no-op unless COACH_RESPONSE_CACHE_PATH is set)"""
+    if engine_loader.engine is not None:
+        engine_loader.engine.response_cache.save()
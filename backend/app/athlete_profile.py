@@ -1,5 +1,38 @@
+import re
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Iterable, List, Optional, Tuple
+
+SPORT_ALIASES = {
+    "soccer": "football",
+    "track": "athletics",
+    "track and field": "athletics",
+    "running": "athletics",
+    "f1": "formula 1",
+    "ping pong": "table tennis",
+}
+
+# Words in free-text injuries that don't say *where* the injury is
+INJURY_STOPWORDS = {
+    "injury", "injuries", "pain", "strain", "sprain", "history", "chronic", "old",
+    "minor", "recovering", "from", "the", "and", "with", "mild", "severe", "left", "right",
+}
+
+
+def normalize_sport(sport: str) -> str:
+    """Lowercase, single-spaced sport name with aliases folded ("Soccer" -> "football")"""
+    sport = " ".join(sport.lower().split())
+    return SPORT_ALIASES.get(sport, sport)
+
+
+def injury_terms(injuries: Iterable[str]) -> Tuple[str, ...]:
+    """Sorted words saying where free-text injuries are ("Left knee pain" -> ("knee",))"""
+    return tuple(sorted({
+        word
+        for injury in injuries
+        for word in re.findall(r"[a-z]+", injury.lower())
+        if len(word) > 2 and word not in INJURY_STOPWORDS
+    }))
+
 
 class AthleteProfile(BaseModel):
     """Complete athlete profile"""
@@ -0,0 +1,190 @@
+import os
+
+# ==========================================
+# Runtime settings (read from environment / .env)
+# ==========================================
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting, falling back to the default on bad input"""
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float setting, falling back to the default on bad input"""
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+# --- Knowledge base ---
+# Recorded in data/kb_manifest.json; changing it triggers a full re-embed.
+EMBEDDING_MODEL_NAME = os.getenv("COACH_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+# Embedding backend (app/embedding_backends.py): "torch" (SentenceTransformer),
+# "onnx-int8" (onnxruntime, int8 weights, exported on first use to
+# COACH_EMBEDDING_ONNX_DIR, default data/onnx/<model>-int8) or "hashed" (no
+# model to download: offline benchmarks and CI). Switching backends
+# re-embeds the knowledge base.
+EMBEDDING_BACKEND = os.getenv("COACH_EMBEDDING_BACKEND", "torch")
+EMBEDDING_ONNX_DIR = os.getenv("COACH_EMBEDDING_ONNX_DIR", "")
+# CPU threads per embedding call (0 = library default: all cores)
+EMBEDDING_THREADS = _env_int("COACH_EMBEDDING_THREADS", 0)
+
+# FAISS index type: a preset (flat, hnsw, ivf-flat, ivf-pq) or an index_factory
+# string such as "HNSW16" or "IVF64,SQ8". Changing it rebuilds the index from
+# the saved embeddings (no re-embedding). See benchmarks/bench_ann_index.py.
+KB_INDEX = os.getenv("COACH_KB_INDEX", "flat")
+# Query-time accuracy/speed knobs: IVF lists probed, HNSW candidate list size
+KB_NPROBE = _env_int("COACH_KB_NPROBE", 8)
+KB_EF_SEARCH = _env_int("COACH_KB_EF_SEARCH", 64)
+
+# --- Engine startup ---
+# 1: start loading models + index in the background when the server starts;
+# 0: load on the first chat request. Either way /api/health/live answers at once
+# and /api/health/ready turns 200 once the engine is loaded and warmed up.
+ENGINE_PRELOAD = _env_int("COACH_ENGINE_PRELOAD", 1) == 1
+
+# --- Chat concurrency ---
+# Max number of LLM generations allowed in flight at once (per worker).
+# Extra chat requests wait for a free slot instead of piling onto Gemini.
+MAX_CONCURRENT_CHATS = _env_int("COACH_MAX_CONCURRENT_CHATS", 32)
+
+# Threads used for embedding + FAISS search, kept off the event loop.
+RETRIEVAL_WORKERS = _env_int("COACH_RETRIEVAL_WORKERS", 4)
+
+# --- Request coalescing (app/single_flight.py) ---
+# Identical chats (same normalized text, mode and profile fingerprint) in
+# flight at the same time share one retrieval + LLM call (1 = on, 0 = off)
+COALESCE_CHATS = _env_int("COACH_COALESCE_CHATS", 1) == 1
+
+# --- Query embedding micro-batching (app/embedding_batcher.py) ---
+# Queries arriving within MAX_WAIT_MS are encoded + searched together.
+# A max batch size of 1 turns batching off (one encode() per request).
+EMBED_BATCH_MAX_SIZE = _env_int("COACH_EMBED_BATCH_MAX_SIZE", 16)
+EMBED_BATCH_MAX_WAIT_MS = _env_float("COACH_EMBED_BATCH_MAX_WAIT_MS", 2.0)
+
+# --- Retrieval sidecar (app/retrieval_service.py) ---
+# UNIX socket of a shared `python -m app.retrieval_service` process that owns
+# the embedding model; empty = every worker embeds + searches in-process.
+# Workers fall back to in-process retrieval while the sidecar is unreachable.
+RETRIEVAL_SIDECAR = os.getenv("COACH_RETRIEVAL_SIDECAR", "")
+RETRIEVAL_SIDECAR_POOL_SIZE = _env_int("COACH_RETRIEVAL_SIDECAR_POOL_SIZE", 4)  # connections per worker
+RETRIEVAL_SIDECAR_TIMEOUT_SECONDS = _env_float("COACH_RETRIEVAL_SIDECAR_TIMEOUT_SECONDS", 2.0)
+RETRIEVAL_SIDECAR_HEALTH_SECONDS = _env_float("COACH_RETRIEVAL_SIDECAR_HEALTH_SECONDS", 1.0)
+
+# --- Context assembly (app/context_assembly.py) ---
+# 1: retrieve CONTEXT_CANDIDATES chunks, drop near-duplicates, pick diverse
+# ones by MMR and pack them under the mode's token budget; 0: the mode's
+# raw top-k chunks (RETRIEVAL_TOP_K_*)
+CONTEXT_ASSEMBLY = _env_int("COACH_CONTEXT_ASSEMBLY", 1) == 1
+RETRIEVAL_TOP_K_QUICK_TIP = _env_int("COACH_RETRIEVAL_TOP_K_QUICK_TIP", 2)
+RETRIEVAL_TOP_K_IN_DEPTH = _env_int("COACH_RETRIEVAL_TOP_K_IN_DEPTH", 3)
+CONTEXT_CANDIDATES = _env_int("COACH_CONTEXT_CANDIDATES", 12)
+CONTEXT_BUDGET_QUICK_TIP = _env_int("COACH_CONTEXT_BUDGET_QUICK_TIP", 200)  # tokens
+CONTEXT_BUDGET_IN_DEPTH = _env_int("COACH_CONTEXT_BUDGET_IN_DEPTH", 320)
+# Relevance vs diversity (1.0 = relevance only) and the cosine similarity
+# above which a candidate counts as a duplicate of a chosen chunk
+CONTEXT_MMR_LAMBDA = _env_float("COACH_CONTEXT_MMR_LAMBDA", 0.85)
+CONTEXT_DUP_THRESHOLD = _env_float("COACH_CONTEXT_DUP_THRESHOLD", 0.95)
+
+# --- Lexical / hybrid retrieval (app/lexical_index.py) ---
+# "vector": FAISS only; "hybrid": BM25 + FAISS merged by reciprocal-rank
+# fusion; "fast": hybrid, but a confident BM25 result skips the query
+# embedding. See benchmarks/bench_hybrid_retrieval.py.
+RETRIEVAL_MODE = os.getenv("COACH_RETRIEVAL_MODE", "hybrid")
+RRF_K = _env_int("COACH_RRF_K", 60)
+# Fast path: share of the query's (idf-weighted) terms the top chunk must
+# contain, and its minimum BM25 score
+LEXICAL_MIN_COVERAGE = _env_float("COACH_LEXICAL_MIN_COVERAGE", 0.8)
+LEXICAL_MIN_SCORE = _env_float("COACH_LEXICAL_MIN_SCORE", 12.0)
+
+# --- Profile storage (app/profile_store.py) ---
+# "json": one file per athlete in data/profiles/ (default)
+# "sqlite": WAL database with sport/injury indexes; import the JSON files first
+#           with `python -m app.profile_store migrate`
+PROFILE_BACKEND = os.getenv("COACH_PROFILE_BACKEND", "json")
+PROFILE_DB_PATH = os.getenv("COACH_PROFILE_DB", "")  # empty = data/profiles.db
+PROFILE_DB_POOL_SIZE = _env_int("COACH_PROFILE_DB_POOL_SIZE", 4)
+# GET /api/profiles pages: profiles per page by default, and the most ?limit= may ask for
+PROFILE_QUERY_LIMIT = _env_int("COACH_PROFILE_QUERY_LIMIT", 100)
+PROFILE_QUERY_MAX_LIMIT = _env_int("COACH_PROFILE_QUERY_MAX_LIMIT", 1000)
+
+# --- Profile cache (app/profile_service.py) ---
+# Validated profiles kept in memory (LRU); 0 reads data/profiles/*.json every time
+PROFILE_CACHE_SIZE = _env_int("COACH_PROFILE_CACHE_SIZE", 1024)
+
+# --- Response cache (app/response_cache.py) ---
+RESPONSE_CACHE_SIZE = _env_int("COACH_RESPONSE_CACHE_SIZE", 1000)  # 0 disables the cache
+RESPONSE_CACHE_TTL_SECONDS = _env_int("COACH_RESPONSE_CACHE_TTL", 24 * 3600)
+# Cosine similarity of query embeddings needed for a semantic hit
+RESPONSE_CACHE_SIMILARITY = _env_float("COACH_RESPONSE_CACHE_SIMILARITY", 0.95)
+# Optional JSON file to persist the cache across restarts (empty = memory only)
+RESPONSE_CACHE_PATH = os.getenv("COACH_RESPONSE_CACHE_PATH", "")
+
+# --- Quick-tip tier (mode "quick-tip", app/ai_engine.py) ---
+# Quick tips get their own generation settings: capped output, a shorter
+# deadline, optionally a lighter model (empty = LLM_MODEL) and a looser
+# semantic cache threshold (0 = RESPONSE_CACHE_SIMILARITY). Their context
+# budget is CONTEXT_BUDGET_QUICK_TIP. benchmarks/bench_quick_tip.py checks
+# the p95 latency target against the stub provider.
+QUICK_TIP_MAX_OUTPUT_TOKENS = _env_int("COACH_QUICK_TIP_MAX_OUTPUT_TOKENS", 256)
+QUICK_TIP_MODEL = os.getenv("COACH_QUICK_TIP_MODEL", "")
+QUICK_TIP_TIMEOUT_SECONDS = _env_float("COACH_QUICK_TIP_TIMEOUT_SECONDS", 15.0)
+QUICK_TIP_CACHE_SIMILARITY = _env_float("COACH_QUICK_TIP_CACHE_SIMILARITY", 0.0)
+QUICK_TIP_TARGET_P95_MS = _env_float("COACH_QUICK_TIP_TARGET_P95_MS", 3000.0)
+
+# --- Prompt prefix + LLM context caching (app/prompts.py, app/llm.py) ---
+# Rendered system-instruction + profile prefixes kept per (mode, profile version)
+PROMPT_PREFIX_CACHE_SIZE = _env_int("COACH_PROMPT_PREFIX_CACHE_SIZE", 1024)
+# "off" | "local" (offline stand-in, records would-be hits). No explicit
+# provider cache: the ~200-token prefix is under Gemini's 4096-token minimum
+LLM_CONTEXT_CACHE = os.getenv("COACH_LLM_CONTEXT_CACHE", "off")
+LLM_CONTEXT_CACHE_TTL_SECONDS = _env_int("COACH_LLM_CONTEXT_CACHE_TTL", 3600)
+LLM_CONTEXT_CACHE_SIZE = _env_int("COACH_LLM_CONTEXT_CACHE_SIZE", 256)
+# Prefill cost used to estimate the latency cached prefix tokens save
+LLM_PREFILL_MS_PER_1K_TOKENS = _env_float("COACH_LLM_PREFILL_MS_PER_1K_TOKENS", 20.0)
+
+# --- LLM provider (app/llm_providers.py) ---
+# "gemini" (needs GEMINI_API_KEY) or "stub" (local, no network, see below)
+LLM_PROVIDER = os.getenv("COACH_LLM_PROVIDER", "gemini")
+LLM_MODEL = os.getenv("COACH_LLM_MODEL", "gemini-2.0-flash")
+# Output cap for in-depth answers (0 = provider default)
+LLM_MAX_OUTPUT_TOKENS = _env_int("COACH_LLM_MAX_OUTPUT_TOKENS", 0)
+# Stub provider: median latency, "fixed" or "lognormal" spread, share of
+# slow calls (slow_factor x longer), share of failing calls, reply text,
+# decode time per output token (0 = latency independent of output length)
+LLM_STUB_LATENCY_MS = _env_float("COACH_LLM_STUB_LATENCY_MS", 500.0)
+LLM_STUB_DISTRIBUTION = os.getenv("COACH_LLM_STUB_DISTRIBUTION", "lognormal")
+LLM_STUB_SIGMA = _env_float("COACH_LLM_STUB_SIGMA", 0.25)
+LLM_STUB_SLOW_RATE = _env_float("COACH_LLM_STUB_SLOW_RATE", 0.0)
+LLM_STUB_SLOW_FACTOR = _env_float("COACH_LLM_STUB_SLOW_FACTOR", 10.0)
+LLM_STUB_FAILURE_RATE = _env_float("COACH_LLM_STUB_FAILURE_RATE", 0.0)
+LLM_STUB_TEXT = os.getenv("COACH_LLM_STUB_TEXT", "")
+LLM_STUB_SEED = _env_int("COACH_LLM_STUB_SEED", 0)
+LLM_STUB_MS_PER_TOKEN = _env_float("COACH_LLM_STUB_MS_PER_TOKEN", 0.0)
+
+# --- LLM deadlines, retries, hedging (app/llm.py CallPolicy) ---
+LLM_TIMEOUT_SECONDS = _env_float("COACH_LLM_TIMEOUT_SECONDS", 60.0)
+LLM_MAX_RETRIES = _env_int("COACH_LLM_MAX_RETRIES", 2)
+LLM_RETRY_BACKOFF_MS = _env_float("COACH_LLM_RETRY_BACKOFF_MS", 250.0)
+LLM_RETRY_MAX_BACKOFF_MS = _env_float("COACH_LLM_RETRY_MAX_BACKOFF_MS", 4000.0)
+# 1: fire a second request when the first is slower than the hedge delay
+LLM_HEDGE = _env_int("COACH_LLM_HEDGE", 0) == 1
+# Fixed hedge delay; 0 = the p95 of recent calls, once LLM_HEDGE_MIN_SAMPLES are seen
+LLM_HEDGE_DELAY_MS = _env_float("COACH_LLM_HEDGE_DELAY_MS", 0.0)
+LLM_HEDGE_MIN_SAMPLES = _env_int("COACH_LLM_HEDGE_MIN_SAMPLES", 20)
+
+# --- Metrics (app/metrics.py, GET /metrics) ---
+# 0: no stage timing, no /metrics
+METRICS_ENABLED = _env_int("COACH_METRICS", 1) == 1
+# Log the stage breakdown of chat requests slower than this; 0 = off
+SLOW_REQUEST_MS = _env_float("COACH_SLOW_REQUEST_MS", 0.0)
@@ -0,0 +1,151 @@
+import re
+from typing import Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from app.prompts import estimate_tokens
+
+# ==========================================
+# Token-budgeted context assembly
+# ==========================================
+# Retrieval returns a wider candidate set than the prompt needs; the
+# assembler turns it into the "Relevant Knowledge" block:
+#
+# 1. near-duplicates go: a candidate whose embedding is almost identical
+#    to an already chosen chunk (cosine >= dup_threshold) adds tokens but
+#    no knowledge, and facts repeated across sections (the same recovery
+#    advice under every sport) are only included once
+# 2. maximal marginal relevance picks the rest: each step takes the chunk
+#    maximizing  lambda * sim(query, c) - (1 - lambda) * max sim(c, chosen)
+#    over the chunk embeddings already in the store
+# 3. chunks are packed under the mode's token budget (estimate_tokens);
+#    one that doesn't fit is skipped in favour of smaller ones
+#
+# Chunks from one "Sport — Section" share a single header line, and the
+# overlapping windows of a long fact are joined without repeating text.
+
+
+FACT_PREFIX_RE = re.compile(r"^\s*Fact\s*\d*\s*:\s*", re.IGNORECASE)
+
+
+def fact_key(line: str) -> str:
+    """Identity of a fact line, ignoring its number and spacing"""
+    return " ".join(FACT_PREFIX_RE.sub("", line).lower().split())
+
+
+def fresh_lines(body: str, seen: Set[str]) -> List[str]:
+    """Lines of body whose fact isn't in seen"""
+    return [line for line in body.splitlines() if fact_key(line) and fact_key(line) not in seen]
+
+
+def split_header(text: str):
+    """("Sport — Section" header line, body) of a SectionChunker chunk"""
+    header, _, body = text.partition("\n")
+    return (header, body) if body else ("", header)
+
+
+def trim_overlap(previous: str, text: str, min_overlap: int = 16, max_overlap: int = 200) -> str:
+    """text without its prefix that repeats the end of previous (overlapping windows)"""
+    for size in range(min(max_overlap, len(previous), len(text)), min_overlap - 1, -1):
+        if previous.endswith(text[:size]):
+            return text[size:].lstrip()
+    return text
+
+
+class ContextAssembler:
+    """
+    Builds the prompt context from a knowledge-base store (see
+    load_or_build_knowledge_base) for a query embedding and the candidate
+    chunk ids retrieved for it. budgets maps mode -> max context tokens;
+    modes not listed get the "in-depth" budget.
+    """
+
+    def __init__(self, store: Dict, budgets: Dict[str, int], mmr_lambda: float = 0.85,
+                 dup_threshold: float = 0.95):
+        self.store = store
+        self.budgets = budgets
+        self.mmr_lambda = mmr_lambda
+        self.dup_threshold = dup_threshold
+        ids = np.asarray(store["ids"])
+        self._order = np.argsort(ids)
+        self._sorted_ids = ids[self._order]
+
+    def budget(self, mode: str) -> int:
+        return self.budgets.get(mode, self.budgets["in-depth"])
+
+    def _rows(self, ids: np.ndarray) -> np.ndarray:
+        """Row of each chunk id in store["embeddings"] (corpus order)"""
+        return self._order[np.searchsorted(self._sorted_ids, ids)]
+
+    @staticmethod
+    def _unit(matrix: np.ndarray) -> np.ndarray:
+        matrix = np.asarray(matrix, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def select(self, query_vector: Optional[np.ndarray], candidate_ids: Sequence[int], mode: str) -> List[int]:
+        """
+        Chunk ids to include, in selection order. Without a query vector
+        (lexical fast path) the centroid of the top 3 candidates stands in.
+        """
+        ids = np.array([cid for cid in dict.fromkeys(int(cid) for cid in candidate_ids) if cid >= 0],
+                       dtype=np.int64)
+        if not len(ids):
+            return []
+        vectors = self._unit(self.store["embeddings"][self._rows(ids)])
+        if query_vector is None:
+            query_vector = vectors[:3].mean(axis=0)
+        relevance = vectors @ self._unit(query_vector).ravel()
+        texts = [split_header(self.store["chunks"][int(cid)]) for cid in ids]
+
+        budget = self.budget(mode)
+        used, headers, seen = 0, set(), set()
+        selected: List[int] = []
+        redundancy = np.full(len(ids), -np.inf, dtype=np.float32)  # max similarity to a chosen chunk
+        remaining = np.ones(len(ids), dtype=bool)
+        while remaining.any():
+            scores = self.mmr_lambda * relevance - (1 - self.mmr_lambda) * np.maximum(redundancy, 0.0)
+            best = int(np.argmax(np.where(remaining, scores, -np.inf)))
+            remaining[best] = False
+
+            header, body = texts[best]
+            lines = fresh_lines(body, seen)
+            if redundancy[best] >= self.dup_threshold or not lines:
+                continue  # near-duplicate of a chosen chunk
+            cost = estimate_tokens("\n".join(lines)) + (0 if header in headers else estimate_tokens(header))
+            if used + cost > budget:
+                continue  # try smaller chunks
+            used += cost
+            headers.add(header)
+            seen.update(fact_key(line) for line in lines)
+            selected.append(best)
+            redundancy = np.maximum(redundancy, vectors @ vectors[best])
+        return [int(ids[i]) for i in selected]
+
+    def render(self, chunk_ids: Sequence[int]) -> str:
+        """Groups chunks by section (most relevant first), corpus order within a section"""
+        if not chunk_ids:
+            return ""
+        rows = dict(zip(chunk_ids, self._rows(np.asarray(chunk_ids, dtype=np.int64)).tolist()))
+        sections: Dict[str, List[int]] = {}
+        for cid in chunk_ids:
+            sections.setdefault(split_header(self.store["chunks"][cid])[0], []).append(cid)
+
+        blocks, seen = [], set()
+        for header, members in sections.items():
+            bodies: List[str] = []
+            for cid in sorted(members, key=rows.get):
+                body = split_header(self.store["chunks"][cid])[1]
+                body = trim_overlap(bodies[-1], body) if bodies else body
+                lines = fresh_lines(body, seen)
+                seen.update(fact_key(line) for line in lines)
+                bodies.append("\n".join(lines))
+            bodies = [body for body in bodies if body]
+            if bodies:
+                blocks.append("\n".join(([header] if header else []) + bodies))
+        return "\n\n".join(blocks)
+
+    def assemble(self, query_vector: Optional[np.ndarray], candidate_ids: Optional[Sequence[int]], mode: str) -> str:
+        if candidate_ids is None:
+            return ""
+        return self.render(self.select(query_vector, candidate_ids, mode))
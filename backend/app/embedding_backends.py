@@ -0,0 +1,280 @@
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import zlib
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# Embedding backends
+# ==========================================
+# "torch":     SentenceTransformer on full-precision torch (default)
+# "onnx-int8": the same model exported to ONNX with dynamic int8 weights, run
+#              by onnxruntime; tokenized by `tokenizers`, so torch is only
+#              imported once, to export the model
+# "hashed":    feature-hashed bag of words, no model at all; deterministic and
+#              offline, for benchmarks and CI (retrieval only matches shared words)
+BACKENDS = ("torch", "onnx-int8", "hashed")
+HASHED_DIM = 384  # same width as all-MiniLM-L6-v2, so index sizes compare
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_INT8_MODEL_FILE = "model_int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+EMBEDDER_CONFIG_FILE = "embedder.json"
+
+
+def load_embedding_model(model_name: str = None, backend: str = None, threads: int = None):
+    """
+    Embedding model with SentenceTransformer's encode(texts, convert_to_numpy=True)
+    interface, for the configured backend (COACH_EMBEDDING_BACKEND).
+    """
+    model_name = model_name or config.EMBEDDING_MODEL_NAME
+    backend = backend or config.EMBEDDING_BACKEND
+    threads = config.EMBEDDING_THREADS if threads is None else threads
+
+    if backend == "torch":
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if threads > 0:
+            torch.set_num_threads(threads)
+        return SentenceTransformer(model_name)
+    if backend == "onnx-int8":
+        model_dir = onnx_model_dir(model_name)
+        if not (model_dir / EMBEDDER_CONFIG_FILE).exists():
+            print(f"   📦 Exporting {model_name} to ONNX int8 (one-off, needs torch)...")
+            export_onnx_int8(model_name, model_dir)
+        return OnnxEmbedder(model_dir, threads=threads)
+    if backend == "hashed":
+        return HashedEmbedder()
+    raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {BACKENDS}")
+
+
+class LazyEmbeddingModel:
+    """
+    load_embedding_model() on the first encode(). Workers using the retrieval
+    sidecar (app/retrieval_service.py) hold one of these, so they only pay for
+    a model when they have to embed in-process (sidecar down, store rebuild).
+    """
+
+    def __init__(self, model_name: str = None, backend: str = None, threads: int = None):
+        self._args = (model_name, backend, threads)
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def encode(self, texts, **kwargs):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    print("📚 Loading local embedding model for in-process retrieval...")
+                    self._model = load_embedding_model(*self._args)
+        return self._model.encode(texts, **kwargs)
+
+
+def embedding_model_id(model_name: str = None, backend: str = None) -> str:
+    """Model identity recorded in the knowledge base manifest (backend included)"""
+    model_name = model_name or config.EMBEDDING_MODEL_NAME
+    backend = backend or config.EMBEDDING_BACKEND
+    if backend == "hashed":
+        return f"hashed-{HASHED_DIM}"  # no model behind it
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+
+def onnx_model_dir(model_name: str) -> Path:
+    """Where the exported model lives (COACH_EMBEDDING_ONNX_DIR or data/onnx/<model>-int8)"""
+    if config.EMBEDDING_ONNX_DIR:
+        return Path(config.EMBEDDING_ONNX_DIR)
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name.strip("/"))
+    return Path(__file__).parent.parent / "data" / "onnx" / f"{slug}-int8"
+
+
+class OnnxEmbedder:
+    """
+    Runs an exported sentence-transformers model with onnxruntime.
+    Pooling and normalization follow the original model (embedder.json).
+    """
+
+    def __init__(self, model_dir: Path, threads: int = 0):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+        with open(model_dir / EMBEDDER_CONFIG_FILE, "r", encoding="utf-8") as f:
+            self.settings = json.load(f)
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.settings["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.settings["pad_token_id"], pad_token=self.settings["pad_token"])
+
+        options = onnxruntime.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            str(model_dir / self.settings["model_file"]), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {node.name for node in self.session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.settings["dimension"]
+
+    def encode(self, sentences, convert_to_numpy=True, show_progress_bar=False, batch_size=32, **kwargs):
+        """Same contract as SentenceTransformer.encode for the arguments the app uses"""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self.settings["dimension"]), dtype=np.float32)
+
+        # Sorting by length keeps padding per batch small
+        order = np.argsort([-len(text) for text in texts])
+        embeddings = np.empty((len(texts), self.settings["dimension"]), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            embeddings[rows] = self._encode_batch([texts[row] for row in rows])
+        return embeddings[0] if single else embeddings
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {name: value for name, value in inputs.items() if name in self.input_names})[0]
+
+        if self.settings["pooling"] == "cls":
+            pooled = hidden[:, 0]
+        else:
+            mask = inputs["attention_mask"][:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.settings["normalize"]:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+
+class HashedEmbedder:
+    """
+    Unit-length bag of words: each word adds +-1 to a crc32-chosen column.
+    Same encode() interface as the models, nothing to download or load.
+    """
+
+    def __init__(self, dim: int = HASHED_DIM):
+        self.dim = dim
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, sentences, convert_to_numpy=True, show_progress_bar=False, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                slot = zlib.crc32(word.encode("utf-8"))
+                matrix[row, slot % self.dim] += 1.0 if slot & 0x80000000 else -1.0
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms > 0, norms, 1.0)
+        return matrix[0] if single else matrix
+
+
+# ==========================================
+# Export (torch side, run once)
+# ==========================================
+def export_onnx_int8(model_name: str, out_dir: Path, opset=17) -> Path:
+    """
+    Exports a sentence-transformers model to ONNX and quantizes its weights
+    to int8 (onnxruntime dynamic quantization). Writes model_int8.onnx,
+    tokenizer.json and embedder.json (pooling / normalize / max length).
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer, hf_model, tokenizer = st_model[0], st_model[0].auto_model.eval(), st_model.tokenizer
+    settings = {
+        "source_model": model_name,
+        "model_file": ONNX_INT8_MODEL_FILE,
+        "quantization": "dynamic-int8",
+        "dimension": _embedding_dimension(st_model),
+        "max_seq_length": st_model.max_seq_length or transformer.max_seq_length,
+        "pooling": _pooling_mode(st_model),
+        "normalize": any(type(module).__name__ == "Normalize" for module in st_model),
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id,
+    }
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=out_dir) as tmp:
+        tmp = Path(tmp)
+        sample = tokenizer(["export sample"], return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+        class LastHiddenState(torch.nn.Module):
+            def __init__(self, model):
+                super().__init__()
+                self.model = model
+
+            def forward(self, *args):
+                return self.model(**dict(zip(input_names, args))).last_hidden_state
+
+        with torch.no_grad():
+            torch.onnx.export(
+                LastHiddenState(hf_model), tuple(sample[name] for name in input_names), str(tmp / ONNX_MODEL_FILE),
+                input_names=input_names, output_names=["last_hidden_state"], opset_version=opset,
+                dynamic_axes={name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]},
+                dynamo=False,
+            )
+        quantize_dynamic(str(tmp / ONNX_MODEL_FILE), str(tmp / ONNX_INT8_MODEL_FILE), weight_type=QuantType.QInt8)
+
+        tokenizer.backend_tokenizer.save(str(tmp / TOKENIZER_FILE))
+        (tmp / EMBEDDER_CONFIG_FILE).write_text(json.dumps(settings, indent=1), encoding="utf-8")
+        # Config last: its presence marks a complete export
+        for name in (ONNX_INT8_MODEL_FILE, TOKENIZER_FILE, EMBEDDER_CONFIG_FILE):
+            os.replace(tmp / name, out_dir / name)
+    logger.info(f"Exported {model_name} to {out_dir}")
+    return out_dir
+
+
+def _embedding_dimension(st_model) -> int:
+    # Renamed in sentence-transformers 5
+    getter = getattr(st_model, "get_embedding_dimension", None) or st_model.get_sentence_embedding_dimension
+    return getter()
+
+
+def _pooling_mode(st_model) -> str:
+    pooling = next((module for module in st_model if type(module).__name__ == "Pooling"), None)
+    if pooling is None:
+        return "mean"
+    settings = pooling.get_config_dict()
+    mode = settings.get("pooling_mode")  # sentence-transformers >= 5
+    if mode is None:
+        mode = "cls" if settings.get("pooling_mode_cls_token") else "mean"
+    if mode not in ("mean", "cls"):
+        raise ValueError(f"Unsupported pooling mode for ONNX export: {mode}")
+    return mode
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX int8")
+    parser.add_argument("--model", default=config.EMBEDDING_MODEL_NAME)
+    parser.add_argument("--out", default=None, help="Output directory (default: data/onnx/<model>-int8)")
+    args = parser.parse_args()
+    print(export_onnx_int8(args.model, Path(args.out) if args.out else onnx_model_dir(args.model)))
@@ -0,0 +1,145 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import partial
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from app.metrics import stage
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class RetrievalBatcher:
+    """
+    Micro-batches query embedding + FAISS search across concurrent requests.
+
+    Callers submit one query each; a background thread collects queries
+    arriving within max_wait_ms (up to max_batch_size; no wait when traffic
+    is not concurrent), encodes them in a
+    single encode() call, runs one index.search over the same matrix and
+    resolves each caller's Future with (query_emb, indices):
+    - query_emb: (1, dim) float32 row for that query
+    - indices:   top_k FAISS ids for that query (None without a search fn)
+
+    A query submitted with a scope (see knowledge_base.retrieval_scope) is
+    searched together with the other queries of the same scope, through
+    search(matrix, k, scope).
+    """
+
+    def __init__(self, encode: Optional[Callable[[List[str]], np.ndarray]] = None,
+                 search: Optional[Callable] = None, max_batch_size=16, max_wait_ms=2.0,
+                 retrieve: Optional[Callable] = None):
+        # retrieve(queries, top_ks, scopes) replaces encode + search (e.g. the retrieval sidecar)
+        self._retrieve = retrieve or partial(encode_and_search, encode, search)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self.batches = 0
+        self.items = 0
+        self._last_batch_size = 1
+        self._thread = threading.Thread(target=self._run, name="coach-embed-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, query: str, top_k=3, scope=None) -> Future:
+        """Queues one query; the Future resolves to (query_emb, indices)"""
+        future = Future()
+        self._queue.put((query, top_k, scope, future))
+        return future
+
+    def retrieve(self, query: str, top_k=3, scope=None):
+        """Blocking convenience wrapper around submit()"""
+        return self.submit(query, top_k, scope).result()
+
+    def close(self):
+        """Stops the worker thread once the queued work is done"""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
+
+    # ==========================================
+    # Worker thread
+    # ==========================================
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+
+            batch = [first]
+            # A lone query with no recent concurrency goes straight through;
+            # under load, queries pile up while the previous batch encodes.
+            wait = self.max_wait if self._last_batch_size > 1 or not self._queue.empty() else 0.0
+            deadline = time.monotonic() + wait
+            stop = False
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._last_batch_size = len(batch)
+            self._process(batch)
+            if stop:
+                return
+
+    def _process(self, batch):
+        # Drop callers that gave up (e.g. cancelled asyncio requests)
+        batch = [item for item in batch if item[3].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            queries, top_ks, scopes, _ = (list(column) for column in zip(*batch))
+            matrix, indices = self._retrieve(queries, top_ks, scopes)
+        except Exception as e:
+            logger.error(f"❌ Batched retrieval failed: {e}")
+            for _, _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.items += len(batch)
+        for row, (_, _, _, future) in enumerate(batch):
+            future.set_result((matrix[row:row + 1], indices[row]))
+
+
+def encode_and_search(encode: Callable[[List[str]], np.ndarray], search: Optional[Callable],
+                      queries: List[str], top_ks: List[int], scopes: List) -> Tuple[np.ndarray, List]:
+    """
+    One encode() call for all queries, then one search per distinct scope.
+    Returns (float32 (n, dim) matrix, per-query top_k ids or None without a search fn).
+    """
+    with stage("embedding"):
+        matrix = np.asarray(encode(queries), dtype=np.float32)
+    indices = [None] * len(queries)
+    if search is not None:
+        with stage("vector_search"):
+            groups = {}
+            for row, scope in enumerate(scopes):
+                groups.setdefault(scope, []).append(row)
+            for scope, rows in groups.items():
+                k = max(top_ks[row] for row in rows)
+                if scope is None:
+                    _, found = search(matrix[rows], k)
+                else:
+                    _, found = search(matrix[rows], k, scope)
+                for position, row in enumerate(rows):
+                    indices[row] = found[position][:top_ks[row]]
+    return matrix, indices
@@ -0,0 +1,48 @@
+"""
+Exercise name normalization shared by the exercise extractor and the
+YouTube link lookup, so "Pull-Ups", "pull up" and "pullups" resolve alike.
+"""
+import re
+from functools import lru_cache
+from typing import List, Tuple
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_APOSTROPHES = re.compile(r"['’‘`]")
+_NUMBERING = re.compile(r"^\s*\d+[.)]\s*")
+_QUALIFIER = re.compile(r"\s*\([^)]*\)")
+
+
+@lru_cache(maxsize=65536)
+def fold_token(token: str) -> str:
+    """Singular form of a lowercase word, so "lunges" and "lunge" compare equal"""
+    if len(token) <= 2 or token.endswith(("ss", "us", "is")):
+        return token
+    if token.endswith("ies"):
+        return token[:-3] + "y"
+    if token.endswith(("ches", "shes", "xes", "sses")):
+        return token[:-2]
+    if token.endswith("s"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase, folded word tokens. Hyphens and punctuation split words,
+    apostrophes are dropped ("farmer's" == "farmers"), plurals are folded.
+    """
+    return list(map(fold_token, _TOKEN.findall(_APOSTROPHES.sub("", text.lower()))))
+
+
+def bare_name(name: str) -> str:
+    """Catalog name without list numbering or a "(Sport)" qualifier"""
+    return _QUALIFIER.sub("", _NUMBERING.sub("", name)).strip() or name
+
+
+def name_variants(name: str) -> List[Tuple[str, ...]]:
+    """Token sequences that refer to a catalog entry: the name, without numbering/qualifiers, joined"""
+    variants = [tuple(tokenize(name)), tuple(tokenize(bare_name(name)))]
+    for tokens in list(variants):
+        if len(tokens) == 2:  # "Push-Ups" / "Skull Crusher" written as "pushups" / "skullcrusher"
+            variants.append((fold_token("".join(tokens)),))
+    return [tokens for tokens in dict.fromkeys(variants) if tokens]
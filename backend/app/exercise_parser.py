@@ -1,17 +1,130 @@
-from typing import List
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.exercise_names import name_variants, tokenize
 from app.youtube_db import get_all_exercises
 
-def extract_exercises(ai_response: str) -> List[str]:
-    """Extract unique exercises from AI response using available exercises"""
-    found_exercises = set()
-    response_lower = ai_response.lower()
-    
-    # Get all available exercises from youtube_links.txt or exercise.txt
-    available_exercises = get_all_exercises()
-    
-    for exercise in available_exercises:
-        if exercise.lower() in response_lower:
-            found_exercises.add(exercise)
-    
-    # Return top exercises (limit to 8 for response)
-    return list(found_exercises)[:8]
+# Shorthand coaches write for catalog exercises (applied when the target is in the catalog)
+EXERCISE_ALIASES = {
+    "RDL": "Romanian Deadlift",
+    "OHP": "Overhead Press",
+    "Military Press": "Overhead Press",
+    "KB Swing": "Kettlebell Swing",
+    "Hip Thrust": "Barbell Hip Thrust",
+}
+
+MAX_EXERCISES = 8
+
+
+class ExerciseMatcher:
+    """
+    Aho-Corasick automaton over word tokens: every catalog name and alias is
+    found in one pass over the text, and matches always start and end on
+    word boundaries ("row" never matches inside "throw").
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[Tuple[str, ...], str]]):
+        # Trie: node -> {token: child}; outputs[node] = (pattern length, exercise)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._outputs: List[List[Tuple[int, str]]] = [[]]
+        for tokens, exercise in patterns:
+            node = 0
+            for token in tokens:
+                child = self._goto[node].get(token)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[node][token] = child
+                    self._goto.append({})
+                    self._outputs.append([])
+                node = child
+            if not self._outputs[node]:  # first pattern wins for identical token sequences
+                self._outputs[node].append((len(tokens), exercise))
+        self._fail = self._link()
+        self._vocabulary = frozenset(token for edges in self._goto for token in edges)
+
+    @classmethod
+    def from_catalog(cls, exercises: Iterable[str], aliases: Optional[Dict[str, str]] = None) -> "ExerciseMatcher":
+        """Catalog names first, then generated variants, then aliases, so real names win clashes"""
+        exercises = list(exercises)
+        patterns = [(tuple(tokenize(name)), name) for name in exercises]
+        patterns += [(tokens, name) for name in exercises for tokens in name_variants(name)]
+        catalog = set(exercises)
+        patterns += [
+            (tokens, target)
+            for alias, target in (aliases or {}).items() if target in catalog
+            for tokens in name_variants(alias)
+        ]
+        return cls((tokens, name) for tokens, name in patterns if tokens)
+
+    def _link(self) -> List[int]:
+        """Failure links by BFS; outputs of the longest proper suffix are merged in"""
+        fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self._goto[node].items():
+                state = fail[node]
+                while state and token not in self._goto[state]:
+                    state = fail[state]
+                fail[child] = self._goto[state].get(token, 0)
+                self._outputs[child] = self._outputs[child] + self._outputs[fail[child]]
+                queue.append(child)
+        return fail
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        """
+        (start token, end token, exercise) for each mention, leftmost-longest
+        and non-overlapping: "Romanian Deadlift" is not also a "Deadlift".
+        """
+        goto, fail, outputs, vocabulary = self._goto, self._fail, self._outputs, self._vocabulary
+        matches = []
+        node = 0
+        for position, token in enumerate(tokenize(text)):
+            if token not in vocabulary:  # most words of a plan are in no exercise name
+                node = 0
+                continue
+            while node and token not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(token, 0)
+            for length, exercise in outputs[node]:
+                matches.append((position + 1 - length, position + 1, exercise))
+
+        matches.sort(key=lambda match: (match[0], match[0] - match[1]))
+        selected, covered = [], 0
+        for start, end, exercise in matches:
+            if start >= covered:
+                selected.append((start, end, exercise))
+                covered = end
+        return selected
+
+    def extract(self, text: str, limit: int = MAX_EXERCISES, rank: str = "first") -> List[str]:
+        """Distinct exercises ranked by first mention ("first") or mention count ("frequency")"""
+        first: Dict[str, int] = {}
+        counts: Dict[str, int] = {}
+        for start, _, exercise in self.find(text):
+            first.setdefault(exercise, start)
+            counts[exercise] = counts.get(exercise, 0) + 1
+
+        if rank == "frequency":
+            ordered = sorted(first, key=lambda exercise: (-counts[exercise], first[exercise]))
+        elif rank == "first":
+            ordered = list(first)  # dict keeps first-mention order
+        else:
+            raise ValueError(f"Unknown rank {rank!r}, expected 'first' or 'frequency'")
+        return ordered[:limit]
+
+
+_matcher: Optional[ExerciseMatcher] = None
+
+
+def get_matcher() -> ExerciseMatcher:
+    """Automaton for the exercise catalog, compiled on first use"""
+    global _matcher
+    if _matcher is None:
+        _matcher = ExerciseMatcher.from_catalog(get_all_exercises(), EXERCISE_ALIASES)
+    return _matcher
+
+
+def extract_exercises(ai_response: str, limit: int = MAX_EXERCISES, rank: str = "first") -> List[str]:
+    """Extract unique catalog exercises from AI response, in a stable order (first mention by default)"""
+    return get_matcher().extract(ai_response, limit=limit, rank=rank)
@@ -0,0 +1,669 @@
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from app.athlete_profile import injury_terms, normalize_sport
+
+# ==========================================
+# Section-aware chunking
+# ==========================================
+class SimpleTextSplitter:
+    """Splits text into overlapping chunks for embedding & retrieval"""
+    def __init__(self, chunk_size=500, chunk_overlap=50):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def split_text(self, text):
+        chunks = []
+        start = 0
+        while start < len(text):
+            end = min(start + self.chunk_size, len(text))
+            chunk = text[start:end].strip()
+            if chunk:
+                chunks.append(chunk)
+            start += self.chunk_size - self.chunk_overlap
+        return chunks
+
+
+# Heading styles used in expert_knowledge.txt
+SPORT_HEADING_RE = re.compile(r"^\s*(?:###\s*SPORT:|Sport:)\s*(?P<sport>.+?)\s*$", re.IGNORECASE)
+INJURY_HEADING_RE = re.compile(r"^\s*###\s*INJURY:\s*(?P<name>.+?)\s*(?:\(.*\))?\s*$", re.IGNORECASE)
+# "🎾 Tennis — Section 2: Key Techniques", "Baseball — Expert Knowledge", "Cycling — Sections 1–2"
+SPORT_SECTION_RE = re.compile(r"^[^\w]*(?P<sport>[A-Za-z][\w ]*?)\s+—\s+(?P<title>.+?)\s*$")
+# "### 1️⃣ CORE SPORT OVERVIEW", "🧬 Section 6: Adaptations", "1. Sport Overview:"
+SECTION_RE = re.compile(
+    r"^\s*(?:#{1,6}\s*(?:\S*️⃣)?|[^\w]*Sections?\s+[\d–-]+:?|\d+\.(?=\s+[A-Z].*:\s*$))\s*(?P<title>.*?):?\s*$"
+)
+FACT_RE = re.compile(r"^\s*Fact\s*(?P<number>\d+)?\s*:", re.IGNORECASE)
+
+# Recorded in the manifest: changing any of it invalidates every chunk id
+CHUNKER_CONFIG = {"name": "section-facts", "version": 2, "chunk_size": 500}
+
+
+class SectionChunker:
+    """
+    Structure-aware chunker for expert_knowledge.txt.
+
+    Tracks the current sport and section from the corpus headings and packs
+    whole facts (never half a fact) into chunks of up to chunk_size chars.
+    Each chunk starts with a "Sport — Section" line and carries metadata:
+    kind ("sport" / "injury" / "general"), sport, section, fact, fact_end.
+    """
+
+    def __init__(self, chunk_size=500):
+        self.chunk_size = chunk_size
+        self._splitter = SimpleTextSplitter(chunk_size, 50)
+
+    def chunk(self, text: str) -> List[Dict]:
+        chunks = []
+        sport, section, kind = None, None, "general"
+        facts = []  # (number, text) of the current section
+
+        def flush():
+            chunks.extend(self._pack(facts, sport, section, kind))
+            facts.clear()
+
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+
+            match = INJURY_HEADING_RE.match(line)
+            if match:
+                flush()
+                section, kind = match.group("name").strip(), "injury"
+                continue
+
+            match = SPORT_HEADING_RE.match(line)
+            if match:
+                flush()
+                sport = match.group("sport").strip()
+                section, kind = "Overview", "sport"
+                continue
+
+            match = SPORT_SECTION_RE.match(line)
+            if match and not FACT_RE.match(line):
+                flush()
+                sport = match.group("sport").strip()
+                title = SECTION_RE.match(match.group("title"))
+                section = (title.group("title") if title else match.group("title")).strip() or "Overview"
+                kind = self._kind(section)
+                continue
+
+            match = SECTION_RE.match(line)
+            if match and not FACT_RE.match(line):
+                flush()
+                section = match.group("title").strip() or section
+                kind = self._kind(section) if sport else "general"
+                continue
+
+            match = FACT_RE.match(line)
+            if match or not facts:
+                number = int(match.group("number")) if match and match.group("number") else len(facts) + 1
+                facts.append((number, line.strip()))
+            else:
+                # Bullets / quotes belong to the fact above them
+                facts[-1] = (facts[-1][0], facts[-1][1] + "\n" + line.strip())
+
+        flush()
+        return chunks
+
+    @staticmethod
+    def _kind(section: str) -> str:
+        return "injury" if "injur" in section.lower() else "sport"
+
+    def _pack(self, facts, sport, section, kind) -> List[Dict]:
+        if not facts:
+            return []
+        label = section
+        if kind == "injury" and "injur" not in (section or "").lower():
+            label = f"Injury: {section}"
+        header = " — ".join(part for part in (sport, label) if part)
+        meta = {"kind": kind, "sport": sport, "section": section}
+
+        packed, body, first = [], [], None
+        for number, fact in facts:
+            if len(fact) + len(header) + 1 > self.chunk_size:
+                # Oversized fact: window it on its own
+                if body:
+                    packed.append((first, last, body))
+                    body = []
+                for window in self._splitter.split_text(fact):
+                    packed.append((number, number, [window]))
+                continue
+            if body and len(header) + sum(len(f) + 1 for f in body) + len(fact) + 1 > self.chunk_size:
+                packed.append((first, last, body))
+                body = []
+            if not body:
+                first = number
+            body.append(fact)
+            last = number
+        if body:
+            packed.append((first, last, body))
+
+        return [
+            {"text": header + "\n" + "\n".join(lines), **meta, "fact": start, "fact_end": end}
+            for start, end, lines in packed
+        ]
+
+
+def chunk_corpus(text: str) -> List[Dict]:
+    """Section-aware chunks (dicts with "text" + metadata), duplicate texts removed"""
+    chunks, seen = [], set()
+    for chunk in SectionChunker(CHUNKER_CONFIG["chunk_size"]).chunk(text):
+        if chunk["text"] not in seen:
+            seen.add(chunk["text"])
+            chunks.append(chunk)
+    return chunks
+
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(chunk: str) -> int:
+    """Stable int64 FAISS id derived from the chunk's content hash"""
+    return int(sha256_text(chunk)[:16], 16) & ((1 << 63) - 1)
+
+
+def store_fingerprint(store: Optional[Dict]) -> int:
+    """
+    Identifies the chunk set of a store (ids are hashes of the chunk texts),
+    so processes can check they mean the same chunk by an id; 0 = no store
+    """
+    if not store:
+        return 0
+    digest = hashlib.sha256(np.sort(store["ids"]).astype("<i8").tobytes()).digest()
+    return int.from_bytes(digest[:8], "little")
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_stat(path: Path) -> List[int]:
+    """[size, mtime_ns]: cheap check before hashing a store file"""
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+# ==========================================
+# FAISS index types
+# ==========================================
+# Named presets; anything else is used as a raw index_factory string
+# (e.g. "HNSW16", "IVF64,SQ8"). {nlist}, {m} and {nbits} are sized to the
+# corpus at build time.
+INDEX_PRESETS = {
+    "flat": "Flat",
+    "hnsw": "HNSW32",
+    "ivf-flat": "IVF{nlist},Flat",
+    "ivf-pq": "IVF{nlist},PQ{m}x{nbits}",
+}
+
+# k-means wants ~39 training points per centroid
+MIN_POINTS_PER_CENTROID = 39
+
+
+def resolve_index_factory(index_spec: str, num_vectors: int, dim: int) -> str:
+    """Preset name or factory string -> concrete factory string for this corpus"""
+    factory = INDEX_PRESETS.get(index_spec.lower(), index_spec)
+    nlist = max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // MIN_POINTS_PER_CENTROID))
+    # 8 dims per PQ sub-quantizer; fewer centroids per sub-quantizer on small corpora
+    m = next(m for m in range(max(1, dim // 8), dim + 1) if dim % m == 0)
+    nbits = max(1, min(8, int(math.log2(max(2, num_vectors // MIN_POINTS_PER_CENTROID)))))
+    factory = factory.format(nlist=nlist, m=m, nbits=nbits)
+
+    if factory.startswith("IVF") and num_vectors < MIN_POINTS_PER_CENTROID:
+        print(f"   ⚠️  {num_vectors} vectors are too few to train {factory}, using Flat")
+        return "Flat"
+    return factory
+
+
+def build_index(embeddings: np.ndarray, ids: np.ndarray, index_spec="flat"):
+    """ID-mapped FAISS index of the given type, trained on the embeddings"""
+    factory = resolve_index_factory(index_spec, len(embeddings), embeddings.shape[1])
+    index = faiss.index_factory(embeddings.shape[1], f"IDMap2,{factory}", faiss.METRIC_L2)
+    if not index.is_trained:
+        index.train(embeddings)
+    index.add_with_ids(embeddings, ids)
+    return index
+
+
+def is_flat_index(index) -> bool:
+    """Exact indexes support in-place remove_ids / add_with_ids updates"""
+    return isinstance(faiss.downcast_index(index.index), faiss.IndexFlat)
+
+
+def configure_search(index, nprobe=None, ef_search=None):
+    """Applies query-time knobs (IVF nprobe, HNSW efSearch) to an ID-mapped index"""
+    inner = faiss.downcast_index(index.index)
+    if nprobe and isinstance(inner, faiss.IndexIVF):
+        inner.nprobe = min(nprobe, inner.nlist)
+    if ef_search and isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = ef_search
+
+
+def search_parameters(index, selector, selectivity=1.0):
+    """
+    SearchParameters carrying an ID selector, typed for the wrapped index
+    (IVF / HNSW indexes reject plain SearchParameters) and keeping the
+    index's nprobe / efSearch. HNSW's efSearch is scaled up by 1/selectivity
+    so that heavily filtered searches still find k allowed neighbours.
+    """
+    inner = faiss.downcast_index(index.index)
+    if isinstance(inner, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=inner.nprobe)
+    elif isinstance(inner, faiss.IndexHNSW):
+        ef_search = int(inner.hnsw.efSearch / max(selectivity, 1e-6))
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=min(ef_search, index.ntotal))
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    params.selector_ref = selector  # keep the selector alive with the params
+    return params
+
+
+# ==========================================
+# Knowledge base build / incremental sync
+# ==========================================
+# On-disk store: raw arrays and one UTF-8 text blob, all memory-mappable.
+# Chunk i's text is texts[offsets[i]:offsets[i + 1]].
+STORE_FORMAT = 2
+STORE_FILES = {
+    "index": "faiss_index.bin",
+    "vectors": "kb_vectors.npy",      # float32 (n, dim), row i = ids[i]
+    "ids": "kb_ids.npy",              # int64 (n,) FAISS ids in corpus order
+    "offsets": "kb_offsets.npy",      # int64 (n + 1,) byte offsets into texts
+    "texts": "kb_chunks.bin",         # concatenated UTF-8 chunk texts
+    "chunk_meta": "kb_chunk_meta.json",
+}
+
+
+def load_or_build_knowledge_base(data_dir: Path, embedding_model, model_name: str,
+                                 force_new=False, index_spec="flat",
+                                 nprobe=None, ef_search=None) -> Optional[Dict]:
+    """
+    Loads the FAISS store for expert_knowledge.txt, keeping it in sync:
+    - kb_manifest.json records the embedding model, chunker config, index
+      type, file checksums (and size / mtime, so unchanged files aren't
+      re-hashed on load) and the content hash of every chunk
+    - model / chunker mismatch, missing or corrupted files -> full rebuild
+    - index type change -> index rebuilt (and trained) from saved embeddings
+    - otherwise only new or changed chunks are embedded; a flat index is
+      patched in place, ANN indexes are retrained on the updated vectors
+
+    index_spec is a preset from INDEX_PRESETS or an index_factory string;
+    nprobe / ef_search tune IVF / HNSW search.
+
+    The saved store is pickle-free and memory-mapped on load (see
+    STORE_FILES), so uvicorn workers share its pages via the OS page cache.
+
+    Returns {"index", "index_spec", "ids", "chunks": {id: text},
+    "chunk_meta": {id: metadata}, "embeddings"} or None.
+    """
+    paths = {name: data_dir / filename for name, filename in STORE_FILES.items()}
+    paths["manifest"] = data_dir / "kb_manifest.json"
+    paths["text"] = data_dir / "expert_knowledge.txt"
+    manifest = _read_manifest(paths["manifest"])
+    reason = "--new requested" if force_new else _rebuild_reason(manifest, model_name, paths)
+
+    store = _sync_store(paths, manifest, reason, embedding_model, model_name, index_spec)
+    if store is not None:
+        configure_search(store["index"], nprobe, ef_search)
+    return store
+
+
+def _sync_store(paths: Dict, manifest: Optional[Dict], reason: Optional[str],
+                embedding_model, model_name: str, index_spec: str) -> Optional[Dict]:
+    if not paths["text"].exists():
+        if reason is None:
+            print("⚠️  expert_knowledge.txt not found! Using saved embeddings as-is.")
+            return _load_store(paths, manifest, mmap=True)
+        print("⚠️  expert_knowledge.txt not found at absolute path! Using empty base.")
+        return None
+
+    # The corpus is hashed as a file and only read if it has to be re-chunked
+    corpus_sha256 = file_sha256(paths["text"])
+    if reason is not None:
+        print(f"   🔄 Rebuilding knowledge base ({reason})")
+        return _full_rebuild(_read_text(paths["text"]), corpus_sha256, embedding_model, model_name,
+                             index_spec, paths)
+
+    # Mapped read-only unless the index or vectors are about to be modified
+    unchanged = manifest["corpus_sha256"] == corpus_sha256
+    store = _load_store(paths, manifest, mmap=unchanged and manifest.get("index", "flat") == index_spec)
+    if store["index_spec"] != index_spec:
+        print(f"   🔄 Rebuilding FAISS index ({store['index_spec']} -> {index_spec}), reusing embeddings")
+        store["index"] = build_index(store["embeddings"], store["ids"], index_spec)
+        store["index_spec"] = index_spec
+        if unchanged:
+            _save_store(store, corpus_sha256, model_name, paths)
+
+    if unchanged:
+        print(f"   ✅ Knowledge base up to date ({len(store['ids'])} chunks)")
+        return store
+
+    return _incremental_update(store, _read_text(paths["text"]), corpus_sha256, embedding_model,
+                               model_name, paths)
+
+
+def _read_text(path: Path) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _read_manifest(path: Path) -> Optional[Dict]:
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _rebuild_reason(manifest: Optional[Dict], model_name: str, paths: Dict) -> Optional[str]:
+    """Why the saved store can't be reused incrementally (None if it can)"""
+    if manifest is None:
+        return "no manifest"
+    if manifest.get("model") != model_name:
+        return f"embedding model changed: {manifest.get('model')} -> {model_name}"
+    if manifest.get("chunker") != CHUNKER_CONFIG:
+        return "chunker config changed"
+    if manifest.get("format") != STORE_FORMAT:
+        return "store format changed"
+    return _check_store_files(manifest, paths)
+
+
+def _check_store_files(manifest: Dict, paths: Dict) -> Optional[str]:
+    """
+    Verifies the store files against the manifest. A file whose size and
+    mtime match the recorded ones is trusted without reading it (hashing the
+    whole index on every start would undo the mmap load); only the others
+    are hashed. Files that hash fine under a new mtime (copied, touched) get
+    their stats refreshed in the manifest so the next start skips them.
+    """
+    checksums, stats = manifest.get("files", {}), manifest.get("file_stats", {})
+    refreshed = {}
+    for name in STORE_FILES:
+        if not paths[name].exists():
+            return f"{paths[name].name} missing"
+        stat = file_stat(paths[name])
+        if stat == stats.get(name):
+            continue
+        if file_sha256(paths[name]) != checksums.get(name):
+            return f"{paths[name].name} checksum mismatch"
+        refreshed[name] = stat
+    if refreshed:
+        manifest["file_stats"] = {**stats, **refreshed}
+        _atomic_write(paths["manifest"], lambda tmp: tmp.write_text(json.dumps(manifest, indent=1), encoding="utf-8"))
+    return None
+
+
+def _load_store(paths: Dict, manifest: Optional[Dict], mmap=False) -> Dict:
+    """
+    Opens the saved store. With mmap=True the vectors, chunk texts and FAISS
+    index are mapped read-only instead of copied into this process.
+    """
+    mmap_mode = "r" if mmap else None
+    ids = np.load(paths["ids"])
+    offsets = np.load(paths["offsets"])
+    blob = np.memmap(paths["texts"], dtype=np.uint8, mode="r") if offsets[-1] else b""
+    with open(paths["chunk_meta"], "r", encoding="utf-8") as f:
+        chunk_meta = json.load(f)
+    print("   ✅ Loaded embeddings from cache" + (" (memory-mapped)" if mmap else ""))
+    return {
+        "index": _read_index(paths["index"], manifest, mmap),
+        "index_spec": manifest.get("index", "flat"),
+        "ids": ids,
+        "chunks": ChunkTexts(ids, offsets, blob),
+        "chunk_meta": dict(zip(ids.tolist(), chunk_meta)),
+        "embeddings": np.load(paths["vectors"], mmap_mode=mmap_mode),
+    }
+
+
+def _read_index(path: Path, manifest: Dict, mmap: bool):
+    if not mmap:
+        return faiss.read_index(str(path))  # FAISS needs a string path
+    # IVF inverted lists and flat / HNSW codes are mapped by different IO flags
+    if manifest.get("index_class", "").startswith("IndexIVF"):
+        flags = faiss.IO_FLAG_MMAP
+    else:
+        flags = faiss.IO_FLAG_MMAP_IFC
+    return faiss.read_index(str(path), flags | faiss.IO_FLAG_READ_ONLY)
+
+
+class ChunkTexts(Mapping):
+    """Read-only {chunk id: text} view over the (memory-mapped) text blob"""
+
+    def __init__(self, ids: np.ndarray, offsets: np.ndarray, blob):
+        self._ids = ids
+        self._order = np.argsort(ids)  # id -> row by binary search, no per-process dict
+        self._sorted_ids = ids[self._order]
+        self._offsets = offsets
+        self._blob = blob
+
+    def __getitem__(self, cid):
+        position = int(np.searchsorted(self._sorted_ids, cid))
+        if position == len(self._sorted_ids) or self._sorted_ids[position] != cid:
+            raise KeyError(cid)
+        row = self._order[position]
+        return bytes(self._blob[self._offsets[row]:self._offsets[row + 1]]).decode("utf-8")
+
+    def __iter__(self):
+        return iter(self._ids.tolist())
+
+    def __len__(self):
+        return len(self._ids)
+
+
+def _encode(embedding_model, chunks: List[str]) -> np.ndarray:
+    embeddings = embedding_model.encode(chunks, convert_to_numpy=True, show_progress_bar=len(chunks) > 32)
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def _split_chunks(chunks: List[Dict]):
+    """chunk dicts -> (ids, texts, metadata without text)"""
+    ids = [chunk_id(chunk["text"]) for chunk in chunks]
+    texts = [chunk["text"] for chunk in chunks]
+    metadata = [{key: value for key, value in chunk.items() if key != "text"} for chunk in chunks]
+    return ids, texts, metadata
+
+
+def _full_rebuild(text: str, corpus_sha256: str, embedding_model, model_name: str, index_spec: str,
+                  paths: Dict) -> Dict:
+    chunk_ids, chunks, metadata = _split_chunks(chunk_corpus(text))
+    print(f"   ✅ Split into {len(chunks)} chunks")
+
+    ids = np.array(chunk_ids, dtype=np.int64)
+    embeddings = _encode(embedding_model, chunks)
+
+    # ID-mapped so chunks can later be removed / added individually
+    index = build_index(embeddings, ids, index_spec)
+    print(f"   ✅ FAISS vector database created ({index_spec})")
+
+    store = {
+        "index": index,
+        "index_spec": index_spec,
+        "ids": ids,
+        "chunks": dict(zip(chunk_ids, chunks)),
+        "chunk_meta": dict(zip(chunk_ids, metadata)),
+        "embeddings": embeddings,
+    }
+    _save_store(store, corpus_sha256, model_name, paths)
+    return store
+
+
+def _incremental_update(store: Dict, text: str, corpus_sha256: str, embedding_model, model_name: str,
+                        paths: Dict) -> Dict:
+    new_ids, chunks, metadata = _split_chunks(chunk_corpus(text))
+    old_rows = {chunk_id_: row for row, chunk_id_ in enumerate(store["ids"].tolist())}
+
+    added = [(cid, chunk) for cid, chunk in zip(new_ids, chunks) if cid not in old_rows]
+    removed = sorted(set(old_rows) - set(new_ids))
+    print(f"   🔄 Knowledge base changed: +{len(added)} / -{len(removed)} chunks "
+          f"({len(chunks) - len(added)} reused)")
+
+    in_place = is_flat_index(store["index"])
+    if removed and in_place:
+        store["index"].remove_ids(np.array(removed, dtype=np.int64))
+
+    added_embeddings = {}
+    if added:
+        embeddings = _encode(embedding_model, [chunk for _, chunk in added])
+        if in_place:
+            store["index"].add_with_ids(embeddings, np.array([cid for cid, _ in added], dtype=np.int64))
+        added_embeddings = {cid: row for (cid, _), row in zip(added, embeddings)}
+
+    # Keep metadata rows in corpus order
+    store["ids"] = np.array(new_ids, dtype=np.int64)
+    store["chunks"] = dict(zip(new_ids, chunks))
+    store["chunk_meta"] = dict(zip(new_ids, metadata))
+    store["embeddings"] = np.stack([
+        added_embeddings[cid] if cid in added_embeddings else store["embeddings"][old_rows[cid]]
+        for cid in new_ids
+    ]).astype(np.float32)
+    if not in_place:
+        # Centroids / codebooks trained on the old corpus would drift
+        store["index"] = build_index(store["embeddings"], store["ids"], store["index_spec"])
+
+    _save_store(store, corpus_sha256, model_name, paths)
+    return store
+
+
+def _save_store(store: Dict, corpus_sha256: str, model_name: str, paths: Dict):
+    """Writes the store files, then the manifest (last, so a crash leaves a stale manifest)"""
+    ids = store["ids"].tolist()
+    chunks = [store["chunks"][cid] for cid in ids]
+    encoded = [chunk.encode("utf-8") for chunk in chunks]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(chunk) for chunk in encoded])
+
+    _atomic_write(paths["index"], lambda tmp: faiss.write_index(store["index"], str(tmp)))
+    _atomic_write(paths["vectors"], lambda tmp: _npy_dump(np.ascontiguousarray(store["embeddings"]), tmp))
+    _atomic_write(paths["ids"], lambda tmp: _npy_dump(store["ids"], tmp))
+    _atomic_write(paths["offsets"], lambda tmp: _npy_dump(offsets, tmp))
+    _atomic_write(paths["texts"], lambda tmp: tmp.write_bytes(b"".join(encoded)))
+    _atomic_write(paths["chunk_meta"], lambda tmp: tmp.write_text(
+        json.dumps([store["chunk_meta"][cid] for cid in ids], ensure_ascii=False), encoding="utf-8"
+    ))
+
+    manifest = {
+        "model": model_name,
+        "chunker": CHUNKER_CONFIG,
+        "format": STORE_FORMAT,
+        "index": store["index_spec"],
+        "index_class": type(faiss.downcast_index(store["index"].index)).__name__,
+        "dim": int(store["embeddings"].shape[1]),
+        "corpus_sha256": corpus_sha256,
+        "num_chunks": len(ids),
+        "files": {name: file_sha256(paths[name]) for name in STORE_FILES},
+        "file_stats": {name: file_stat(paths[name]) for name in STORE_FILES},
+    }
+    _atomic_write(paths["manifest"], lambda tmp: tmp.write_text(json.dumps(manifest, indent=1), encoding="utf-8"))
+    print("   💾 Saved FAISS index, embeddings and manifest")
+
+    # Pickled store from before STORE_FORMAT 2
+    legacy = paths["manifest"].with_name("vector_meta.pkl")
+    if legacy.exists():
+        legacy.unlink()
+
+
+def _npy_dump(array: np.ndarray, path: Path):
+    with open(path, "wb") as f:  # a file object stops np.save appending ".npy"
+        np.save(f, array)
+
+
+def _atomic_write(path: Path, write):
+    tmp = path.with_name(path.name + ".tmp")
+    write(tmp)
+    os.replace(tmp, path)
+
+
+# ==========================================
+# Metadata pre-filtering (sport / injuries)
+# ==========================================
+def retrieval_scope(user_profile) -> Optional[Tuple[str, Tuple[str, ...]]]:
+    """Hashable (sport, injury terms) key for ScopedSearcher, None without a profile"""
+    if not user_profile:
+        return None
+    return normalize_sport(user_profile.sport), injury_terms(user_profile.injuries)
+
+
+class ScopedSearcher:
+    """
+    index.search restricted to the chunks relevant to an athlete:
+    every chunk of their sport, plus injury chunks (any sport) mentioning
+    one of their injury terms, plus chunks not tied to a sport.
+    Sports missing from the corpus fall back to searching everything.
+    The FAISS ID selector for each scope is built once and cached.
+    """
+
+    def __init__(self, store: Dict, max_cached_scopes=256):
+        self.store = store
+        self.max_cached_scopes = max_cached_scopes
+        self._params: "OrderedDict[tuple, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def scope_ids(self, scope) -> Optional[np.ndarray]:
+        """Chunk ids searched for this scope, or None to search the whole index"""
+        if scope is None:
+            return None
+        sport, injury_terms = scope
+        metadata = self.store["chunk_meta"]
+        if not any((meta["sport"] or "").lower() == sport for meta in metadata.values()):
+            return None
+
+        ids = []
+        for cid, meta in metadata.items():
+            chunk_sport = (meta["sport"] or "").lower()
+            if chunk_sport == sport or not chunk_sport:
+                ids.append(cid)
+            elif meta["kind"] == "injury" and injury_terms:
+                words = set(re.findall(r"[a-z]+", self.store["chunks"][cid].lower()))
+                if words.intersection(injury_terms):
+                    ids.append(cid)
+        return np.array(ids, dtype=np.int64)
+
+    def search(self, matrix: np.ndarray, k: int, scope=None):
+        """Same return value as index.search, restricted to the scope's chunks"""
+        params = self._scoped(scope)[1]
+        if params is None:
+            return self.store["index"].search(matrix, k)
+        return self.store["index"].search(matrix, k, params=params)
+
+    def allowed_ids(self, scope) -> Optional[np.ndarray]:
+        """Cached scope_ids (None = everything), e.g. to filter BM25 results"""
+        return self._scoped(scope)[0]
+
+    def _scoped(self, scope):
+        """(chunk ids, FAISS search params) for a scope, built once"""
+        if scope is None:
+            return None, None
+        with self._lock:
+            if scope in self._params:
+                self._params.move_to_end(scope)
+                return self._params[scope]
+
+        ids = self.scope_ids(scope)
+        params = None
+        index = self.store["index"]
+        if ids is not None and len(ids) < index.ntotal:
+            params = search_parameters(index, faiss.IDSelectorBatch(ids), len(ids) / index.ntotal)
+
+        with self._lock:
+            self._params[scope] = (ids, params)
+            while len(self._params) > self.max_cached_scopes:
+                self._params.popitem(last=False)
+        return ids, params
@@ -0,0 +1,140 @@
+import re
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+# ==========================================
+# BM25 inverted index + hybrid fusion
+# ==========================================
+# Queries that name an exact sport, injury or exercise ("rotator cuff",
+# "ACL", "cricket bowler") are matched at least as well by keywords as by
+# MiniLM, for a fraction of the cost. The BM25 index covers the same chunks
+# as the FAISS store (built from it in memory at load, ~tens of ms) and is
+# used two ways (config.RETRIEVAL_MODE):
+#
+# - "hybrid": lexical and vector rankings merged by reciprocal-rank fusion
+# - "fast":   like hybrid, but when the lexical result is confident (the
+#             top chunk covers the query's informative terms and scores
+#             well) the query embedding is skipped entirely
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from has have how i if in into is it its me my
+of on or should so than that the their them then there these they this to was we what when
+where which who why will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords, plural "s" stripped ("bowlers" -> "bowler")"""
+    tokens = []
+    for word in TOKEN_RE.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 4 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[int]], k: int = 60) -> np.ndarray:
+    """Ids ordered by sum(1 / (k + rank)) over the rankings (-1 padding ignored)"""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, cid in enumerate(int(cid) for cid in ranking):
+            if cid >= 0:
+                scores[cid] = scores.get(cid, 0.0) + 1.0 / (k + rank + 1)
+    return np.array(sorted(scores, key=scores.get, reverse=True), dtype=np.int64)
+
+
+class LexicalHits:
+    """
+    BM25 result: chunk ids and scores (best first) and coverage, the
+    idf-weighted share of the query terms found in the top chunk (terms
+    missing from the corpus count as unmatched)
+    """
+
+    __slots__ = ("ids", "scores", "coverage")
+
+    def __init__(self, ids: np.ndarray, scores: np.ndarray, coverage: float):
+        self.ids = ids
+        self.scores = scores
+        self.coverage = coverage
+
+    def confident(self, min_coverage: float, min_score: float) -> bool:
+        """Good enough to skip the vector search"""
+        return len(self.ids) > 0 and self.coverage >= min_coverage and float(self.scores[0]) >= min_score
+
+
+class BM25Index:
+    """
+    Okapi BM25 over chunk texts. Postings hold each (term, chunk) weight
+    precomputed, so a query is a handful of numpy scatter-adds.
+    ids are the chunk ids in corpus order (store["ids"]).
+    """
+
+    def __init__(self, ids: Sequence[int], texts: Sequence[str], k1: float = 1.2, b: float = 0.75):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        docs = [tokenize(text) for text in texts]
+        lengths = np.array([len(doc) for doc in docs], dtype=np.float32)
+        norm = k1 * (1 - b + b * lengths / max(float(lengths.mean()) if len(docs) else 1.0, 1e-6))
+
+        counts: Dict[str, Dict[int, int]] = {}
+        for row, doc in enumerate(docs):
+            for term in doc:
+                postings = counts.setdefault(term, {})
+                postings[row] = postings.get(row, 0) + 1
+
+        n = len(docs)
+        self.idf: Dict[str, float] = {}
+        self.postings: Dict[str, tuple] = {}
+        for term, postings in counts.items():
+            idf = float(np.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5)))
+            rows = np.fromiter(postings.keys(), dtype=np.int64, count=len(postings))
+            tf = np.fromiter(postings.values(), dtype=np.float32, count=len(postings))
+            self.idf[term] = idf
+            self.postings[term] = (rows, (idf * tf * (k1 + 1) / (tf + norm[rows])).astype(np.float32))
+        self.max_idf = max(self.idf.values(), default=1.0)
+
+        order = np.argsort(self.ids)
+        self._order, self._sorted_ids = order, self.ids[order]
+
+    @classmethod
+    def from_store(cls, store: Dict) -> "BM25Index":
+        """Index over the chunks of a knowledge-base store (load_or_build_knowledge_base)"""
+        ids = np.asarray(store["ids"])
+        return cls(ids, [store["chunks"][cid] for cid in ids.tolist()])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query: str, k: int, allowed_ids: Optional[np.ndarray] = None) -> LexicalHits:
+        """Top-k chunks with a positive score, restricted to allowed_ids when given"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in terms:
+            if term in self.postings:
+                rows, weights = self.postings[term]
+                scores[rows] += weights
+        if allowed_ids is not None:
+            mask = np.zeros(len(self.ids), dtype=bool)
+            mask[self._order[np.searchsorted(self._sorted_ids, allowed_ids)]] = True
+            scores[~mask] = 0.0
+
+        k = min(k, int(np.count_nonzero(scores)))
+        if k <= 0:
+            return LexicalHits(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32), 0.0)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return LexicalHits(self.ids[top], scores[top], self._coverage(terms, int(top[0])))
+
+    def _coverage(self, terms: List[str], row: int) -> float:
+        total = matched = 0.0
+        for term in terms:
+            idf = self.idf.get(term, self.max_idf)
+            total += idf
+            if term in self.postings:
+                rows = self.postings[term][0]
+                if np.any(rows == row):
+                    matched += idf
+        return matched / total if total else 0.0
@@ -0,0 +1,341 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Callable, Dict, Optional
+
+import numpy as np
+
+from app import config
+from app.llm_providers import LLMProvider
+from app.prompts import PromptPrefix, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# LLM context caching
+# ==========================================
+# The prompt prefix (system instruction + athlete profile) is the same on
+# every request of an athlete in one mode. A provider-side context cache
+# would serve it at cached-token prices and skip its prefill, but the
+# prefix is only ~200 tokens, far below the minimum explicit caching
+# accepts (Gemini: 4096), and the large part of the prompt (retrieved
+# knowledge) changes per request. So no explicit cache is created;
+# cached tokens a provider reports on its own (implicit caching) are
+# still counted by PromptLLM.
+#
+# COACH_LLM_CONTEXT_CACHE:
+#   "off":    full prompt every time (default)
+#   "local":  full prompt every time, but records which requests a provider
+#             cache would have served: an offline stand-in for tests and
+#             benchmarks
+
+
+class LocalContextCache:
+    """
+    Offline stand-in for provider context caching: entries are prefix keys
+    with an expiry and an LRU bound, like provider caches, but nothing is
+    uploaded and the whole prompt is still sent. Hits count the requests a
+    provider cache would serve; prefixes under min_tokens never qualify.
+    """
+
+    def __init__(self, ttl_seconds: int = 3600, max_entries: int = 256, min_tokens: int = 0):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.min_tokens = min_tokens
+        self._entries: "OrderedDict[str, float]" = OrderedDict()  # prefix key -> expiry
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.too_small = 0
+
+    def lookup(self, prefix: PromptPrefix) -> bool:
+        """True if a provider cache would have served this prefix"""
+        if prefix.tokens < self.min_tokens:
+            with self._lock:
+                self.too_small += 1
+            return False
+
+        now = time.time()
+        with self._lock:
+            expiry = self._entries.get(prefix.key)
+            if expiry is not None and expiry > now:
+                self._entries.move_to_end(prefix.key)
+                self.hits += 1
+                return True
+            self.misses += 1
+            self._entries[prefix.key] = now + self.ttl_seconds
+            self._entries.move_to_end(prefix.key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "too_small": self.too_small,
+            }
+
+
+def make_context_cache(kind: str = None):
+    kind = kind or config.LLM_CONTEXT_CACHE
+    if kind == "off":
+        return None
+    if kind == "local":
+        return LocalContextCache(ttl_seconds=config.LLM_CONTEXT_CACHE_TTL_SECONDS,
+                                 max_entries=config.LLM_CONTEXT_CACHE_SIZE)
+    raise ValueError(f"Unknown LLM context cache {kind!r}, expected off or local")
+
+
+# ==========================================
+# Deadlines, retries and hedging
+# ==========================================
+class CallPolicy:
+    """
+    Wraps each LLM call (one attempt = one provider call):
+
+    - timeout_s: deadline per attempt
+    - max_retries: transient failures (deadlines, 429 / 5xx, dropped
+      connections) are retried up to this many times, after a backoff of
+      backoff_ms * 2**retry (capped at max_backoff_ms) with full jitter, so
+      clients retrying together don't stampede the provider
+    - hedge (async calls only): if an attempt hasn't returned after the
+      hedge delay, a second one is fired and whichever finishes first wins
+      (the other is cancelled). The delay is hedge_delay_ms when set,
+      otherwise the p95 of recent attempt latencies once hedge_min_samples
+      are known; about 5% of requests then pay for a second call.
+
+    Streams get deadlines and retries up to the first chunk, not hedging:
+    a second stream would double the tokens generated.
+    """
+
+    def __init__(self, timeout_s: float = None, max_retries: int = None, backoff_ms: float = None,
+                 max_backoff_ms: float = None, hedge: bool = None, hedge_delay_ms: float = None,
+                 hedge_min_samples: int = None, window: int = 512, seed: Optional[int] = None):
+        self.timeout_s = config.LLM_TIMEOUT_SECONDS if timeout_s is None else timeout_s
+        self.max_retries = config.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_ms = config.LLM_RETRY_BACKOFF_MS if backoff_ms is None else backoff_ms
+        self.max_backoff_ms = config.LLM_RETRY_MAX_BACKOFF_MS if max_backoff_ms is None else max_backoff_ms
+        self.hedge = config.LLM_HEDGE if hedge is None else hedge
+        self.hedge_delay_ms = config.LLM_HEDGE_DELAY_MS if hedge_delay_ms is None else hedge_delay_ms
+        self.hedge_min_samples = config.LLM_HEDGE_MIN_SAMPLES if hedge_min_samples is None else hedge_min_samples
+        self._latencies = deque(maxlen=window)  # seconds, successful attempts
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None when hedging is off / not calibrated yet"""
+        if not self.hedge:
+            return None
+        if self.hedge_delay_ms:
+            return self.hedge_delay_ms / 1000
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None
+            return float(np.percentile(self._latencies, 95))
+
+    def _backoff(self, retry: int) -> float:
+        with self._lock:
+            return self._rng.uniform(0, min(self.max_backoff_ms, self.backoff_ms * 2 ** retry)) / 1000
+
+    def _started(self):
+        with self._lock:
+            self.attempts += 1
+
+    def _observe(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def _failed(self, error: BaseException, retry: int, is_transient: Callable) -> bool:
+        """Counts the failure; True if the call should be retried"""
+        retrying = retry < self.max_retries and is_transient(error)
+        with self._lock:
+            self.timeouts += isinstance(error, TimeoutError)
+            if retrying:
+                self.retries += 1
+            else:
+                self.failures += 1
+        if retrying:
+            logger.warning(f"⚠️ LLM attempt failed ({type(error).__name__}: {error}), retrying")
+        return retrying
+
+    def call(self, attempt: Callable, is_transient: Callable):
+        """attempt(timeout) -> result, with retries"""
+        with self._lock:
+            self.calls += 1
+        for retry in range(self.max_retries + 1):
+            self._started()
+            start = time.perf_counter()
+            try:
+                result = attempt(self.timeout_s)
+            except Exception as e:
+                if not self._failed(e, retry, is_transient):
+                    raise
+                time.sleep(self._backoff(retry))
+                continue
+            self._observe(time.perf_counter() - start)
+            return result
+
+    async def acall(self, attempt: Callable, is_transient: Callable, hedge: bool = True):
+        """await attempt(timeout) -> result, with retries and (if hedge) hedging"""
+        with self._lock:
+            self.calls += 1
+        for retry in range(self.max_retries + 1):
+            try:
+                return await (self._hedged(attempt) if hedge else self._attempt(attempt))
+            except Exception as e:
+                if not self._failed(e, retry, is_transient):
+                    raise
+                await asyncio.sleep(self._backoff(retry))
+
+    async def _attempt(self, attempt: Callable):
+        self._started()
+        start = time.perf_counter()
+        result = await asyncio.wait_for(attempt(self.timeout_s), self.timeout_s)
+        self._observe(time.perf_counter() - start)
+        return result
+
+    async def _hedged(self, attempt: Callable):
+        delay = self.hedge_delay()
+        if delay is None or delay >= self.timeout_s:
+            return await self._attempt(attempt)
+
+        first = asyncio.ensure_future(self._attempt(attempt))
+        pending = {first}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return first.result()
+            with self._lock:
+                self.hedges += 1
+            pending.add(asyncio.ensure_future(self._attempt(attempt)))
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            with self._lock:
+                                self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict:
+        delay = self.hedge_delay()
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            return {
+                "calls": self.calls,
+                "attempts": self.attempts,
+                "retries": self.retries,
+                "timeouts": self.timeouts,
+                "failures": self.failures,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "hedge_delay_ms": round(delay * 1000, 1) if delay is not None else None,
+                "p50_ms": round(float(np.percentile(latencies, 50)), 1) if len(latencies) else None,
+                "p95_ms": round(float(np.percentile(latencies, 95)), 1) if len(latencies) else None,
+            }
+
+
+# ==========================================
+# Prefix-aware generation
+# ==========================================
+class PromptLLM:
+    """
+    Generates from (prefix, suffix) prompts, sent as one prompt, under the
+    CallPolicy's deadlines, retries and hedging. Accounts input tokens per
+    request and how many came from a cache (provider-reported, or the
+    "local" stand-in's estimate); latency saved is estimated from
+    prefill_ms_per_1k_tokens (COACH_LLM_PREFILL_MS_PER_1K_TOKENS).
+    max_output_tokens caps every answer (None = provider default).
+    """
+
+    def __init__(self, provider: LLMProvider, context_cache=None, prefill_ms_per_1k_tokens: float = None,
+                 policy: CallPolicy = None, max_output_tokens: int = None):
+        self.provider = provider
+        self.context_cache = context_cache
+        self.policy = policy or CallPolicy()
+        self.max_output_tokens = max_output_tokens or None
+        self.prefill_ms_per_1k_tokens = (
+            config.LLM_PREFILL_MS_PER_1K_TOKENS if prefill_ms_per_1k_tokens is None else prefill_ms_per_1k_tokens
+        )
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.input_tokens = 0
+        self.cached_input_tokens = 0
+
+    def _route(self, prefix: PromptPrefix, suffix: str):
+        """(provider, prompt contents, tokens expected from the cache)"""
+        hit = self.context_cache is not None and self.context_cache.lookup(prefix)
+        return self.provider, prefix.text + suffix, prefix.tokens if hit else 0
+
+    def _account(self, prefix: PromptPrefix, suffix: str, cached_tokens: int, response=None):
+        usage = getattr(response, "usage_metadata", None)
+        reported = getattr(usage, "cached_content_token_count", None) if usage is not None else None
+        if reported:  # provider-reported count wins over the estimate
+            cached_tokens = reported
+        with self._lock:
+            self.requests += 1
+            self.input_tokens += prefix.tokens + estimate_tokens(suffix)
+            self.cached_input_tokens += cached_tokens
+
+    def generate(self, prefix: PromptPrefix, suffix: str) -> str:
+        provider, contents, cached_tokens = self._route(prefix, suffix)
+        response = self.policy.call(lambda timeout: provider.generate(contents, timeout, self.max_output_tokens),
+                                    provider.is_transient)
+        self._account(prefix, suffix, cached_tokens, response)
+        return response.text
+
+    async def agenerate(self, prefix: PromptPrefix, suffix: str) -> str:
+        provider, contents, cached_tokens = self._route(prefix, suffix)
+        response = await self.policy.acall(
+            lambda timeout: provider.agenerate(contents, timeout, self.max_output_tokens), provider.is_transient
+        )
+        self._account(prefix, suffix, cached_tokens, response)
+        return response.text
+
+    async def astream(self, prefix: PromptPrefix, suffix: str) -> AsyncIterator[str]:
+        provider, contents, cached_tokens = self._route(prefix, suffix)
+        response = await self.policy.acall(
+            lambda timeout: provider.astream(contents, timeout, self.max_output_tokens), provider.is_transient,
+            hedge=False
+        )
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+        self._account(prefix, suffix, cached_tokens, response)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            requests = self.requests
+            saved_per_request = self.cached_input_tokens / requests if requests else 0.0
+            stats = {
+                "requests": requests,
+                "input_tokens": self.input_tokens,
+                "cached_input_tokens": self.cached_input_tokens,
+                "input_tokens_saved_per_request": round(saved_per_request, 1),
+                "est_latency_saved_ms_per_request": round(saved_per_request / 1000 * self.prefill_ms_per_1k_tokens, 2),
+            }
+        stats["context_cache"] = self.context_cache.stats() if self.context_cache else "off"
+        stats["provider"] = self.provider.name
+        stats["model"] = self.provider.model_name
+        stats["max_output_tokens"] = self.max_output_tokens
+        stats["calls"] = self.policy.stats()
+        return stats
@@ -0,0 +1,239 @@
+"""
+LLM providers behind CoachCarterAI (COACH_LLM_PROVIDER):
+
+- gemini: Google Gemini (needs GEMINI_API_KEY)
+- stub:   deterministic local stand-in with a configurable latency
+          distribution and output, for tests, benchmarks and running the
+          server without an API key
+
+A provider takes prompt contents and returns a response with .text (plus
+.usage_metadata when the provider reports token counts). astream() returns
+once the first chunk is available and yields chunks with .text. timeout
+is the deadline for one call in seconds; retries and hedging are layered
+on top by llm.CallPolicy, so providers make exactly one attempt.
+max_output_tokens caps the length of one answer (None = provider default);
+quick tips set it, see config.QUICK_TIP_MAX_OUTPUT_TOKENS.
+"""
+import asyncio
+import math
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+
+from app import config
+
+
+class LLMProvider(ABC):
+    """Interface: one generation attempt per call (a provider missing a method fails when built)"""
+
+    name = "base"
+    model_name = ""
+
+    @abstractmethod
+    def generate(self, contents, timeout: float = None, max_output_tokens: int = None):
+        ...
+
+    @abstractmethod
+    async def agenerate(self, contents, timeout: float = None, max_output_tokens: int = None):
+        ...
+
+    @abstractmethod
+    async def astream(self, contents, timeout: float = None, max_output_tokens: int = None):
+        """Awaiting returns once the first chunk is available; iterate for the chunks"""
+
+    def is_transient(self, error: BaseException) -> bool:
+        """Worth retrying: deadlines and dropped connections"""
+        return isinstance(error, (TimeoutError, ConnectionError))
+
+
+# ==========================================
+# Gemini
+# ==========================================
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, model_name: str = "gemini-2.0-flash", generation_config=None, model=None):
+        import google.generativeai as genai
+
+        if model is None:
+            from dotenv import load_dotenv
+
+            load_dotenv()
+            api_key = os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                raise ValueError("❌ GEMINI_API_KEY not found in .env")
+            genai.configure(api_key=api_key)
+            print(f"✅ Google API key loaded: {api_key[:10]}...")
+            model = genai.GenerativeModel(model_name, generation_config=generation_config)
+        self.model = model
+        self.model_name = model.model_name
+        self.generation_config = generation_config
+
+    @staticmethod
+    def _request_options(timeout):
+        # The SDK's own retry is disabled: CallPolicy retries, with jitter
+        return {"timeout": timeout, "retry": None} if timeout else {"retry": None}
+
+    @staticmethod
+    def _generation_config(max_output_tokens):
+        # Per-request override, merged by the SDK with the model's own config
+        return {"max_output_tokens": max_output_tokens} if max_output_tokens else None
+
+    def generate(self, contents, timeout=None, max_output_tokens=None):
+        return self.model.generate_content(
+            contents, generation_config=self._generation_config(max_output_tokens),
+            request_options=self._request_options(timeout)
+        )
+
+    async def agenerate(self, contents, timeout=None, max_output_tokens=None):
+        return await self.model.generate_content_async(
+            contents, generation_config=self._generation_config(max_output_tokens),
+            request_options=self._request_options(timeout)
+        )
+
+    async def astream(self, contents, timeout=None, max_output_tokens=None):
+        return await self.model.generate_content_async(
+            contents, stream=True, generation_config=self._generation_config(max_output_tokens),
+            request_options=self._request_options(timeout)
+        )
+
+    def is_transient(self, error):
+        from google.api_core import exceptions
+
+        return super().is_transient(error) or isinstance(error, (
+            exceptions.TooManyRequests, exceptions.ResourceExhausted, exceptions.InternalServerError,
+            exceptions.ServiceUnavailable, exceptions.GatewayTimeout, exceptions.DeadlineExceeded,
+        ))
+
+
+# ==========================================
+# Local stub
+# ==========================================
+class StubUnavailable(ConnectionError):
+    """Injected transient failure (failure_rate)"""
+
+
+class StubProvider(LLMProvider):
+    """
+    Sleeps instead of calling the network, then returns fixed text, so
+    tests and benchmarks measure our own pipeline. Latencies come from a
+    seeded generator, so a run is reproducible for a given call order:
+
+    - latency_ms: median generation time
+    - distribution: "fixed" or "lognormal" (spread set by sigma)
+    - slow_rate / slow_factor: share of calls that take slow_factor times
+      longer, the occasional slow generation that dominates p99
+    - failure_rate: share of calls that fail with StubUnavailable
+    - ms_per_token: decode time added per output token (~4 characters),
+      so capping max_output_tokens shortens the call like it does on a
+      real model; the text is cut at the cap
+
+    Streams spread the latency evenly over one chunk per line.
+    """
+
+    name = "stub"
+    model_name = "stub"
+
+    DEFAULT_TEXT = (
+        "## Program Overview\n"
+        "Week 1: Squat 3x8, Deadlift 3x5, Push-Ups 3x12, Plank 3x45s.\n"
+        "Week 2: Lunges 3x10, Pull-Ups 3x6, Glute Bridge 3x12.\n"
+    )
+
+    def __init__(self, latency_ms: float = 500.0, distribution: str = "lognormal", sigma: float = 0.25,
+                 slow_rate: float = 0.0, slow_factor: float = 10.0, failure_rate: float = 0.0,
+                 text: str = None, seed: int = 0, ms_per_token: float = 0.0):
+        if distribution not in ("fixed", "lognormal"):
+            raise ValueError(f"Unknown stub latency distribution {distribution!r}, expected fixed or lognormal")
+        self.latency_ms = latency_ms
+        self.distribution = distribution
+        self.sigma = sigma
+        self.slow_rate = slow_rate
+        self.slow_factor = slow_factor
+        self.failure_rate = failure_rate
+        self.ms_per_token = ms_per_token
+        self.text = text or self.DEFAULT_TEXT
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _output(self, max_output_tokens):
+        return self.text[:max_output_tokens * 4] if max_output_tokens else self.text
+
+    def _draw(self, output=""):
+        """(latency in seconds, fails) for the next call"""
+        with self._lock:
+            self.calls += 1
+            latency = self.latency_ms / 1000
+            if self.distribution == "lognormal":
+                latency *= self._rng.lognormvariate(0.0, self.sigma)
+            if self._rng.random() < self.slow_rate:
+                latency *= self.slow_factor
+            latency += self.ms_per_token * math.ceil(len(output) / 4) / 1000
+            return latency, self._rng.random() < self.failure_rate
+
+    @staticmethod
+    def _response(output, fails):
+        if fails:
+            raise StubUnavailable("stub LLM unavailable (injected failure)")
+        return SimpleNamespace(text=output, usage_metadata=None)
+
+    @staticmethod
+    def _deadline(latency, timeout):
+        """Time to wait before answering or timing out"""
+        return min(latency, timeout) if timeout else latency
+
+    @staticmethod
+    def _check(latency, timeout):
+        if timeout and latency > timeout:
+            raise TimeoutError(f"stub LLM exceeded its {timeout:.3f}s deadline")
+
+    def generate(self, contents, timeout=None, max_output_tokens=None):
+        output = self._output(max_output_tokens)
+        latency, fails = self._draw(output)
+        time.sleep(self._deadline(latency, timeout))
+        self._check(latency, timeout)
+        return self._response(output, fails)
+
+    async def agenerate(self, contents, timeout=None, max_output_tokens=None):
+        output = self._output(max_output_tokens)
+        latency, fails = self._draw(output)
+        await asyncio.sleep(self._deadline(latency, timeout))
+        self._check(latency, timeout)
+        return self._response(output, fails)
+
+    async def astream(self, contents, timeout=None, max_output_tokens=None):
+        output = self._output(max_output_tokens)
+        latency, fails = self._draw(output)
+        lines = output.splitlines(keepends=True)
+        step = latency / len(lines)
+        await asyncio.sleep(self._deadline(step, timeout))
+        self._check(step, timeout)
+        self._response(output, fails)
+        return self._stream(lines, step)
+
+    @staticmethod
+    async def _stream(lines, step):
+        for i, line in enumerate(lines):
+            if i:
+                await asyncio.sleep(step)
+            yield SimpleNamespace(text=line)
+
+
+def make_provider(kind: str = None, model_name: str = None) -> LLMProvider:
+    """Provider for COACH_LLM_PROVIDER (gemini or stub), configured from app.config"""
+    kind = kind or config.LLM_PROVIDER
+    if kind == "gemini":
+        return GeminiProvider(model_name or config.LLM_MODEL)
+    if kind == "stub":
+        return StubProvider(
+            latency_ms=config.LLM_STUB_LATENCY_MS, distribution=config.LLM_STUB_DISTRIBUTION,
+            sigma=config.LLM_STUB_SIGMA, slow_rate=config.LLM_STUB_SLOW_RATE,
+            slow_factor=config.LLM_STUB_SLOW_FACTOR, failure_rate=config.LLM_STUB_FAILURE_RATE,
+            text=config.LLM_STUB_TEXT or None, seed=config.LLM_STUB_SEED,
+            ms_per_token=config.LLM_STUB_MS_PER_TOKEN,
+        )
+    raise ValueError(f"Unknown LLM provider {kind!r}, expected gemini or stub")
@@ -1,33 +1,47 @@
 import os
+import json
 import logging
-from typing import List
+from typing import List, Optional, Tuple
 
 # Load .env FIRST
 from dotenv import load_dotenv
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '../../.env'))
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from contextlib import asynccontextmanager
 
+from app import config
 from app.schemas import UserQuery, AIResponse, ChatMode, RiskScoreItem, YouTubeLinkItem
 from app.athlete_profile import AthleteProfile, ProfileResponse
 from app.profile_service import profile_service
 from app.exercise_parser import extract_exercises
 from app.youtube_db import get_youtube_links
+from app.response_cache import profile_fingerprint
+from app.knowledge_base import retrieval_scope
+from app.metrics import cache_stats as metrics_cache_stats, count_error, render_metrics, stage, track_request
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Import AI modules
+# Import AI modules (cheap: models and the index load later, see lifespan)
 try:
-    from app.ai_engine import get_ai_response
+    from app.ai_engine import (
+        EngineUnavailable, aget_ai_response, astream_ai_response, coalescing_stats, engine_status,
+        prompt_cache_stats, response_cache_stats, retrieval_sidecar_stats, save_response_cache, start_engine,
+        wait_for_engine
+    )
     AI_ENGINE_AVAILABLE = True
 except ImportError as e:
     logger.warning(f"AI engine not available: {e}")
     AI_ENGINE_AVAILABLE = False
 
+    class EngineUnavailable(RuntimeError):
+        pass
+
 try:
     from app.risk_module import RiskAssessmentEngine
     RISK_MODULE_AVAILABLE = True
@@ -40,11 +54,16 @@ except ImportError as e:
 async def lifespan(app: FastAPI):
     """Manages application lifecycle."""
     logger.info("🚀 Coach Carter is starting up...")
+    if AI_ENGINE_AVAILABLE and config.ENGINE_PRELOAD:
+        # Loads in the background; /api/health/ready reports progress
+        start_engine()
     logger.info("✅ Startup complete")
     
     yield
     
     logger.info("👋 Coach Carter is shutting down...")
+    if AI_ENGINE_AVAILABLE:
+        save_response_cache()
     logger.info("✅ Cleanup complete")
 
 # Initialize FastAPI
@@ -85,16 +104,82 @@ def root():
         "team": "LATECOMERS"
     }
 
+def ai_engine_state() -> str:
+    return engine_status()["state"] if AI_ENGINE_AVAILABLE else "not loaded"
+
+def retrieval_sidecar_state() -> str:
+    if not config.RETRIEVAL_SIDECAR:
+        return "not configured"
+    stats = retrieval_sidecar_stats() if AI_ENGINE_AVAILABLE else None
+    if stats is None:
+        return "not loaded"
+    return "healthy" if stats["healthy"] else "down (retrieving in-process)"
+
 @app.get("/api/health")
 def health_check():
     """Health check for monitoring."""
     return {
         "status": "ok",
         "service": "Coach Carter",
-        "ai_engine": "ready" if AI_ENGINE_AVAILABLE else "not loaded",
+        "ai_engine": ai_engine_state(),
+        "retrieval_sidecar": retrieval_sidecar_state(),
+        "risk_module": "ready" if RISK_MODULE_AVAILABLE else "not loaded"
+    }
+
+@app.get("/api/health/live")
+def liveness_probe():
+    """Liveness: the process is up and serving (answers while the engine loads)."""
+    return {"status": "alive"}
+
+@app.get("/api/health/ready")
+def readiness_probe(response: Response):
+    """
+    Readiness: 200 once the AI engine is loaded and warmed up, 503 before.
+    Reports the loading stage, progress and per-stage timings.
+    """
+    engine = engine_status() if AI_ENGINE_AVAILABLE else {"state": "not loaded"}
+    ready = engine["state"] == "ready"
+    if not ready:
+        response.status_code = 503
+    return {
+        "status": "ready" if ready else "not ready",
+        "ai_engine": engine,
         "risk_module": "ready" if RISK_MODULE_AVAILABLE else "not loaded"
     }
 
+@app.get("/api/cache/stats")
+def cache_stats():
+    """
+    Response, profile and prompt prefix cache counters, LLM input tokens saved
+    per request, and calls saved by coalescing identical in-flight chats.
+    """
+    stats = response_cache_stats() if AI_ENGINE_AVAILABLE else None
+    prompt_stats = prompt_cache_stats() if AI_ENGINE_AVAILABLE else None
+    flight_stats = coalescing_stats() if AI_ENGINE_AVAILABLE else None
+    return {
+        "response_cache": stats if stats is not None else "not loaded",
+        "profile_cache": profile_service.cache_stats(),
+        "prompt_cache": prompt_stats if prompt_stats is not None else "not loaded",
+        "coalescing": flight_stats if flight_stats is not None else "not loaded",
+    }
+
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus scrape endpoint: per-stage and per-request latency histograms
+    by chat mode, in-flight gauges, error counters and cache hit ratios.
+    """
+    if not config.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (COACH_METRICS=0)")
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+if AI_ENGINE_AVAILABLE:
+    metrics_cache_stats.register("response", response_cache_stats)
+    metrics_cache_stats.register("prompt_prefix", lambda: (prompt_cache_stats() or {}).get("prefixes"))
+    metrics_cache_stats.register("coalescing", coalescing_stats, ratio_key="coalesced_rate")
+metrics_cache_stats.register("profile", lambda: profile_service.cache_stats())
+
 # ==========================================
 # --- PROFILE ENDPOINTS ---
 # ==========================================
@@ -144,12 +229,76 @@ def get_athlete_profile(user_id: str):
         logger.error(f"Error retrieving profile: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/profiles")
+def query_athlete_profiles(sport: Optional[str] = None, injury: Optional[str] = None,
+                           limit: int = Query(config.PROFILE_QUERY_LIMIT, ge=1, le=config.PROFILE_QUERY_MAX_LIMIT),
+                           offset: int = Query(0, ge=0)):
+    """
+    Roster query: athletes of a sport and/or with an injury (e.g. ?sport=cricket&injury=knee),
+    one page at a time; next_offset fetches the following page (null on the last one)
+    """
+    try:
+        profiles = profile_service.query_profiles(sport=sport, injury=injury, limit=limit + 1, offset=offset)
+        page = profiles[:limit]
+        return {
+            "count": len(page), "limit": limit, "offset": offset,
+            "next_offset": offset + limit if len(profiles) > limit else None,
+            "profiles": [profile.model_dump() for profile in page],
+        }
+    except Exception as e:
+        logger.error(f"Error querying profiles: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ==========================================
+# --- CHAT HELPERS ---
+# ==========================================
+
+def build_enrichment(ai_answer_text: str, user_profile) -> Tuple[List[RiskScoreItem], List[YouTubeLinkItem]]:
+    """Extracts exercises from the answer and scores risk + finds YouTube links"""
+    with stage("extraction"):
+        exercises = extract_exercises(ai_answer_text)
+    risk_scores = []
+    
+    # Calculate risk scores (ONLY if module available AND user has profile)
+    if RISK_MODULE_AVAILABLE and user_profile:
+        with stage("risk"):
+            scored = [exercise for exercise in exercises if exercise and exercise.strip()]
+            # One vectorized pass over all exercises (same scores as assess_exercise)
+            batch = RiskAssessmentEngine.assess_batch(scored, [{
+                'injuries': user_profile.injuries,
+                'goal': user_profile.goals[0] if user_profile.goals else 'general'
+            }])
+            risk_scores = [
+                RiskScoreItem(exercise=exercise, risk=int(risk), effectiveness=int(effectiveness))
+                for exercise, risk, effectiveness in zip(scored, batch.risk[:, 0], batch.effectiveness[:, 0])
+            ]
+    
+    # Get YouTube links for each exercise (OUTSIDE the if block!)
+    youtube_links = []
+    with stage("youtube"):
+        for exercise in exercises:
+            if exercise and exercise.strip():  # Make sure exercise name is NOT empty
+                links = get_youtube_links(exercise)
+                if links and len(links) > 0:  # Make sure links exist
+                    youtube_links.append(
+                        YouTubeLinkItem(
+                            exercise=exercise.strip(),  # Clean up whitespace
+                            url=links[0]  # First link
+                        )
+                    )
+    
+    return risk_scores, youtube_links
+
+def sse_event(event: str, data: dict) -> str:
+    """Formats one server-sent event frame"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 # ==========================================
 # --- CHAT ENDPOINT ---
 # ==========================================
 
 @app.post("/api/chat", response_model=AIResponse)
-def chat_endpoint(query: UserQuery):
+async def chat_endpoint(query: UserQuery):
     """
     Main chat endpoint for Coach Carter.
     
@@ -160,100 +309,111 @@ def chat_endpoint(query: UserQuery):
     - YouTube tutorials
     
     Uses athlete profile for context if available.
+    Async end to end: retrieval runs on the engine's pool and generation
+    awaits Gemini, so slow LLM calls don't hold a worker thread.
+    Per-stage timings go to /metrics.
     """
-    try:
-        logger.info(f"Received query from user {query.user_id}: {query.text[:50]}...")
-        
-        # Check if AI engine is available
-        if not AI_ENGINE_AVAILABLE:
-            logger.warning("AI engine not loaded, returning mock response")
-            return AIResponse(
-                response_text=f"[MOCK] Response for '{query.text}' in {query.mode.value} mode.",
-                risk_scores=[
-                    RiskScoreItem(exercise="Deadlift", risk=6, effectiveness=9),
-                    RiskScoreItem(exercise="Squat", risk=4, effectiveness=9)
-                ],
-                youtube_links=[]
-            )
-        
-        # Get user's profile for context
-        user_profile = profile_service.get_profile(query.user_id)
-        
-        # Prepare context with athlete profile
-        profile_context = ""
-        if user_profile:
-            profile_context = f"""
-ATHLETE PROFILE:
-- Name: {user_profile.name}
-- Sport: {user_profile.sport}
-- Age: {user_profile.age} years
-- Height: {user_profile.height_cm} cm
-- Weight: {user_profile.weight_kg} kg
-- Experience: {user_profile.experience_years} years
-- Goals: {', '.join(user_profile.goals)}
-- Training Duration: {user_profile.duration_weeks} weeks
-- Sessions/Week: {user_profile.sessions_per_week}
-- Equipment: {', '.join(user_profile.available_equipment) if user_profile.available_equipment else 'bodyweight only'}
-- Injuries: {', '.join(user_profile.injuries) if user_profile.injuries else 'none'}
-"""
-        
-        # Get AI response with profile context
-        ai_answer_text = get_ai_response(query.text, query.mode.value, profile_context)
-        
-        # Extract exercises and calculate risk
-        exercises = extract_exercises(ai_answer_text)
-        risk_scores = []
-        
-        # Calculate risk scores (ONLY if module available AND user has profile)
-        if RISK_MODULE_AVAILABLE and user_profile:
-            for exercise in exercises:
-                if not exercise or not exercise.strip():
-                    continue
-                    
-                assessment = RiskAssessmentEngine.assess_exercise(
-                    exercise,
-                    {
-                        'injuries': user_profile.injuries,
-                        'goal': user_profile.goals[0] if user_profile.goals else 'general'
-                    }
-                )
-                risk_scores.append(
-                    RiskScoreItem(
-                        exercise=assessment['exercise'],
-                        risk=assessment['risk'],
-                        effectiveness=assessment['effectiveness']
-                    )
+    with track_request("chat", query.mode.value):
+        try:
+            logger.info(f"Received query from user {query.user_id}: {query.text[:50]}...")
+            
+            # Check if AI engine is available
+            if not AI_ENGINE_AVAILABLE:
+                logger.warning("AI engine not loaded, returning mock response")
+                return AIResponse(
+                    response_text=f"[MOCK] Response for '{query.text}' in {query.mode.value} mode.",
+                    risk_scores=[
+                        RiskScoreItem(exercise="Deadlift", risk=6, effectiveness=9),
+                        RiskScoreItem(exercise="Squat", risk=4, effectiveness=9)
+                    ],
+                    youtube_links=[]
                 )
-        
-        # Get YouTube links for each exercise (OUTSIDE the if block!)
-        youtube_links = []
-        for exercise in exercises:
-            if exercise and exercise.strip():  # Make sure exercise name is NOT empty
-                links = get_youtube_links(exercise)
-                if links and len(links) > 0:  # Make sure links exist
-                    youtube_links.append(
-                        YouTubeLinkItem(
-                            exercise=exercise.strip(),  # Clean up whitespace
-                            url=links[0]  # First link
-                        )
-                    )
-        
-        # Assemble response
-        response = AIResponse(
-            response_text=ai_answer_text,
-            risk_scores=risk_scores,
-            youtube_links=youtube_links
-        )
-        
-        logger.info(f"✅ Successfully generated response for user {query.user_id}")
-        return response
-        
-    except ValueError as e:
-        logger.error(f"Validation error: {e}")
-        raise HTTPException(status_code=400, detail=f"Invalid input: {str(e)}")
-    except Exception as e:
-        logger.error(f"Error in /api/chat: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to generate response: {str(e)}")
+            
+            # Get user's profile for context
+            with stage("profile_load", mode=query.mode.value):
+                user_profile = await run_in_threadpool(profile_service.get_profile, query.user_id)
+            
+            # Get AI response with profile context (prompt prefix rendered once per profile version)
+            ai_answer_text = await aget_ai_response(
+                query.text, query.mode.value, user_profile, profile_fingerprint(user_profile),
+                retrieval_scope(user_profile)
+            )
+            
+            # Extract exercises, calculate risk and find tutorials
+            risk_scores, youtube_links = build_enrichment(ai_answer_text, user_profile)
+            
+            # Assemble response
+            response = AIResponse(
+                response_text=ai_answer_text,
+                risk_scores=risk_scores,
+                youtube_links=youtube_links
+            )
+            
+            logger.info(f"✅ Successfully generated response for user {query.user_id}")
+            return response
+            
+        except EngineUnavailable as e:
+            logger.error(f"AI engine unavailable: {e}")
+            raise HTTPException(status_code=503, detail=f"AI engine unavailable: {str(e)}")
+        except ValueError as e:
+            logger.error(f"Validation error: {e}")
+            raise HTTPException(status_code=400, detail=f"Invalid input: {str(e)}")
+        except Exception as e:
+            logger.error(f"Error in /api/chat: {e}", exc_info=True)
+            raise HTTPException(status_code=500, detail=f"Failed to generate response: {str(e)}")
+
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(query: UserQuery):
+    """
+    Streaming version of /api/chat (server-sent events).
+    
+    Emits:
+    - `chunk` events: {"text": "..."} as Gemini generates them
+    - one final `done` event: {"risk_scores": [...], "youtube_links": [...]}
+    - an `error` event instead of `done` if generation fails mid-stream
+    """
+    logger.info(f"Received streaming query from user {query.user_id}: {query.text[:50]}...")
+    
+    if not AI_ENGINE_AVAILABLE:
+        raise HTTPException(status_code=503, detail="AI engine not loaded")
+    try:
+        # Fail with a status code now rather than mid-stream
+        await wait_for_engine()
+    except EngineUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"AI engine unavailable: {str(e)}")
+    
+    mode = query.mode.value
+    
+    async def event_stream():
+        parts = []
+        with track_request("chat_stream", mode):
+            try:
+                with stage("profile_load", mode=mode):
+                    user_profile = await run_in_threadpool(profile_service.get_profile, query.user_id)
+                
+                async for text in astream_ai_response(
+                    query.text, mode, user_profile, profile_fingerprint(user_profile),
+                    retrieval_scope(user_profile)
+                ):
+                    parts.append(text)
+                    yield sse_event("chunk", {"text": text})
+                
+                risk_scores, youtube_links = build_enrichment("".join(parts), user_profile)
+                yield sse_event("done", {
+                    "risk_scores": [item.model_dump(mode="json") for item in risk_scores],
+                    "youtube_links": [item.model_dump(mode="json") for item in youtube_links]
+                })
+                logger.info(f"✅ Successfully streamed response for user {query.user_id}")
+            except Exception as e:
+                logger.error(f"Error in /api/chat/stream: {e}", exc_info=True)
+                count_error("chat_stream", mode, e)
+                yield sse_event("error", {"detail": f"Failed to generate response: {str(e)}"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # ==========================================
 # --- TEST ENDPOINT ---
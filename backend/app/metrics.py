@@ -0,0 +1,190 @@
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.process_collector import ProcessCollector
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# Prometheus metrics + per-request stage traces
+# ==========================================
+# track_request() wraps one chat request; stage() wraps one pipeline stage
+# (profile load, retrieval, generation, extraction, risk, YouTube lookup,
+# and the embedding / search steps underneath retrieval). Every stage is
+# observed into a histogram labelled by stage and chat mode, and appended
+# to the current request's trace (a contextvar, so concurrent requests on
+# the event loop keep separate traces). Stages run on worker threads have
+# no trace and are observed under mode "none".
+#
+# A request slower than COACH_SLOW_REQUEST_MS logs its stage breakdown.
+# A span costs about 10 us (a perf_counter pair, a gauge and a histogram
+# update), so a fully traced request adds well under 0.1 ms.
+# COACH_METRICS=0 turns all of it off. Each uvicorn worker exposes its
+# own /metrics.
+
+REGISTRY = CollectorRegistry()
+ProcessCollector(registry=REGISTRY)
+
+# 0.5 ms (BM25, FAISS) up to a minute (a long LLM generation)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_SECONDS = Histogram(
+    "coach_stage_duration_seconds", "Time spent in one chat pipeline stage",
+    ["stage", "mode"], buckets=BUCKETS, registry=REGISTRY
+)
+STAGE_IN_FLIGHT = Gauge(
+    "coach_stage_in_flight", "Calls currently inside a stage (e.g. LLM generations in flight)",
+    ["stage"], registry=REGISTRY
+)
+REQUEST_SECONDS = Histogram(
+    "coach_request_duration_seconds", "End-to-end chat request latency",
+    ["endpoint", "mode"], buckets=BUCKETS, registry=REGISTRY
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "coach_requests_in_flight", "Chat requests being served", ["endpoint"], registry=REGISTRY
+)
+ERRORS = Counter(
+    "coach_errors_total", "Failed chat requests, by HTTP status or exception type",
+    ["endpoint", "mode", "error"], registry=REGISTRY
+)
+SLOW_REQUESTS = Counter(
+    "coach_slow_requests_total", "Chat requests over COACH_SLOW_REQUEST_MS",
+    ["endpoint", "mode"], registry=REGISTRY
+)
+
+
+class RequestTrace:
+    """Stages one request went through, with their durations (seconds)"""
+
+    __slots__ = ("endpoint", "mode", "start", "stages")
+
+    def __init__(self, endpoint: str, mode: str):
+        self.endpoint = endpoint
+        self.mode = mode
+        self.start = time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []
+
+    def breakdown(self) -> Dict[str, float]:
+        """Milliseconds per stage (repeated stages summed), in first-seen order"""
+        totals: Dict[str, float] = {}
+        for name, seconds in self.stages:
+            totals[name] = totals.get(name, 0.0) + seconds * 1000
+        return totals
+
+
+_current_trace: "contextvars.ContextVar[Optional[RequestTrace]]" = contextvars.ContextVar(
+    "coach_request_trace", default=None
+)
+
+
+def error_label(error: BaseException) -> str:
+    """HTTP status for HTTPException-like errors, else the exception type"""
+    status = getattr(error, "status_code", None)
+    return str(status) if status is not None else type(error).__name__
+
+
+def count_error(endpoint: str, mode: str, error: BaseException):
+    """For failures handled without raising (e.g. an SSE error event)"""
+    if config.METRICS_ENABLED:
+        ERRORS.labels(endpoint, mode, error_label(error)).inc()
+
+
+@contextmanager
+def track_request(endpoint: str, mode: str):
+    """Times one request, counts it as in flight and counts the exception that escapes it"""
+    if not config.METRICS_ENABLED:
+        yield None
+        return
+    trace = RequestTrace(endpoint, mode)
+    token = _current_trace.set(trace)
+    in_flight = REQUESTS_IN_FLIGHT.labels(endpoint)
+    in_flight.inc()
+    try:
+        yield trace
+    except BaseException as e:
+        count_error(endpoint, mode, e)
+        raise
+    finally:
+        elapsed = time.perf_counter() - trace.start
+        in_flight.dec()
+        REQUEST_SECONDS.labels(endpoint, mode).observe(elapsed)
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            pass  # a stream generator finalized from another context
+        _log_if_slow(trace, elapsed)
+
+
+@contextmanager
+def stage(name: str, mode: Optional[str] = None):
+    """Times one pipeline stage into the histogram and the current request's trace"""
+    if not config.METRICS_ENABLED:
+        yield
+        return
+    trace = _current_trace.get()
+    mode = mode or (trace.mode if trace is not None else "none")
+    in_flight = STAGE_IN_FLIGHT.labels(name)
+    in_flight.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        in_flight.dec()
+        STAGE_SECONDS.labels(name, mode).observe(elapsed)
+        if trace is not None:
+            trace.stages.append((name, elapsed))
+
+
+def _log_if_slow(trace: RequestTrace, elapsed: float):
+    threshold_ms = config.SLOW_REQUEST_MS
+    total_ms = elapsed * 1000
+    if not threshold_ms or total_ms < threshold_ms:
+        return
+    SLOW_REQUESTS.labels(trace.endpoint, trace.mode).inc()
+    breakdown = trace.breakdown()
+    other = total_ms - sum(breakdown.values())
+    parts = [f"{name} {ms:.0f} ms" for name, ms in breakdown.items()] + [f"other {max(other, 0.0):.0f} ms"]
+    logger.warning(f"🐢 Slow {trace.endpoint} request ({trace.mode}): {total_ms:.0f} ms: " + ", ".join(parts))
+
+
+# ==========================================
+# Cache hit ratios (read at scrape time)
+# ==========================================
+class CacheStatsCollector:
+    """coach_cache_hit_ratio{cache} from each cache's own stats() dict"""
+
+    def __init__(self):
+        self._sources: Dict[str, Tuple[Callable[[], Optional[Dict]], str]] = {}
+
+    def register(self, cache: str, stats: Callable[[], Optional[Dict]], ratio_key: str = "hit_rate"):
+        """stats() returns the cache's stats dict, or None while it doesn't exist yet"""
+        self._sources[cache] = (stats, ratio_key)
+
+    def collect(self):
+        ratios = GaugeMetricFamily("coach_cache_hit_ratio", "Cache hits / lookups since start", labels=["cache"])
+        for cache, (stats, ratio_key) in self._sources.items():
+            try:
+                values = stats()
+            except Exception as e:
+                logger.warning(f"⚠️  Cache stats for {cache} failed: {e}")
+                continue
+            if values:
+                ratios.add_metric([cache], float(values[ratio_key]))
+        yield ratios
+
+
+cache_stats = CacheStatsCollector()
+REGISTRY.register(cache_stats)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """(body, content type) for the /metrics endpoint"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
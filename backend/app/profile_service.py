@@ -1,44 +1,120 @@
-import json
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Optional
-from app.athlete_profile import AthleteProfile
+from typing import Dict, Hashable, List, Optional, Tuple
+from app import config
+from app.athlete_profile import AthleteProfile, injury_terms, normalize_sport
+from app.profile_store import JsonDirStore, open_profile_store
+
 
 class UserProfileService:
-    """Manages athlete profiles"""
-    
-    def __init__(self):
-        self.data_dir = Path(__file__).parent.parent / "data"
-        self.profiles_dir = self.data_dir / "profiles"
-        self.profiles_dir.mkdir(parents=True, exist_ok=True)
-    
+    """
+    Manages athlete profiles, stored by a profile_store backend
+    (COACH_PROFILE_BACKEND: JSON files by default, or SQLite).
+
+    Validated profiles are kept in a bounded LRU cache, written through by
+    save_profile and checked against the store's stamp on every read (file
+    mtime/size, or the row's update time), so profiles edited on disk by
+    hand are still picked up. Cached
+    AthleteProfile objects are shared between requests: treat them as
+    read-only.
+    """
+
+    def __init__(self, profiles_dir: Optional[Path] = None, cache_size: Optional[int] = None, store=None):
+        # A profiles_dir always means the JSON backend in that directory
+        self.store = store or (JsonDirStore(profiles_dir) if profiles_dir else open_profile_store())
+
+        self.cache_size = config.PROFILE_CACHE_SIZE if cache_size is None else cache_size
+        self._cache: "OrderedDict[str, Tuple[Hashable, AthleteProfile]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
     def save_profile(self, profile: AthleteProfile) -> bool:
         """Save athlete profile"""
         try:
-            file_path = self.profiles_dir / f"{profile.user_id}.json"
-            with open(file_path, 'w') as f:
-                json.dump(profile.model_dump(), f, indent=2)
+            stamp = self.store.save(profile.user_id, profile.model_dump())
+            self._remember(profile.user_id, stamp, profile)
             return True
         except Exception as e:
             print(f"Error saving profile: {e}")
             return False
-    
+
     def get_profile(self, user_id: str) -> Optional[AthleteProfile]:
-        """Retrieve athlete profile"""
+        """Retrieve athlete profile (from the cache while the stored profile is unchanged)"""
         try:
-            file_path = self.profiles_dir / f"{user_id}.json"
-            if file_path.exists():
-                with open(file_path, 'r') as f:
-                    data = json.load(f)
-                return AthleteProfile(**data)
-            return None
+            stamp = self.store.stamp(user_id)
+            if stamp is None:
+                self._forget(user_id)
+                return None
+
+            with self._lock:
+                cached = self._cache.get(user_id)
+                if cached is not None and cached[0] == stamp:
+                    self._cache.move_to_end(user_id)
+                    self.hits += 1
+                    return cached[1]
+                self.misses += 1
+                if cached is not None:
+                    self.invalidations += 1
+
+            loaded = self.store.load(user_id)
+            if loaded is None:  # deleted since the stamp was read
+                self._forget(user_id)
+                return None
+            stamp, data = loaded
+            profile = AthleteProfile(**data)
+            self._remember(user_id, stamp, profile)
+            return profile
         except Exception as e:
             print(f"Error loading profile: {e}")
             return None
-    
+
     def profile_exists(self, user_id: str) -> bool:
         """Check if profile exists"""
-        file_path = self.profiles_dir / f"{user_id}.json"
-        return file_path.exists()
+        return self.store.exists(user_id)
+
+    def query_profiles(self, sport: Optional[str] = None, injury: Optional[str] = None,
+                       limit: Optional[int] = None, offset: int = 0) -> List[AthleteProfile]:
+        """
+        Profiles for a sport and/or an injury ("cricket", "knee"), matched
+        like retrieval scopes: sport aliases folded, every injury word of
+        the query present in the athlete's injuries. Indexed on SQLite.
+        Ordered by user_id; limit/offset select a page (None = all).
+        """
+        sport = normalize_sport(sport) if sport else None
+        terms = injury_terms([injury]) if injury else ()
+        return [AthleteProfile(**data) for data in self.store.query(sport, terms, limit, offset)]
+
+    def _remember(self, user_id: str, stamp: Optional[Hashable], profile: AthleteProfile):
+        if stamp is None or self.cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[user_id] = (stamp, profile)
+            self._cache.move_to_end(user_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+
+    def _forget(self, user_id: str):
+        with self._lock:
+            self._cache.pop(user_id, None)
+
+    def cache_stats(self) -> Dict:
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._cache),
+                "max_entries": self.cache_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
 
 # Global instance
 profile_service = UserProfileService()
@@ -0,0 +1,319 @@
+"""
+Storage backends for athlete profiles (UserProfileService).
+
+- JsonDirStore: one JSON file per athlete in data/profiles/ (default)
+- SqliteStore:  one SQLite database in WAL mode, with sport and injury-term
+                indexes for roster queries, shared through a small pool of
+                connections
+
+Both store the AthleteProfile.model_dump() dict and hand out a "stamp"
+that changes whenever a profile is written, which UserProfileService
+uses to validate its in-memory cache.
+
+Migrate the JSON profiles into SQLite (from backend/):
+    python -m app.profile_store migrate --db data/profiles.db
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager, suppress
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+from app import config
+from app.athlete_profile import AthleteProfile, injury_terms, normalize_sport
+
+BACKENDS = ("json", "sqlite")
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+
+def open_profile_store(backend: str = None, profiles_dir: Optional[Path] = None):
+    """Store for the configured backend (COACH_PROFILE_BACKEND)"""
+    backend = backend or config.PROFILE_BACKEND
+    if backend == "json":
+        return JsonDirStore(profiles_dir or DATA_DIR / "profiles")
+    if backend == "sqlite":
+        return SqliteStore(config.PROFILE_DB_PATH or DATA_DIR / "profiles.db", pool_size=config.PROFILE_DB_POOL_SIZE)
+    raise ValueError(f"Unknown profile backend {backend!r}, expected one of {BACKENDS}")
+
+
+def matches(data: Dict, sport: Optional[str], terms: Tuple[str, ...]) -> bool:
+    """Profile dict is for this sport (if given) and has every injury term"""
+    if sport is not None and normalize_sport(data["sport"]) != sport:
+        return False
+    return set(terms) <= set(injury_terms(data.get("injuries", [])))
+
+
+# ==========================================
+# JSON directory (default)
+# ==========================================
+class JsonDirStore:
+    """data/profiles/<user_id>.json; writes replace the file atomically"""
+
+    def __init__(self, profiles_dir: Path):
+        self.profiles_dir = Path(profiles_dir)
+        self.profiles_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, user_id: str) -> Path:
+        return self.profiles_dir / f"{user_id}.json"
+
+    @staticmethod
+    def _stamp(stat: os.stat_result) -> Hashable:
+        # (mtime_ns, size, inode): any write or replace changes it
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def stamp(self, user_id: str) -> Optional[Hashable]:
+        try:
+            return self._stamp(os.stat(self._path(user_id)))
+        except FileNotFoundError:
+            return None
+
+    def load(self, user_id: str) -> Optional[Tuple[Hashable, Dict]]:
+        try:
+            with open(self._path(user_id), 'r') as f:
+                return self._stamp(os.fstat(f.fileno())), json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, user_id: str, data: Dict) -> Hashable:
+        path = self._path(user_id)
+        tmp = self.profiles_dir / f".{user_id}.{os.urandom(4).hex()}.tmp"
+        # Created 0666 minus the umask like open() (mkstemp would make it 0600)
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        try:
+            with suppress(FileNotFoundError):
+                os.fchmod(fd, os.stat(path).st_mode & 0o777)  # keep the replaced file's permissions
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return self.stamp(user_id)
+
+    def exists(self, user_id: str) -> bool:
+        return self._path(user_id).exists()
+
+    def iter_profiles(self) -> Iterator[Dict]:
+        for path in sorted(self.profiles_dir.glob("*.json")):
+            with open(path, 'r') as f:
+                yield json.load(f)
+
+    def query(self, sport: Optional[str] = None, terms: Tuple[str, ...] = (),
+              limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        """Reads every profile: there is no index to narrow the scan"""
+        found = (data for data in self.iter_profiles() if matches(data, sport, terms))
+        return list(islice(found, offset, None if limit is None else offset + limit))
+
+
+# ==========================================
+# SQLite (WAL)
+# ==========================================
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id    TEXT PRIMARY KEY,
+    sport      TEXT NOT NULL,     -- normalize_sport()
+    data       TEXT NOT NULL,     -- AthleteProfile.model_dump() as JSON
+    updated_ns INTEGER NOT NULL   -- stamp for the profile cache
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS profiles_sport ON profiles (sport, user_id);
+CREATE TABLE IF NOT EXISTS profile_injury_terms (
+    term    TEXT NOT NULL,        -- injury_terms()
+    user_id TEXT NOT NULL REFERENCES profiles (user_id) ON DELETE CASCADE,
+    PRIMARY KEY (term, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS profile_injury_terms_user ON profile_injury_terms (user_id);
+"""
+
+
+class SqliteStore:
+    """
+    Profiles in one SQLite database (WAL: readers don't block the writer).
+    Connections are pooled and shared across threads, one thread at a time.
+    """
+
+    def __init__(self, path: Path, pool_size: int = 4):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._pool_size = max(1, pool_size)
+        self._opened = 0
+        self._pool_lock = threading.Lock()
+        self._last_ns = 0
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")  # durable at checkpoints; safe against corruption in WAL
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrows a pooled connection (opens one while the pool is below pool_size)"""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                opened = self._opened < self._pool_size
+                if opened:
+                    self._opened += 1
+            conn = self._connect() if opened else self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def close(self):
+        with self._pool_lock:
+            while self._opened:
+                self._pool.get().close()
+                self._opened -= 1
+
+    def _next_stamp(self) -> int:
+        # Strictly increasing per process, so two saves in one clock tick differ
+        with self._pool_lock:
+            self._last_ns = max(time.time_ns(), self._last_ns + 1)
+            return self._last_ns
+
+    def stamp(self, user_id: str) -> Optional[Hashable]:
+        with self._connection() as conn:
+            row = conn.execute("SELECT updated_ns FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0] if row else None
+
+    def load(self, user_id: str) -> Optional[Tuple[Hashable, Dict]]:
+        with self._connection() as conn:
+            row = conn.execute("SELECT updated_ns, data FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def save(self, user_id: str, data: Dict) -> Hashable:
+        stamp = self._next_stamp()
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._write(conn, user_id, data, stamp)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return stamp
+
+    def save_many(self, profiles: Iterable[Dict], batch_size: int = 1000) -> int:
+        """Bulk upsert, batch_size profiles per transaction; returns the count written"""
+        written = 0
+        batch: List[Dict] = []
+        with self._connection() as conn:
+            for data in profiles:
+                batch.append(data)
+                if len(batch) >= batch_size:
+                    written += self._write_batch(conn, batch)
+                    batch = []
+            written += self._write_batch(conn, batch)
+        return written
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[Dict]) -> int:
+        if not batch:
+            return 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for data in batch:
+                self._write(conn, data["user_id"], data, self._next_stamp())
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(batch)
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, user_id: str, data: Dict, stamp: int):
+        conn.execute(
+            "INSERT INTO profiles (user_id, sport, data, updated_ns) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (user_id) DO UPDATE SET sport = excluded.sport, data = excluded.data, "
+            "updated_ns = excluded.updated_ns",
+            (user_id, normalize_sport(data["sport"]), json.dumps(data), stamp),
+        )
+        conn.execute("DELETE FROM profile_injury_terms WHERE user_id = ?", (user_id,))
+        conn.executemany(
+            "INSERT INTO profile_injury_terms (term, user_id) VALUES (?, ?)",
+            [(term, user_id) for term in injury_terms(data.get("injuries", []))],
+        )
+
+    def exists(self, user_id: str) -> bool:
+        return self.stamp(user_id) is not None
+
+    def iter_profiles(self) -> Iterator[Dict]:
+        with self._connection() as conn:
+            rows = conn.execute("SELECT data FROM profiles ORDER BY user_id").fetchall()
+        return (json.loads(data) for (data,) in rows)
+
+    def query(self, sport: Optional[str] = None, terms: Tuple[str, ...] = (),
+              limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        """Indexed: sport via profiles_sport, each injury term via the term primary key"""
+        sql = ["SELECT p.data FROM profiles p"]
+        params: List = []
+        for i, term in enumerate(terms):
+            sql.append(f"JOIN profile_injury_terms t{i} ON t{i}.user_id = p.user_id AND t{i}.term = ?")
+            params.append(term)
+        if sport is not None:
+            sql.append("WHERE p.sport = ?")
+            params.append(sport)
+        sql.append("ORDER BY p.user_id LIMIT ? OFFSET ?")
+        params += [-1 if limit is None else limit, offset]
+        with self._connection() as conn:
+            rows = conn.execute(" ".join(sql), params).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+
+# ==========================================
+# Migration: JSON directory -> SQLite
+# ==========================================
+def migrate_json_to_sqlite(profiles_dir: Path, db_path: Path, batch_size: int = 1000) -> Tuple[int, List[str]]:
+    """
+    Validates every data/profiles/*.json and bulk-imports it (existing rows
+    are replaced). Returns (imported count, skipped files with reasons).
+    """
+    skipped: List[str] = []
+
+    def valid_profiles():
+        for path in sorted(Path(profiles_dir).glob("*.json")):
+            try:
+                with open(path, 'r') as f:
+                    yield AthleteProfile(**json.load(f)).model_dump()
+            except Exception as e:
+                skipped.append(f"{path.name}: {e}")
+
+    store = SqliteStore(db_path, pool_size=1)
+    try:
+        imported = store.save_many(valid_profiles(), batch_size=batch_size)
+    finally:
+        store.close()
+    return imported, skipped
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Athlete profile storage maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate = commands.add_parser("migrate", help="Bulk-import data/profiles/*.json into SQLite")
+    migrate.add_argument("--profiles-dir", default=str(DATA_DIR / "profiles"))
+    migrate.add_argument("--db", default=config.PROFILE_DB_PATH or str(DATA_DIR / "profiles.db"))
+    migrate.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    imported, skipped = migrate_json_to_sqlite(Path(args.profiles_dir), Path(args.db), args.batch_size)
+    print(f"✅ Imported {imported} profiles into {args.db} in {time.perf_counter() - start:.2f}s")
+    for reason in skipped:
+        print(f"⚠️ Skipped {reason}")
+    if imported:
+        print("   Set COACH_PROFILE_BACKEND=sqlite to serve profiles from it.")
@@ -0,0 +1,179 @@
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict
+
+from app.schemas import ChatMode
+
+# ==========================================
+# Prompt building
+# ==========================================
+# Every prompt is a static prefix (system instruction + athlete profile),
+# identical across an athlete's requests in one mode, followed by the
+# per-request suffix (retrieved knowledge + question). Keeping the prefix
+# byte-identical lets it be rendered once and cached provider-side.
+
+
+def system_instruction(mode: str) -> str:
+    if mode == ChatMode.QUICK_TIP.value:
+        return (
+            "You are Coach Carter, a friendly AI fitness coach.\n"
+            "🎯 QUICK TIP MODE: Give concise, actionable advice (2–3 sentences, <150 words)."
+        )
+    return (
+        "You are Coach Carter, an elite sports coach with 20+ years of experience.\n"
+        "🎯 IN-DEPTH PLAN MODE: Create complete, structured training programs.\n"
+        "Use markdown formatting with sections like:\n"
+        "- Program Overview\n"
+        "- Weekly Breakdown\n"
+        "- Warm-up & Cool-down\n"
+        "- Progression Plan\n"
+        "- Safety Notes"
+    )
+
+
+# The profile block holds what shapes the answer, so athletes with the same
+# training needs (a team given the same instruction) get the same prompt,
+# and can share in-flight calls and cached answers. Name, exact age, body
+# metrics and gender stay out; age and experience go in as coarse bands.
+
+
+def age_group(age: int) -> str:
+    if age < 18:
+        return "youth (under 18)"
+    return "adult (18-39)" if age < 40 else "masters (40+)"
+
+
+def experience_level(years: int) -> str:
+    if years < 2:
+        return "beginner"
+    return "intermediate" if years < 6 else "advanced"
+
+
+def format_profile_context(user_profile) -> str:
+    """Renders the ATHLETE PROFILE block passed to the LLM prompt (no personal details)"""
+    if not user_profile:
+        return ""
+    return f"""
+ATHLETE PROFILE:
+- Sport: {user_profile.sport}
+- Age Group: {age_group(user_profile.age)}
+- Level: {experience_level(user_profile.experience_years)}
+- Goals: {', '.join(user_profile.goals)}
+- Training Duration: {user_profile.duration_weeks} weeks
+- Sessions/Week: {user_profile.sessions_per_week}
+- Equipment: {', '.join(user_profile.available_equipment) if user_profile.available_equipment else 'bodyweight only'}
+- Injuries: {', '.join(user_profile.injuries) if user_profile.injuries else 'none'}
+"""
+
+
+def prompt_suffix(user_query: str, context: str = "") -> str:
+    """Per-request part of the prompt, appended to the PromptPrefix"""
+    return (
+        f"Relevant Knowledge:\n{context}\n\n"
+        f"User Question: {user_query}\n\n"
+        f"Your Response:"
+    )
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (~4 characters per token for English text)"""
+    return math.ceil(len(text) / 4) if text else 0
+
+
+def profile_version(user_profile) -> str:
+    """Changes whenever anything rendered into the profile block changes"""
+    if not user_profile:
+        return "no-profile"
+    if hasattr(user_profile, "model_dump_json"):
+        rendered = format_profile_context(user_profile)
+    else:  # profile text, or a plain dict (rendered with str() like before)
+        rendered = user_profile if isinstance(user_profile, str) else repr(user_profile)
+    return hashlib.sha1(rendered.encode("utf-8")).hexdigest()[:16]
+
+
+class PromptPrefix:
+    """Rendered static prefix; key identifies its exact text (provider cache name)"""
+
+    __slots__ = ("key", "text", "tokens")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.key = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+        self.tokens = estimate_tokens(text)
+
+
+class PromptPrefixCache:
+    """
+    Rendered prefixes per (mode, profile version), LRU-bounded. user_profile
+    is an AthleteProfile, already-formatted profile text, a dict, or None.
+
+    UserProfileService hands out the same (read-only) AthleteProfile object
+    until the stored profile changes, so versions are also memoized per
+    object: a repeat request skips serializing and hashing the profile.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, PromptPrefix]" = OrderedDict()
+        self._versions: "OrderedDict[int, tuple]" = OrderedDict()  # id(profile) -> (profile, version)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _version(self, user_profile) -> str:
+        if not hasattr(user_profile, "model_dump_json"):
+            return profile_version(user_profile)
+        with self._lock:
+            memo = self._versions.get(id(user_profile))
+            if memo is not None and memo[0] is user_profile:  # held below, so the id is not reused
+                self._versions.move_to_end(id(user_profile))
+                return memo[1]
+        version = profile_version(user_profile)
+        with self._lock:
+            self._versions[id(user_profile)] = (user_profile, version)
+            while len(self._versions) > self.max_entries:
+                self._versions.popitem(last=False)
+        return version
+
+    def get(self, mode: str, user_profile=None) -> PromptPrefix:
+        key = (mode, self._version(user_profile))
+        with self._lock:
+            prefix = self._entries.get(key)
+            if prefix is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return prefix
+            self.misses += 1
+
+        prefix = PromptPrefix(render_prefix(mode, user_profile))
+        with self._lock:
+            self._entries[key] = prefix
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return prefix
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+def render_prefix(mode: str, user_profile=None) -> str:
+    if hasattr(user_profile, "model_dump_json"):
+        profile = format_profile_context(user_profile)
+    else:
+        profile = str(user_profile) if user_profile else ""
+    profile_text = f"\n\nUSER PROFILE:\n{profile}\n" if profile else ""
+    return f"{system_instruction(mode)}{profile_text}\n\n"
+
+
+def build_prompt(user_query: str, mode: str = "in-depth", context: str = "", user_profile=None) -> str:
+    """Full prompt text, uncached (prefix + suffix)"""
+    return render_prefix(mode, user_profile) + prompt_suffix(user_query, context)
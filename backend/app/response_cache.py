@@ -0,0 +1,231 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.prompts import profile_version
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase and collapse whitespace so trivially different queries share a key"""
+    return " ".join(text.lower().split())
+
+
+def profile_fingerprint(user_profile) -> str:
+    """
+    Hash of the ATHLETE PROFILE block the prompt renders: sport, age group,
+    level, goals, weeks, sessions, equipment and injuries. Athletes with the
+    same training needs share cached answers; personal details aren't in the
+    prompt, so they can't leak through one.
+    """
+    return profile_version(user_profile)
+
+
+class ResponseCache:
+    """
+    LLM answer cache in front of CoachCarterAI.get_ai_response.
+
+    - Exact hit: same normalized query, mode and profile fingerprint
+    - Semantic hit: cosine similarity of query embeddings >= threshold,
+      only among entries with the same mode and profile fingerprint;
+      mode_thresholds overrides the threshold per mode (short quick tips
+      generalize across phrasings better than full plans)
+    - LRU eviction at max_entries, entries expire after ttl_seconds
+    - Optional JSON persistence (load on start, save() on shutdown)
+
+    Unit query vectors live in one preallocated (max_entries, dim) matrix,
+    one slot per entry. A semantic lookup scores every slot with a single
+    matmul outside the lock, then re-checks the best slot under the lock
+    (a concurrent put may have reused it meanwhile).
+    """
+
+    def __init__(self, max_entries=1000, ttl_seconds=24 * 3600,
+                 similarity_threshold=0.95, persist_path=None, mode_thresholds=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.mode_thresholds = mode_thresholds or {}
+        self.persist_path = Path(persist_path) if persist_path else None
+
+        # key -> {"response", "slot", "created_at"}; key = (mode, profile_key, query)
+        self._entries: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Slot arrays (allocated with the first vector): unit vectors, hash of
+        # (mode, profile_key) (0 = free), creation time
+        self._vectors: Optional[np.ndarray] = None
+        self._groups = np.zeros(max(max_entries, 0), dtype=np.int64)
+        self._created = np.zeros(max(max_entries, 0), dtype=np.float64)
+        self._slot_keys: List[Optional[tuple]] = [None] * max(max_entries, 0)
+        self._free_slots: List[int] = []
+        self._used_slots = 0  # high-water mark; slots past it were never used
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+        if self.persist_path and self.persist_path.exists():
+            self._load()
+
+    # ==========================================
+    # Lookup / store
+    # ==========================================
+    def get(self, query: str, mode: str, profile_key: str, query_vector=None) -> Optional[str]:
+        """
+        Returns a cached answer or None.
+        Without query_vector only the exact key is checked (and no miss is
+        counted), so callers can skip embedding on exact hits.
+        """
+        key = (mode, profile_key, normalize_query(query))
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry, now):
+                    self._entries.move_to_end(key)
+                    self.exact_hits += 1
+                    return entry["response"]
+                self._remove(key)
+
+            if query_vector is None:
+                return None
+            vectors, used = self._vectors, self._used_slots
+
+        threshold = self.mode_thresholds.get(mode, self.similarity_threshold)
+        vector = self._unit(query_vector)
+        best = None
+        if vectors is not None and used and vector.shape[0] == vectors.shape[1]:
+            scores = vectors[:used] @ vector
+            scores[(self._groups[:used] != self._group(key)) | (self._created[:used] < now - self.ttl_seconds)] = -np.inf
+            best = int(np.argmax(scores))
+            if scores[best] < threshold:
+                best = None
+
+        with self._lock:
+            best_key = self._slot_keys[best] if best is not None else None
+            other = self._entries.get(best_key) if best_key is not None else None
+            if (other is None or best_key[:2] != key[:2] or other["slot"] != best
+                    or self._expired(other, now) or float(self._vectors[best] @ vector) < threshold):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.semantic_hits += 1
+            return other["response"]
+
+    def put(self, query: str, mode: str, profile_key: str, response: str, query_vector=None):
+        """Stores an answer, evicting least recently used entries past max_entries"""
+        if self.max_entries <= 0:
+            return
+        key = (mode, profile_key, normalize_query(query))
+        with self._lock:
+            self._insert(key, response, query_vector, time.time())
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.exact_hits + self.semantic_hits) / lookups, 3) if lookups else 0.0,
+            }
+
+    # ==========================================
+    # Persistence
+    # ==========================================
+    def save(self):
+        """Writes non-expired entries to persist_path (atomic replace)"""
+        if not self.persist_path:
+            return
+        now = time.time()
+        with self._lock:
+            records = [
+                {
+                    "mode": key[0],
+                    "profile_key": key[1],
+                    "query": key[2],
+                    "response": entry["response"],
+                    "vector": self._vectors[entry["slot"]].tolist() if entry["slot"] is not None else None,
+                    "created_at": entry["created_at"],
+                }
+                for key, entry in self._entries.items()
+                if not self._expired(entry, now)
+            ]
+        self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.persist_path.with_suffix(self.persist_path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(records, f)
+        os.replace(tmp_path, self.persist_path)
+        logger.info(f"💾 Saved {len(records)} cached responses to {self.persist_path}")
+
+    def _load(self):
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Could not load response cache {self.persist_path}: {e}")
+            return
+
+        now = time.time()
+        with self._lock:
+            for record in records[-self.max_entries:] if self.max_entries > 0 else []:
+                if now - record["created_at"] <= self.ttl_seconds:
+                    key = (record["mode"], record["profile_key"], record["query"])
+                    self._insert(key, record["response"], record["vector"] or None, record["created_at"])
+        logger.info(f"✅ Loaded {len(self._entries)} cached responses from {self.persist_path}")
+
+    # ==========================================
+    # Helpers
+    # ==========================================
+    def _insert(self, key: tuple, response: str, query_vector, created_at: float):
+        """Adds or replaces an entry (caller holds the lock)"""
+        if key in self._entries:
+            self._remove(key)
+        while len(self._entries) >= self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+        slot = None
+        if query_vector is not None:
+            vector = self._unit(query_vector)
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            if vector.shape[0] == self._vectors.shape[1]:  # else exact hits only
+                slot = self._free_slots.pop() if self._free_slots else self._used_slots
+                self._used_slots = max(self._used_slots, slot + 1)
+                self._vectors[slot] = vector
+                self._groups[slot] = self._group(key)
+                self._created[slot] = created_at
+                self._slot_keys[slot] = key
+        self._entries[key] = {"response": response, "slot": slot, "created_at": created_at}
+
+    def _remove(self, key: tuple):
+        """Drops an entry and frees its vector slot (caller holds the lock)"""
+        slot = self._entries.pop(key)["slot"]
+        if slot is not None:
+            self._groups[slot] = 0
+            self._slot_keys[slot] = None
+            self._free_slots.append(slot)
+
+    @staticmethod
+    def _group(key: tuple) -> int:
+        """Non-zero hash of (mode, profile_key); collisions are caught by the re-check in get()"""
+        return hash(key[:2]) or 1
+
+    def _expired(self, entry: Dict, now: float) -> bool:
+        return now - entry["created_at"] > self.ttl_seconds
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -0,0 +1,478 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app import config
+from app.embedding_backends import embedding_model_id, load_embedding_model
+from app.embedding_batcher import RetrievalBatcher
+from app.knowledge_base import ScopedSearcher, load_or_build_knowledge_base, store_fingerprint
+from app.metrics import stage
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# Retrieval sidecar
+# ==========================================
+# One process owns the embedding model and the FAISS index; uvicorn workers
+# (COACH_RETRIEVAL_SIDECAR=<socket>) send it their batched retrieval calls
+# over a UNIX socket instead of each loading torch + the model. Its own
+# RetrievalBatcher merges the batches of all workers.
+#
+#   python -m app.retrieval_service --socket /tmp/coach-retrieval.sock
+#
+# Workers keep a small pool of connections, ping the sidecar every
+# COACH_RETRIEVAL_SIDECAR_HEALTH_SECONDS, and retrieve in-process (loading
+# the model on first use) while it is unreachable, or while it serves a
+# different embedding model or knowledge base than the worker loaded (the
+# ids it returns are looked up in the worker's own store).
+#
+# Protocol: frames of <op: u8><length: u32> + payload, little-endian.
+#   PING     -> <version: u16><dim: u32><chunks: u32><store: u64> + embedding model id
+#               (store: knowledge_base.store_fingerprint)
+#   STATS    -> JSON server counters
+#   RETRIEVE    <n: u16>, n x <top_k: u16><scope bytes: u16><text bytes: u32>,
+#               then each query's UTF-8 text and scope
+#            -> <n: u16><dim: u16><k: u16><has ids: u8>, float32 (n, dim)
+#               query embeddings, int64 (n, k) ids padded with -1
+#   ERROR    <- UTF-8 message, in place of any reply
+# A scope (knowledge_base.retrieval_scope) is "sport\x1fterm\x1fterm...",
+# empty for no scope.
+
+PROTOCOL_VERSION = 2
+OP_PING, OP_STATS, OP_RETRIEVE, OP_ERROR = 1, 2, 3, 255
+
+HEADER = struct.Struct("<BI")
+PONG = struct.Struct("<HIIQ")
+QUERY = struct.Struct("<HHI")
+RESULT = struct.Struct("<HHHB")
+SCOPE_SEP = "\x1f"
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+
+class SidecarError(RuntimeError):
+    """The sidecar answered with an error, or broke the protocol"""
+
+
+# ==========================================
+# Wire format
+# ==========================================
+def _encode_scope(scope) -> bytes:
+    if scope is None:
+        return b""
+    sport, terms = scope
+    return SCOPE_SEP.join((sport,) + tuple(terms)).encode("utf-8")
+
+
+def _decode_scope(raw: bytes):
+    if not raw:
+        return None
+    sport, *terms = raw.decode("utf-8").split(SCOPE_SEP)
+    return sport, tuple(terms)
+
+
+def encode_request(queries: List[str], top_ks: List[int], scopes: List) -> bytes:
+    texts = [query.encode("utf-8") for query in queries]
+    raw_scopes = [_encode_scope(scope) for scope in scopes]
+    parts = [struct.pack("<H", len(queries))]
+    parts.extend(QUERY.pack(top_k, len(raw_scope), len(text))
+                 for top_k, raw_scope, text in zip(top_ks, raw_scopes, texts))
+    for text, raw_scope in zip(texts, raw_scopes):
+        parts.append(text)
+        parts.append(raw_scope)
+    return b"".join(parts)
+
+
+def decode_request(payload: bytes) -> Tuple[List[str], List[int], List]:
+    (count,) = struct.unpack_from("<H", payload)
+    offset = 2
+    sizes = []
+    for _ in range(count):
+        sizes.append(QUERY.unpack_from(payload, offset))
+        offset += QUERY.size
+    queries, top_ks, scopes = [], [], []
+    for top_k, scope_size, text_size in sizes:
+        queries.append(payload[offset:offset + text_size].decode("utf-8"))
+        offset += text_size
+        scopes.append(_decode_scope(payload[offset:offset + scope_size]))
+        offset += scope_size
+        top_ks.append(top_k)
+    return queries, top_ks, scopes
+
+
+def encode_result(matrix: np.ndarray, indices: List) -> bytes:
+    count, dim = matrix.shape
+    has_ids = count > 0 and indices[0] is not None
+    k = max((len(ids) for ids in indices), default=0) if has_ids else 0
+    parts = [RESULT.pack(count, dim, k, has_ids), np.ascontiguousarray(matrix, dtype="<f4").tobytes()]
+    if has_ids:
+        padded = np.full((count, k), -1, dtype="<i8")
+        for row, ids in enumerate(indices):
+            padded[row, :len(ids)] = ids
+        parts.append(padded.tobytes())
+    return b"".join(parts)
+
+
+def decode_result(payload, top_ks: List[int]) -> Tuple[np.ndarray, List]:
+    """(float32 (n, dim) matrix, per-query ids cut to each top_k, or None without an index)"""
+    count, dim, k, has_ids = RESULT.unpack_from(payload)
+    offset = RESULT.size
+    matrix = np.frombuffer(payload, dtype="<f4", count=count * dim, offset=offset).reshape(count, dim)
+    if not has_ids:
+        return matrix, [None] * count
+    ids = np.frombuffer(payload, dtype="<i8", count=count * k, offset=offset + matrix.nbytes).reshape(count, k)
+    return matrix, [ids[row, :top_k] for row, top_k in enumerate(top_ks)]
+
+
+# ==========================================
+# Server (the sidecar process)
+# ==========================================
+class RetrievalServer:
+    """Answers frames from any number of worker connections through one RetrievalBatcher"""
+
+    def __init__(self, socket_path: str, batcher, dim: int, chunks: int, model_id: str, store_id: int = 0):
+        self.socket_path = socket_path
+        self.batcher = batcher
+        self.pong = PONG.pack(PROTOCOL_VERSION, dim, chunks, store_id) + model_id.encode("utf-8")
+        self.started = time.time()
+        self.connections = 0
+        self.requests = 0
+        self.queries = 0
+        self.errors = 0
+        self._server = None
+        self._writers = set()
+
+    async def start(self):
+        self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        print(f"🔌 Retrieval sidecar listening on {self.socket_path}")
+
+    def close(self):
+        """Stops listening and drops open connections (workers fail over at once)"""
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        Path(self.socket_path).unlink(missing_ok=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self._writers.add(writer)
+        try:
+            while True:
+                try:
+                    op, length = HEADER.unpack(await reader.readexactly(HEADER.size))
+                    payload = await reader.readexactly(length)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                try:
+                    reply = await self._dispatch(op, payload)
+                except Exception as e:
+                    self.errors += 1
+                    logger.error(f"❌ Retrieval sidecar request failed: {e}")
+                    op, reply = OP_ERROR, str(e).encode("utf-8")
+                writer.write(HEADER.pack(op, len(reply)))
+                writer.write(reply)
+                await writer.drain()
+        finally:
+            self.connections -= 1
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _dispatch(self, op: int, payload: bytes) -> bytes:
+        if op == OP_PING:
+            return self.pong
+        if op == OP_STATS:
+            return json.dumps(self.stats()).encode("utf-8")
+        if op != OP_RETRIEVE:
+            raise ValueError(f"unknown op {op}")
+
+        queries, top_ks, scopes = decode_request(payload)
+        results = await asyncio.gather(*(
+            asyncio.wrap_future(self.batcher.submit(query, top_k, scope))
+            for query, top_k, scope in zip(queries, top_ks, scopes)
+        ))
+        self.requests += 1
+        self.queries += len(queries)
+        matrix = np.vstack([query_emb for query_emb, _ in results])
+        return encode_result(matrix, [ids for _, ids in results])
+
+    def stats(self) -> Dict:
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "connections": self.connections,
+            "requests": self.requests,
+            "queries": self.queries,
+            "errors": self.errors,
+            "batching": self.batcher.stats(),
+        }
+
+
+def load_server(socket_path: str) -> RetrievalServer:
+    """Loads the model and knowledge base the way CoachCarterAI does, behind a batcher"""
+    print(f"📚 Loading local embedding model ({config.EMBEDDING_BACKEND})...")
+    model = load_embedding_model()
+    store = load_or_build_knowledge_base(
+        DATA_DIR, model, embedding_model_id(),
+        index_spec=config.KB_INDEX, nprobe=config.KB_NPROBE, ef_search=config.KB_EF_SEARCH
+    )
+    searcher = ScopedSearcher(store) if store else None
+    dim = model.encode(["warmup: beginner strength program"], convert_to_numpy=True).shape[1]
+    batcher = RetrievalBatcher(
+        encode=lambda queries: model.encode(queries, convert_to_numpy=True),
+        search=searcher.search if searcher else None,
+        max_batch_size=config.EMBED_BATCH_MAX_SIZE,
+        max_wait_ms=config.EMBED_BATCH_MAX_WAIT_MS
+    )
+    return RetrievalServer(socket_path, batcher, dim, len(store["ids"]) if store else 0, embedding_model_id(),
+                           store_fingerprint(store))
+
+
+async def serve(server: RetrievalServer):
+    """Runs the sidecar until SIGINT / SIGTERM, then removes its socket"""
+    await server.start()
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopped.set)
+    await stopped.wait()
+    server.close()
+    print("👋 Retrieval sidecar stopped")
+
+
+def _socket_in_use(path: str) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+            return True
+        except OSError:
+            return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared embedding + FAISS retrieval for API workers")
+    parser.add_argument("--socket", default=config.RETRIEVAL_SIDECAR or "/tmp/coach-retrieval.sock")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if os.path.exists(args.socket):
+        if _socket_in_use(args.socket):
+            raise SystemExit(f"A retrieval sidecar is already listening on {args.socket}")
+        os.unlink(args.socket)  # left over from a process that was killed
+    asyncio.run(serve(load_server(args.socket)))
+
+
+
+# ==========================================
+# Client (in each API worker)
+# ==========================================
+class _Connection:
+    """One blocking socket to the sidecar, one request in flight at a time"""
+
+    def __init__(self, path: str, timeout: float):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(path)
+        except OSError:
+            self.sock.close()
+            raise
+
+    def call(self, op: int, payload: bytes) -> bytearray:
+        self.sock.sendall(HEADER.pack(op, len(payload)) + payload)
+        reply_op, length = HEADER.unpack(self._read(HEADER.size))
+        body = self._read(length)
+        if reply_op == OP_ERROR:
+            raise SidecarError(body.decode("utf-8", errors="replace"))
+        if reply_op != op:
+            raise SidecarError(f"reply op {reply_op} to op {op}")
+        return body
+
+    def _read(self, size: int) -> bytearray:
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received < size:
+            count = self.sock.recv_into(view[received:])
+            if not count:
+                raise ConnectionError("retrieval sidecar closed the connection")
+            received += count
+        return buffer
+
+    def close(self):
+        self.sock.close()
+
+
+class RetrievalClient:
+    """
+    Pooled connections to the sidecar with a background health check.
+    retrieve() has RetrievalBatcher's retrieve(queries, top_ks, scopes)
+    signature; while the sidecar is unhealthy, or when a call to it fails,
+    it runs fallback (in-process retrieval) instead.
+    """
+
+    def __init__(self, socket_path: str, pool_size=4, timeout=2.0, health_interval=1.0,
+                 fallback=None, expected_model: Optional[str] = None, expected_store: Optional[int] = None):
+        self.socket_path = socket_path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.health_interval = health_interval
+        self.fallback = fallback
+        self.expected_model = expected_model
+        self.expected_store = expected_store
+
+        self._idle: List[_Connection] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._stop = threading.Event()
+        self._health_thread = None
+        # Pings use their own connection, so a busy pool doesn't look like an outage
+        self._health_connection: Optional[_Connection] = None
+        self._health_lock = threading.Lock()
+
+        self.healthy = False
+        self.info: Optional[Dict] = None
+        self.calls = 0
+        self.failures = 0
+        self.fallbacks = 0
+        self.connects = 0
+
+    # --- connection pool ---
+    def _connect(self) -> _Connection:
+        connection = _Connection(self.socket_path, self.timeout)
+        self.connects += 1
+        return connection
+
+    def _call(self, op: int, payload: bytes = b"") -> bytearray:
+        """One request on a pooled connection (at most pool_size in flight, others wait)"""
+        with self._slots:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is not None:
+                try:
+                    reply = connection.call(op, payload)
+                except ConnectionError:
+                    # Idle since before a sidecar restart: retry once on a new connection
+                    connection.close()
+                    connection = None
+                except BaseException:
+                    connection.close()
+                    raise
+            if connection is None:
+                connection = self._connect()
+                try:
+                    reply = connection.call(op, payload)
+                except BaseException:
+                    connection.close()  # its stream position is unknown now
+                    raise
+            with self._lock:
+                self._idle.append(connection)
+            return reply
+
+    # --- health ---
+    def ping(self) -> Optional[Dict]:
+        """Sidecar info, or None when it is unreachable or incompatible"""
+        with self._health_lock:
+            try:
+                if self._health_connection is None:
+                    self._health_connection = self._connect()
+                reply = self._health_connection.call(OP_PING, b"")
+            except (OSError, SidecarError):
+                if self._health_connection is not None:
+                    self._health_connection.close()
+                    self._health_connection = None
+                return None
+        if len(reply) < PONG.size or PONG.unpack_from(reply)[0] != PROTOCOL_VERSION:
+            logger.error(f"❌ Retrieval sidecar at {self.socket_path} speaks another protocol version")
+            return None
+        version, dim, chunks, store = PONG.unpack_from(reply)
+        info = {"version": version, "dim": dim, "chunks": chunks, "store": store,
+                "model": bytes(reply[PONG.size:]).decode("utf-8")}
+        if self.expected_model and info["model"] != self.expected_model:
+            logger.error(f"❌ Retrieval sidecar at {self.socket_path} uses another embedding model: {info}")
+            return None
+        if self.expected_store is not None and store != self.expected_store:
+            logger.error(f"❌ Retrieval sidecar at {self.socket_path} serves another knowledge base: {info}")
+            return None
+        return info
+
+    def check_health(self) -> bool:
+        info = self.ping()
+        healthy = info is not None
+        if healthy and not self.healthy:
+            logger.info(f"🔌 Retrieval sidecar at {self.socket_path} is healthy ({info['chunks']} chunks)")
+        elif not healthy and self.healthy:
+            logger.warning(f"⚠️  Retrieval sidecar at {self.socket_path} is down; retrieving in-process")
+        self.healthy = healthy
+        self.info = info or self.info
+        return healthy
+
+    def start_health_checks(self):
+        def run():
+            while not self._stop.wait(self.health_interval):
+                self.check_health()
+
+        self._health_thread = threading.Thread(target=run, name="coach-sidecar-health", daemon=True)
+        self._health_thread.start()
+
+    # --- retrieval ---
+    def retrieve(self, queries: List[str], top_ks: List[int], scopes: List) -> Tuple[np.ndarray, List]:
+        if self.healthy:
+            try:
+                with stage("sidecar"):
+                    reply = self._call(OP_RETRIEVE, encode_request(queries, top_ks, scopes))
+                self.calls += 1
+                return decode_result(reply, top_ks)
+            except (OSError, SidecarError) as e:
+                self.failures += 1
+                self.healthy = False
+                logger.warning(f"⚠️  Retrieval sidecar call failed ({e}); retrieving in-process")
+        if self.fallback is None:
+            raise SidecarError(f"retrieval sidecar at {self.socket_path} is unavailable")
+        self.fallbacks += 1
+        return self.fallback(queries, top_ks, scopes)
+
+    def server_stats(self) -> Optional[Dict]:
+        try:
+            return json.loads(bytes(self._call(OP_STATS)))
+        except (OSError, SidecarError):
+            return None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            idle = len(self._idle)
+        return {
+            "socket": self.socket_path,
+            "healthy": self.healthy,
+            "calls": self.calls,
+            "failures": self.failures,
+            "fallbacks": self.fallbacks,
+            "connects": self.connects,
+            "idle_connections": idle,
+        }
+
+    def close(self):
+        self._stop.set()
+        if self._health_thread is not None:
+            self._health_thread.join()
+        with self._lock:
+            idle, self._idle = self._idle, []
+        if self._health_connection is not None:
+            idle.append(self._health_connection)
+            self._health_connection = None
+        for connection in idle:
+            connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,8 @@
-from typing import Dict, List
+import functools
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
 from app.schemas import RiskScoreItem
 
 class RiskAssessmentEngine:
@@ -38,6 +42,30 @@ class RiskAssessmentEngine:
         }
     }
     
+    GOAL_ALIASES = {
+        'strength': ['strength', 'power', 'strong'],
+        'muscle_gain': ['muscle', 'hypertrophy', 'bulk', 'mass'],
+        'fat_loss': ['fat loss', 'weight loss', 'cut', 'lean'],
+        'endurance': ['endurance', 'cardio', 'stamina', 'conditioning']
+    }
+
+    # Effectiveness tiers, in the order calculate_effectiveness checks them
+    TIERS = ('high', 'medium', 'low')
+    TIER_SCORES = {'high': 9, 'medium': 6, 'low': 3}
+    TIER_REASONS = {
+        'high': 'Excellent for {goal} goals',
+        'medium': 'Good for {goal} goals',
+        'low': 'Limited effectiveness for {goal} goals'
+    }
+
+    @staticmethod
+    def map_goal(goal_lower: str) -> Optional[str]:
+        """EFFECTIVENESS_MAPPING key for a lowercase goal (first alias match), or None"""
+        for key, aliases in RiskAssessmentEngine.GOAL_ALIASES.items():
+            if any(alias in goal_lower for alias in aliases):
+                return key
+        return None
+
     @staticmethod
     def calculate_risk(exercise: str, user_injuries: List[str]) -> Dict:
         """Calculate risk score for an exercise given user's injury history"""
@@ -78,18 +106,7 @@ class RiskAssessmentEngine:
         effectiveness_score = 5
         reason = 'Moderate effectiveness for general fitness'
         
-        goal_mapping = {
-            'strength': ['strength', 'power', 'strong'],
-            'muscle_gain': ['muscle', 'hypertrophy', 'bulk', 'mass'],
-            'fat_loss': ['fat loss', 'weight loss', 'cut', 'lean'],
-            'endurance': ['endurance', 'cardio', 'stamina', 'conditioning']
-        }
-        
-        mapped_goal = None
-        for key, aliases in goal_mapping.items():
-            if any(alias in goal_lower for alias in aliases):
-                mapped_goal = key
-                break
+        mapped_goal = RiskAssessmentEngine.map_goal(goal_lower)
         
         if mapped_goal and mapped_goal in RiskAssessmentEngine.EFFECTIVENESS_MAPPING:
             categories = RiskAssessmentEngine.EFFECTIVENESS_MAPPING[mapped_goal]
@@ -135,6 +152,149 @@ class RiskAssessmentEngine:
             'reason': f"{effectiveness_data['reason']}. {risk_data['reason']}"
         }
 
+    @staticmethod
+    def assess_batch(exercises: Sequence[str], user_profiles: Sequence[Dict]) -> "RiskBatch":
+        """
+        assess_exercise for every (exercise, profile) pair at once: scores
+        come from matrix products over the compiled mappings, dicts are
+        built only for the cells that are read.
+        """
+        return RiskBatch(exercises, user_profiles, _compiled_mappings())
+
+class _CompiledMappings:
+    """HIGH_RISK_MAPPING / EFFECTIVENESS_MAPPING as term-membership matrices"""
+
+    def __init__(self):
+        engine = RiskAssessmentEngine
+        self.body_parts = list(engine.HIGH_RISK_MAPPING)
+        self.goals = list(engine.EFFECTIVENESS_MAPPING)
+
+        # Every name the mappings match against exercises, once
+        names = [name for names in engine.HIGH_RISK_MAPPING.values() for name in names]
+        names += [
+            name for tiers in engine.EFFECTIVENESS_MAPPING.values()
+            for tier in engine.TIERS for name in tiers.get(tier, [])
+        ]
+        self.terms = list(dict.fromkeys(names))
+        column = {term: i for i, term in enumerate(self.terms)}
+
+        # risk_terms[t, b]: times term t is listed under body part b
+        self.risk_terms = np.zeros((len(self.terms), len(self.body_parts)), dtype=np.int64)
+        for b, body_part in enumerate(self.body_parts):
+            for name in engine.HIGH_RISK_MAPPING[body_part]:
+                self.risk_terms[column[name], b] += 1
+
+        # tier_terms[k, t, g]: term t is listed in tier k of goal g
+        self.tier_terms = np.zeros((len(engine.TIERS), len(self.terms), len(self.goals)), dtype=np.int64)
+        for g, goal in enumerate(self.goals):
+            for k, tier in enumerate(engine.TIERS):
+                for name in engine.EFFECTIVENESS_MAPPING[goal].get(tier, []):
+                    self.tier_terms[k, column[name], g] = 1
+        # [t, k * g] layout of tier_terms: one matmul per batch instead of an einsum
+        self.tier_terms_flat = self.tier_terms.transpose(1, 0, 2).reshape(len(self.terms), -1)
+
+    def exercise_terms(self, exercises: Sequence[str]) -> np.ndarray:
+        """[e, t]: term t is a substring of exercise e"""
+        rows = np.zeros((len(exercises), len(self.terms)), dtype=np.int64)
+        for row, exercise in zip(rows, exercises):
+            row[:] = self._term_row(exercise)
+        return rows
+
+    @functools.lru_cache(maxsize=4096)
+    def _term_row(self, exercise: str) -> np.ndarray:
+        # Answers name exercises from a fixed catalog, so rows repeat across requests
+        lowered = exercise.lower()
+        return np.fromiter((term in lowered for term in self.terms), dtype=bool, count=len(self.terms))
+
+
+_compiled: Optional[_CompiledMappings] = None
+
+
+def _compiled_mappings() -> _CompiledMappings:
+    global _compiled
+    if _compiled is None:
+        _compiled = _CompiledMappings()
+    return _compiled
+
+
+class RiskBatch:
+    """
+    Scores for an exercises x profiles grid (RiskAssessmentEngine.assess_batch).
+    risk and effectiveness are [exercise, profile] int arrays; assessment(i, j)
+    is exactly RiskAssessmentEngine.assess_exercise(exercises[i], profiles[j]).
+    """
+
+    def __init__(self, exercises: Sequence[str], user_profiles: Sequence[Dict], compiled: _CompiledMappings):
+        engine = RiskAssessmentEngine
+        self.exercises = list(exercises)
+        self.profiles = list(user_profiles)
+        self._compiled = compiled
+
+        # Profile side: injuries per body part, and the goal's tier row
+        self._injuries = [[injury.lower() for injury in profile.get('injuries', []) or []] for profile in self.profiles]
+        injury_parts = np.array([
+            [sum(body_part in injury for injury in injuries) for body_part in compiled.body_parts]
+            for injuries in self._injuries
+        ], dtype=np.int64).reshape(len(self.profiles), len(compiled.body_parts))
+        has_injuries = np.array([bool(profile.get('injuries', [])) for profile in self.profiles], dtype=bool)
+        self._goals = [engine.map_goal((profile.get('goal', 'general') or 'general').lower()) for profile in self.profiles]
+        goal_index = np.array(
+            [compiled.goals.index(goal) if goal else len(compiled.goals) for goal in self._goals], dtype=np.int64
+        )
+
+        # Exercise side: which mapping names each exercise contains
+        terms = compiled.exercise_terms(self.exercises)
+        self._risk_parts = terms @ compiled.risk_terms  # [e, b] risky names matched per body part
+
+        hits = self._risk_parts @ injury_parts.T
+        self.risk = np.where(has_injuries[None, :], np.minimum(2 + 3 * hits, 10), 2)
+
+        # Tier per (exercise, goal): 3 = high, 2 = medium, 1 = low, 0 = none;
+        # the extra last goal column (all 0) stands for an unmapped goal
+        tier_hits = (terms @ compiled.tier_terms_flat).reshape(
+            len(self.exercises), len(engine.TIERS), len(compiled.goals)
+        ).transpose(1, 0, 2) > 0
+        ranks = np.arange(len(engine.TIERS), 0, -1)[:, None, None]
+        tiers = (tier_hits * ranks).max(axis=0, initial=0)
+        tiers = np.concatenate([tiers, np.zeros((len(self.exercises), 1), dtype=tiers.dtype)], axis=1)
+        self._tiers = tiers[:, goal_index]
+        scores = np.array([5] + [engine.TIER_SCORES[tier] for tier in reversed(engine.TIERS)])
+        self.effectiveness = scores[self._tiers]
+
+    def assessment(self, i: int, j: int) -> Dict:
+        """Same dict as assess_exercise(exercises[i], profiles[j])"""
+        engine = RiskAssessmentEngine
+        exercise = self.exercises[i]
+
+        if not self.profiles[j].get('injuries', []):
+            risk_reason = 'No injury history - low baseline risk'
+        else:
+            reasons = [
+                f"{body_part.capitalize()} injury increases risk for {exercise}"
+                for injury in self._injuries[j]
+                for b, body_part in enumerate(self._compiled.body_parts) if body_part in injury
+                for _ in range(self._risk_parts[i, b])
+            ]
+            risk_reason = '; '.join(reasons) if reasons else 'Low risk - no injury conflicts'
+
+        tier = self._tiers[i, j]
+        if tier:
+            effectiveness_reason = engine.TIER_REASONS[engine.TIERS[len(engine.TIERS) - tier]].format(goal=self._goals[j])
+        else:
+            effectiveness_reason = 'Moderate effectiveness for general fitness'
+
+        return {
+            'exercise': exercise,
+            'risk': int(self.risk[i, j]),
+            'effectiveness': int(self.effectiveness[i, j]),
+            'reason': f"{effectiveness_reason}. {risk_reason}"
+        }
+
+    def for_profile(self, j: int) -> List[Dict]:
+        """Assessments of every exercise for one profile, in exercise order"""
+        return [self.assessment(i, j) for i in range(len(self.exercises))]
+
+
 def calculate_risk(exercise: str, user_injury: str) -> List[RiskScoreItem]:
     """
     FIXED: Return List[RiskScoreItem] to match main.py expectations
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Set
+
+# ==========================================
+# Single-flight request coalescing
+# ==========================================
+# When a team gets the same instruction, many athletes ask the same
+# question within a minute. The first request for a key (the leader)
+# does the work; identical requests arriving while it is in flight
+# (followers) wait for its result instead of running retrieval and an
+# LLM call of their own. Once the flight lands, the response cache
+# serves later duplicates.
+#
+# The work runs as its own task, so a caller that disconnects (and is
+# cancelled) doesn't take the result away from the others waiting on it.
+# If that task itself is cancelled (shutdown), every waiter gets
+# FlightAborted rather than a cut-off answer.
+
+
+class FlightAborted(RuntimeError):
+    """The shared stream was cancelled before it finished"""
+
+
+class _Broadcast:
+    """Chunks of one in-flight stream, replayed to every subscriber"""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Condition()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls, by key: do() for a result,
+    stream() for a chunk stream (followers first get the chunks already
+    produced, then follow along). Every follower is a retrieval + LLM call
+    saved (unless the leader itself was answered from the response cache).
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._streams: Dict[Hashable, _Broadcast] = {}
+        self._pumps: Set[asyncio.Task] = set()  # the loop only keeps weak references to tasks
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+
+    def _count(self, leader: bool):
+        with self._lock:
+            if leader:
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+    async def do(self, key: Hashable, work: Callable[[], Awaitable]):
+        """Result of work(), shared with every identical call made while it runs"""
+        task = self._calls.get(key)
+        self._count(leader=task is None)
+        if task is None:
+            task = asyncio.ensure_future(work())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def stream(self, key: Hashable, work: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Chunks of work(), shared with every identical stream started while it runs"""
+        flight = self._streams.get(key)
+        self._count(leader=flight is None)
+        if flight is None:
+            flight = _Broadcast()
+            self._streams[key] = flight
+            pump = asyncio.ensure_future(self._pump(key, flight, work()))
+            self._pumps.add(pump)
+            pump.add_done_callback(self._pumps.discard)
+
+        sent = 0
+        while True:
+            async with flight.changed:
+                await flight.changed.wait_for(lambda: len(flight.chunks) > sent or flight.done)
+                chunks, done, error = flight.chunks[sent:], flight.done, flight.error
+            for chunk in chunks:
+                yield chunk
+            sent += len(chunks)
+            if done and sent == len(flight.chunks):
+                if error is not None:
+                    raise error
+                return
+
+    async def _pump(self, key: Hashable, flight: _Broadcast, chunks: AsyncIterator[str]):
+        try:
+            async for chunk in chunks:
+                async with flight.changed:
+                    flight.chunks.append(chunk)
+                    flight.changed.notify_all()
+        except Exception as e:
+            flight.error = e
+        except BaseException:
+            flight.error = FlightAborted("shared chat stream was cancelled before it finished")
+            raise
+        finally:
+            self._streams.pop(key, None)
+            async with flight.changed:
+                flight.done = True
+                flight.changed.notify_all()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            requests = self.leaders + self.followers
+            return {
+                "in_flight": len(self._calls) + len(self._streams),
+                "leaders": self.leaders,
+                "calls_saved": self.followers,
+                "coalesced_rate": round(self.followers / requests, 3) if requests else 0.0,
+            }
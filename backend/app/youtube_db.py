@@ -1,18 +1,32 @@
+from collections import OrderedDict
+from itertools import combinations
 from pathlib import Path
-from typing import List
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
 import logging
+import threading
+
+from app.exercise_names import bare_name, name_variants, tokenize
 
 logger = logging.getLogger(__name__)
 
+# Longest query (in distinct words) whose word subsets are looked up as names
+MAX_SUBSET_WORDS = 8
+
 class YouTubeLinksDB:
     """Load YouTube links from exercise.txt file"""
     
-    def __init__(self):
+    def __init__(self, exercise_file: Optional[Path] = None, memo_size: int = 2048):
         # Path to exercise.txt
         self.data_dir = Path(__file__).parent.parent / "data"
-        self.exercise_file = self.data_dir / "exercise.txt"
+        self.exercise_file = Path(exercise_file) if exercise_file else self.data_dir / "exercise.txt"
         self.links_cache = {}
         self._load_links()
+        self._build_index()
+
+        # Bounded memo of lookups (misses included), keyed by normalized tokens
+        self.memo_size = memo_size
+        self._memo: "OrderedDict[Tuple[str, ...], Optional[str]]" = OrderedDict()
+        self._memo_lock = threading.Lock()
     
     def _load_links(self):
         """Load links from exercise.txt with ||| separator"""
@@ -29,7 +43,7 @@ class YouTubeLinksDB:
                     
                     # Format: Exercise Name|||URL1|||URL2|||URL3
                     parts = line.split('|||')
-                    if len(parts) >= 2:
+                    if len(parts) >= 2 and parts[0].strip():  # " ||| URL" continuation lines have no name
                         exercise = parts[0].strip()
                         urls = [url.strip() for url in parts[1:] if url.strip()]
                         self.links_cache[exercise.lower()] = {
@@ -42,6 +56,25 @@ class YouTubeLinksDB:
         except Exception as e:
             logger.error(f"❌ Error loading exercise links: {e}")
     
+    def _build_index(self):
+        """Normalized names and an inverted token index over links_cache, built once"""
+        self._by_tokens: Dict[Tuple[str, ...], str] = {}          # normalized name -> links_cache key
+        self._by_token_set: Dict[FrozenSet[str], List[str]] = {}  # name token set -> keys
+        self._postings: Dict[str, Set[str]] = {}                  # token -> keys whose name has it
+        self._entry_size: Dict[str, int] = {}                     # key -> distinct name tokens
+        self._order: Dict[str, int] = {}                          # catalog order, for stable ties
+        for position, (key, data) in enumerate(self.links_cache.items()):
+            for tokens in name_variants(data['exercise']):
+                self._by_tokens.setdefault(tokens, key)
+            token_set = frozenset(tokenize(bare_name(data['exercise'])))
+            if not token_set:
+                continue
+            self._by_token_set.setdefault(token_set, []).append(key)
+            self._entry_size[key] = len(token_set)
+            self._order[key] = position
+            for token in token_set:
+                self._postings.setdefault(token, set()).add(key)
+
     def get_links(self, exercise: str) -> List[str]:
         """Get YouTube links for an exercise"""
         exercise_lower = exercise.lower().strip()
@@ -49,14 +82,56 @@ class YouTubeLinksDB:
         # Exact match first
         if exercise_lower in self.links_cache:
             return self.links_cache[exercise_lower]['urls']
-        
-        # Partial match (word contains)
-        for key, data in self.links_cache.items():
-            if exercise_lower in key or key in exercise_lower:
-                return data['urls']
-        
-        return []
-    
+
+        key = self._lookup(tuple(tokenize(exercise_lower)))
+        return self.links_cache[key]['urls'] if key else []
+
+    def _lookup(self, tokens: Tuple[str, ...]) -> Optional[str]:
+        """links_cache key for normalized tokens, through the memo"""
+        with self._memo_lock:
+            if tokens in self._memo:
+                self._memo.move_to_end(tokens)
+                return self._memo[tokens]
+
+        key = self._by_tokens.get(tokens) or self._best_match(tokens)
+
+        with self._memo_lock:
+            self._memo[tokens] = key
+            if len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return key
+
+    def _best_match(self, tokens: Tuple[str, ...]) -> Optional[str]:
+        """
+        Closest entry whose name contains the query's words ("Wide Grip
+        Pull-Ups" for "pull up") or whose words the query contains ("Bench
+        Press" for "close grip bench press"), by Jaccard overlap; ties go
+        to the earlier catalog entry. Neither side scans the catalog:
+        containing names come from intersecting postings (rarest word
+        first) and contained names from looking up the query's word
+        subsets, so a miss costs a handful of dict lookups.
+        """
+        query = frozenset(tokens)
+        if not query:
+            return None
+        candidates: Dict[str, float] = {}
+
+        postings = [self._postings.get(token) for token in query]
+        if all(postings):
+            postings.sort(key=len)
+            for key in postings[0].intersection(*postings[1:]):
+                candidates[key] = len(query) / self._entry_size[key]
+
+        words = sorted(query)[:MAX_SUBSET_WORDS]
+        for size in range(len(words), 0, -1):
+            for subset in combinations(words, size):
+                for key in self._by_token_set.get(frozenset(subset), ()):
+                    candidates.setdefault(key, size / len(query))
+
+        if not candidates:
+            return None
+        return min(candidates, key=lambda key: (-candidates[key], self._order[key]))
+
     def get_all_exercises(self) -> List[str]:
         """Get all available exercises"""
         return [data['exercise'] for data in self.links_cache.values()]
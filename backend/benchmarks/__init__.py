@@ -0,0 +1 @@
+"""Offline benchmarks for the Coach Carter backend (run from backend/)."""
@@ -0,0 +1,127 @@
+"""
+FAISS index types: recall@k against the flat index, query latency, size.
+
+Embeds the real expert_knowledge.txt chunks, then builds every configured
+index type (knowledge_base.build_index) on the real corpus and on a
+synthetically enlarged copy (noisy duplicates of the real vectors).
+Queries are real coaching questions plus perturbed corpus vectors; the
+flat index provides the exact top-k for recall. Latency is measured one
+query at a time, as the chat endpoint searches.
+
+Usage (from backend/):
+    python -m benchmarks.bench_ann_index --scale 20 --k 3 --nprobe 1,4,16 --ef-search 16,64,256
+"""
+import argparse
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+from app.embedding_backends import load_embedding_model
+from app.knowledge_base import build_index, chunk_corpus, configure_search, resolve_index_factory
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+# Kept local: importing the other benchmarks would start the full engine
+QUERIES = [
+    "Create a 4-week fat loss plan for beginners",
+    "Is a deadlift safe for someone with lower back pain?",
+    "How should cricket fast bowlers train their shoulders?",
+    "Best hamstring injury prevention drills for sprinters",
+    "Weekly basketball conditioning program for guards",
+    "How many sets and reps for hypertrophy?",
+    "Ankle sprain rehab exercises for football players",
+    "Recovery nutrition after a long match",
+]
+
+
+def load_corpus_embeddings():
+    """(corpus vectors, real query vectors) from the configured embedding model / backend"""
+    model = load_embedding_model()
+    text = (DATA_DIR / "expert_knowledge.txt").read_text(encoding="utf-8")
+    chunks = [chunk["text"] for chunk in chunk_corpus(text)]
+    corpus = model.encode(chunks, convert_to_numpy=True, show_progress_bar=False)
+    queries = model.encode(QUERIES, convert_to_numpy=True, show_progress_bar=False)
+    return np.asarray(corpus, dtype=np.float32), np.asarray(queries, dtype=np.float32)
+
+
+def perturb(vectors, count, noise, rng):
+    """count noisy copies of random rows (noise is relative to the per-dim std)"""
+    rows = vectors[rng.integers(0, len(vectors), count)]
+    return (rows + rng.normal(0, noise, rows.shape) * vectors.std(axis=0)).astype(np.float32)
+
+
+def recall_at_k(found, truth):
+    k = truth.shape[1]
+    return float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found.tolist(), truth.tolist())]))
+
+
+def configurations(specs, nprobes, ef_searches):
+    """(label, index spec, nprobe, efSearch) rows to benchmark"""
+    for spec in specs:
+        if spec.lower() == "hnsw" or spec.upper().startswith("HNSW"):
+            for ef in ef_searches:
+                yield f"{spec} ef={ef}", spec, None, ef
+        elif spec.lower().startswith("ivf"):
+            for nprobe in nprobes:
+                yield f"{spec} nprobe={nprobe}", spec, nprobe, None
+        else:
+            yield spec, spec, None, None
+
+
+def run(name, corpus, queries, args):
+    ids = np.arange(len(corpus), dtype=np.int64)
+    truth = build_index(corpus, ids, "flat").search(queries, args.k)[1]
+
+    print(f"\n{name}: {len(corpus)} vectors x {corpus.shape[1]} dims, {len(queries)} queries, k={args.k}")
+    print(f"{'index':<24} {'factory':<20} {'build s':>8} {'recall':>7} "
+          f"{'p50 us':>8} {'p99 us':>8} {'size MB':>8}")
+    built = {}
+    for label, spec, nprobe, ef_search in configurations(args.configs.split(","), args.nprobe, args.ef_search):
+        if spec not in built:
+            start = time.perf_counter()
+            built[spec] = (build_index(corpus, ids, spec), time.perf_counter() - start)
+        index, build_seconds = built[spec]
+        configure_search(index, nprobe, ef_search)
+
+        latencies, found = [], []
+        for row in range(len(queries)):
+            start = time.perf_counter()
+            _, result = index.search(queries[row:row + 1], args.k)
+            latencies.append(time.perf_counter() - start)
+            found.append(result[0])
+
+        print(f"{label:<24} {resolve_index_factory(spec, len(corpus), corpus.shape[1]):<20} "
+              f"{build_seconds:>8.2f} {recall_at_k(np.array(found), truth):>7.3f} "
+              f"{np.percentile(latencies, 50) * 1e6:>8.0f} {np.percentile(latencies, 99) * 1e6:>8.0f} "
+              f"{len(faiss.serialize_index(index)) / 1e6:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--configs", default="flat,hnsw,ivf-flat,ivf-pq",
+                        help="Presets or index_factory strings, comma separated")
+    parser.add_argument("--k", type=int, default=3, help="Neighbours per query (the engine uses 3)")
+    parser.add_argument("--nprobe", type=lambda s: [int(v) for v in s.split(",")], default=[1, 4, 16])
+    parser.add_argument("--ef-search", type=lambda s: [int(v) for v in s.split(",")], default=[16, 64, 256])
+    parser.add_argument("--queries", type=int, default=500, help="Perturbed corpus vectors used as queries")
+    parser.add_argument("--scale", type=int, default=20, help="Enlarged corpus = scale x real corpus")
+    parser.add_argument("--noise", type=float, default=0.3, help="Perturbation, in per-dim std units")
+    parser.add_argument("--threads", type=int, default=1, help="FAISS OpenMP threads")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(args.threads)
+    rng = np.random.default_rng(args.seed)
+    corpus, real_queries = load_corpus_embeddings()
+    queries = np.vstack([real_queries, perturb(corpus, args.queries, args.noise, rng)])
+
+    run("real corpus", corpus, queries, args)
+    if args.scale > 1:
+        enlarged = np.vstack([corpus, perturb(corpus, len(corpus) * (args.scale - 1), args.noise, rng)])
+        run(f"enlarged corpus (x{args.scale})", enlarged, queries, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Throughput of /api/chat as concurrent clients increase, against a stub LLM.
+
+Compares the async endpoint with the old blocking behaviour (a plain
+`def` route calling sync get_ai_response on Starlette's threadpool), and
+probes /api/health latency while each load level is running. Real
+embedding + FAISS retrieval is used; only Gemini is replaced by the stub LLM provider.
+
+Usage (from backend/):
+    python -m benchmarks.bench_async_chat --latency 0.5 --levels 1,8,32,128
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import statistics
+import time
+
+import httpx
+
+from app import ai_engine, config
+from app.main import app
+from app.schemas import UserQuery
+
+QUERY = "Create a 4-week fat loss plan for beginners."
+
+
+def blocking_chat(query: UserQuery):
+    """Pre-async behaviour: the whole generation holds a threadpool thread"""
+    return {"response_text": ai_engine.get_ai_response(query.text, query.mode.value, "")}
+
+
+app.add_api_route("/bench/blocking-chat", blocking_chat, methods=["POST"])
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of floats"""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+async def run_level(client, path, total, concurrency):
+    """Fires `total` requests from `concurrency` clients while probing /api/health"""
+    latencies = []
+    health_latencies = []
+    remaining = total
+    done = asyncio.Event()
+
+    async def chat_client():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            response = await client.post(
+                path, json={"text": QUERY, "user_id": "bench_user", "mode": "in-depth"}
+            )
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    async def health_probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            await client.get("/api/health")
+            health_latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(0.05)
+
+    probe = asyncio.create_task(health_probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(chat_client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await probe
+    return elapsed, latencies, health_latencies
+
+
+async def run_all(levels, requests_per_client):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        print(f"{'path':<10} {'clients':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'health p99 ms':>14}")
+        for name, path in (("async", "/api/chat"), ("blocking", "/bench/blocking-chat")):
+            for concurrency in levels:
+                total = concurrency * requests_per_client
+                with contextlib.redirect_stdout(io.StringIO()):  # engine prints per query
+                    elapsed, latencies, health = await run_level(client, path, total, concurrency)
+                print(f"{name:<10} {concurrency:>7} {total / elapsed:>8.1f} "
+                      f"{statistics.median(latencies) * 1000:>8.0f} "
+                      f"{percentile(latencies, 99) * 1000:>8.0f} "
+                      f"{percentile(health, 99) * 1000:>14.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.5, help="Stub LLM latency in seconds")
+    parser.add_argument("--levels", default="1,8,32,64,128", help="Concurrent client counts")
+    parser.add_argument("--requests-per-client", type=int, default=4)
+    args = parser.parse_args()
+
+    for name in ("app.main", "httpx"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    # Fixed-latency stub provider instead of Gemini (read when the engine loads)
+    config.LLM_PROVIDER = "stub"
+    config.LLM_STUB_LATENCY_MS = args.latency * 1000
+    config.LLM_STUB_DISTRIBUTION = "fixed"
+    ai_engine.get_engine()
+
+    print(f"Stub LLM latency: {args.latency:.2f}s | "
+          f"COACH_MAX_CONCURRENT_CHATS={config.MAX_CONCURRENT_CHATS} | "
+          f"COACH_RETRIEVAL_WORKERS={config.RETRIEVAL_WORKERS}")
+    levels = [int(level) for level in args.levels.split(",")]
+    asyncio.run(run_all(levels, args.requests_per_client))
+
+
+if __name__ == "__main__":
+    main()
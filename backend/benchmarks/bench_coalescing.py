@@ -0,0 +1,75 @@
+"""
+Team bursts on /api/chat with and without single-flight coalescing.
+
+--teams teams of --team-size athletes each send their team's question at
+the same moment (athletes of a team share a profile fingerprint, like a
+squad with the same sport, goals and injuries). Generation uses the stub
+LLM provider with --latency seconds per call; real embedding + FAISS
+retrieval runs. Each burst asks new questions, so the response cache
+can't answer them and only requests overlapping in flight share work.
+
+Usage (from backend/):
+    python -m benchmarks.bench_coalescing --teams 4 --team-size 25 --latency 0.5
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import statistics
+import time
+
+import httpx
+
+from app import ai_engine, config
+from app.main import app
+
+
+async def burst(client, teams, team_size, week):
+    async def ask(team):
+        start = time.perf_counter()
+        response = await client.post("/api/chat", json={
+            "text": f"Team {team}, week {week}: what should today's recovery session look like?",
+            "user_id": f"bench_team_{team}", "mode": "quick-tip",
+        })
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    return await asyncio.gather(*(ask(team) for team in range(teams) for _ in range(team_size)))
+
+
+async def run(args):
+    engine = ai_engine.get_engine()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        print(f"{'coalescing':<11} {'requests':>8} {'llm calls':>9} {'p50 ms':>8} {'max ms':>8} {'wall ms':>8}")
+        for week, enabled in enumerate((False, True)):
+            config.COALESCE_CHATS = enabled
+            calls_before = engine.llm.calls
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):  # engine prints per query
+                latencies = await burst(client, args.teams, args.team_size, week)
+            wall = time.perf_counter() - start
+            print(f"{'on' if enabled else 'off':<11} {len(latencies):>8} {engine.llm.calls - calls_before:>9} "
+                  f"{statistics.median(latencies) * 1000:>8.0f} {max(latencies) * 1000:>8.0f} {wall * 1000:>8.0f}")
+    print(f"coalescing stats: {engine.in_flight.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--teams", type=int, default=4)
+    parser.add_argument("--team-size", type=int, default=25)
+    parser.add_argument("--latency", type=float, default=0.5, help="Stub LLM latency in seconds")
+    args = parser.parse_args()
+
+    for name in ("app.main", "httpx"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    config.LLM_PROVIDER = "stub"
+    config.LLM_STUB_LATENCY_MS = args.latency * 1000
+    config.LLM_STUB_DISTRIBUTION = "fixed"
+    config.MAX_CONCURRENT_CHATS = 8  # generation slots are what duplicates would queue on
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Prompt context: raw top-3 chunks vs the token-budgeted ContextAssembler.
+
+Builds the knowledge base for the real expert_knowledge.txt (in a
+temporary directory, with the configured embedding model) and a labelled
+query set: each query is the sport plus a few words of one corpus fact,
+and it is a hit when that fact makes it into the context. Reports context
+tokens per query (estimate_tokens) and hit rate for the previous top-3
+join and for the assembler at several budgets, plus assembly time.
+
+Usage (from backend/):
+    python -m benchmarks.bench_context_assembly --queries 300 --budgets 160,200,240,320
+"""
+import argparse
+import random
+import re
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app import config
+from app.context_assembly import ContextAssembler, fact_key, split_header
+from app.embedding_backends import embedding_model_id, load_embedding_model
+from app.knowledge_base import load_or_build_knowledge_base
+from app.prompts import estimate_tokens
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+
+def labelled_queries(store, count, rng):
+    """(query, fact key) pairs sampled from whole facts of the corpus"""
+    facts = []
+    for cid in store["ids"].tolist():
+        header, body = split_header(store["chunks"][cid])
+        sport = store["chunk_meta"][cid]["sport"] or ""
+        for line in body.splitlines():
+            words = [word for word in re.findall(r"[A-Za-z]+", line) if len(word) > 3 and word != "Fact"]
+            if line.startswith("Fact") and len(words) >= 8:
+                facts.append((sport, words, fact_key(line)))
+    return [(" ".join([sport] + rng.sample(words, 6)), key) for sport, words, key in rng.sample(facts, count)]
+
+
+def hit(context, key):
+    return key in {fact_key(line) for line in context.splitlines()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--candidates", type=int, default=config.CONTEXT_CANDIDATES)
+    parser.add_argument("--budgets", default="160,200,240,320", help="Token budgets to compare")
+    parser.add_argument("--mmr-lambda", type=float, default=config.CONTEXT_MMR_LAMBDA)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    model = load_embedding_model()
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copy(DATA_DIR / "expert_knowledge.txt", tmp)
+        store = load_or_build_knowledge_base(Path(tmp), model, embedding_model_id())
+    queries = labelled_queries(store, args.queries, random.Random(args.seed))
+    query_vectors = np.asarray(model.encode([q for q, _ in queries], convert_to_numpy=True), dtype=np.float32)
+    _, top3 = store["index"].search(query_vectors, 3)
+    _, candidates = store["index"].search(query_vectors, args.candidates)
+
+    print(f"{len(store['ids'])} chunks, {len(queries)} labelled queries, {args.candidates} candidates")
+    print(f"{'context':<22} {'tokens/query':>12} {'hit rate':>9} {'assemble us':>12}")
+    contexts = ["\n\n".join(store["chunks"][cid] for cid in ids if cid >= 0) for ids in top3.tolist()]
+    print(f"{'top-3 join':<22} {np.mean([estimate_tokens(c) for c in contexts]):>12.1f} "
+          f"{np.mean([hit(c, key) for c, (_, key) in zip(contexts, queries)]):>9.3f} {'-':>12}")
+
+    for budget in (int(b) for b in args.budgets.split(",")):
+        assembler = ContextAssembler(store, {"in-depth": budget}, mmr_lambda=args.mmr_lambda,
+                                     dup_threshold=config.CONTEXT_DUP_THRESHOLD)
+        start = time.perf_counter()
+        contexts = [assembler.assemble(vector, ids, "in-depth") for vector, ids in zip(query_vectors, candidates)]
+        elapsed_us = (time.perf_counter() - start) / len(queries) * 1e6
+        print(f"{f'assembler {budget} tok':<22} {np.mean([estimate_tokens(c) for c in contexts]):>12.1f} "
+              f"{np.mean([hit(c, key) for c, (_, key) in zip(contexts, queries)]):>9.3f} {elapsed_us:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Embedding backends: torch vs ONNX int8 latency, throughput, memory, parity.
+
+Each backend (app/embedding_backends.load_embedding_model) runs in its own
+fresh process so memory isn't shared between them:
+- load time and RSS growth over the interpreter baseline (imports included:
+  torch is part of the torch backend's footprint, not the ONNX one's)
+- single-query latency (p50 / p99), as the chat endpoint embeds
+- throughput embedding the whole chunked corpus (batch 32)
+Then parity between the two: per-text cosine similarity on corpus + queries
+and top-k agreement of corpus retrieval.
+
+The ONNX model is exported on first use (python -m app.embedding_backends).
+
+Usage (from backend/):
+    python -m benchmarks.bench_embedding_backends --threads 1 --queries 200
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BACKEND_DIR / "data"
+
+# Kept local: importing the other benchmarks would start the full engine
+QUERIES = [
+    "Create a 4-week fat loss plan for beginners",
+    "Is a deadlift safe for someone with lower back pain?",
+    "How should cricket fast bowlers train their shoulders?",
+    "Best hamstring injury prevention drills for sprinters",
+    "Weekly basketball conditioning program for guards",
+    "How many sets and reps for hypertrophy?",
+    "Ankle sprain rehab exercises for football players",
+    "Recovery nutrition after a long match",
+]
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+
+
+def child(args):
+    """Runs in the per-backend process; writes embeddings to args.out, stats to stdout"""
+    baseline = rss_mb()
+    start = time.perf_counter()
+    from app.embedding_backends import load_embedding_model
+    from app.knowledge_base import chunk_corpus
+
+    model = load_embedding_model(args.model, args.child, args.threads)
+    model.encode(["warmup"], convert_to_numpy=True)
+    load_seconds = time.perf_counter() - start
+
+    latencies = []
+    for i in range(args.queries):
+        query = QUERIES[i % len(QUERIES)]
+        start = time.perf_counter()
+        model.encode([query], convert_to_numpy=True, show_progress_bar=False)
+        latencies.append(time.perf_counter() - start)
+
+    chunks = [chunk["text"] for chunk in chunk_corpus((DATA_DIR / "expert_knowledge.txt").read_text(encoding="utf-8"))]
+    start = time.perf_counter()
+    corpus = model.encode(chunks, convert_to_numpy=True, show_progress_bar=False, batch_size=32)
+    corpus_seconds = time.perf_counter() - start
+    queries = model.encode(QUERIES, convert_to_numpy=True, show_progress_bar=False)
+
+    np.savez(args.out, corpus=np.asarray(corpus, dtype=np.float32), queries=np.asarray(queries, dtype=np.float32))
+    print(json.dumps({
+        "load": load_seconds,
+        "p50": float(np.percentile(latencies, 50)),
+        "p99": float(np.percentile(latencies, 99)),
+        "chunks_per_second": len(chunks) / corpus_seconds,
+        "rss": rss_mb() - baseline,
+    }))
+
+
+def run_backend(backend, args, out):
+    command = [sys.executable, "-m", "benchmarks.bench_embedding_backends", "--child", backend,
+               "--out", str(out), "--queries", str(args.queries), "--threads", str(args.threads)]
+    if args.model:
+        command += ["--model", args.model]
+    proc = subprocess.run(command, cwd=BACKEND_DIR, capture_output=True, text=True, env=dict(os.environ))
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def model_size_mb(backend, model_name):
+    from app import config
+    from app.embedding_backends import EMBEDDER_CONFIG_FILE, onnx_model_dir
+
+    if backend == "onnx-int8":
+        model_dir = onnx_model_dir(model_name or config.EMBEDDING_MODEL_NAME)
+        model_file = json.loads((model_dir / EMBEDDER_CONFIG_FILE).read_text(encoding="utf-8"))["model_file"]
+        return (model_dir / model_file).stat().st_size / 1e6
+    path = Path(model_name or config.EMBEDDING_MODEL_NAME)
+    if not path.is_dir():
+        return float("nan")  # hub model: size lives in the HF cache
+    return sum(f.stat().st_size for f in path.rglob("*.safetensors")) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default=None, help="Model name or path (default: COACH_EMBEDDING_MODEL)")
+    parser.add_argument("--threads", type=int, default=1, help="CPU threads per backend (0 = library default)")
+    parser.add_argument("--queries", type=int, default=200, help="Single-query encodes to time")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args)
+
+    backends = ("torch", "onnx-int8")
+    with tempfile.TemporaryDirectory() as tmp:
+        results, vectors = {}, {}
+        for backend in backends:
+            out = Path(tmp) / f"{backend}.npz"
+            results[backend] = run_backend(backend, args, out)
+            vectors[backend] = np.load(out)
+
+    print(f"\n{args.queries} single queries, threads={args.threads}")
+    print(f"{'backend':<10} {'load s':>7} {'p50 ms':>7} {'p99 ms':>7} {'chunks/s':>9} {'RSS MB':>7} {'model MB':>9}")
+    for backend in backends:
+        r = results[backend]
+        print(f"{backend:<10} {r['load']:>7.2f} {r['p50'] * 1000:>7.2f} {r['p99'] * 1000:>7.2f} "
+              f"{r['chunks_per_second']:>9.0f} {r['rss']:>7.0f} {model_size_mb(backend, args.model):>9.1f}")
+
+    reference, quantized = vectors["torch"], vectors["onnx-int8"]
+    cosine = np.concatenate([
+        (reference[part] * quantized[part]).sum(axis=1) for part in ("corpus", "queries")
+    ])
+    top = {
+        backend: np.argsort(-v["queries"] @ v["corpus"].T, axis=1)[:, :args.k] for backend, v in vectors.items()
+    }
+    agreement = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(top["torch"].tolist(), top["onnx-int8"].tolist())])
+    print(f"\nparity: cosine min {cosine.min():.5f} / mean {cosine.mean():.5f}, "
+          f"top-{args.k} agreement {agreement:.3f} over {len(QUERIES)} queries")
+
+
+if __name__ == "__main__":
+    main()
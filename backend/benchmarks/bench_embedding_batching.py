@@ -0,0 +1,91 @@
+"""
+Query embedding + FAISS search: per-call path vs RetrievalBatcher.
+
+Each of N client threads issues queries back to back. The per-call
+path runs encode([query]) + index.search once per query (the old
+_retrieve_context); the batched path goes through RetrievalBatcher.
+
+Usage (from backend/):
+    python -m benchmarks.bench_embedding_batching --levels 1,4,16,64 --requests 512
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-stub-key")
+
+from app.embedding_batcher import RetrievalBatcher
+from benchmarks.bench_async_chat import percentile
+
+QUERIES = [
+    "Create a 4-week fat loss plan for beginners",
+    "Is a deadlift safe for someone with lower back pain?",
+    "How should cricket fast bowlers train their shoulders?",
+    "Best hamstring injury prevention drills for sprinters",
+    "Weekly basketball conditioning program for guards",
+    "How many sets and reps for hypertrophy?",
+    "Ankle sprain rehab exercises for football players",
+    "Recovery nutrition after a long match",
+]
+
+
+def run_level(retrieve, total, concurrency):
+    """Returns (elapsed, per-request latencies)"""
+    latencies = []
+
+    def one(i):
+        start = time.perf_counter()
+        retrieve(QUERIES[i % len(QUERIES)])
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    return time.perf_counter() - start, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--levels", default="1,4,16,64", help="Concurrent client threads")
+    parser.add_argument("--requests", type=int, default=512, help="Queries per level")
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app.ai_engine import get_engine
+        coach_ai = get_engine()
+    model = coach_ai.embedding_model
+    index = coach_ai.vector_store["index"]
+
+    def per_call(query):
+        query_emb = model.encode([query], convert_to_numpy=True)
+        return index.search(query_emb, 3)
+
+    batcher = RetrievalBatcher(
+        encode=lambda queries: model.encode(queries, convert_to_numpy=True),
+        search=index.search,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms
+    )
+
+    print(f"index: {index.ntotal} vectors | max batch {args.max_batch_size} | max wait {args.max_wait_ms} ms")
+    print(f"{'path':<10} {'clients':>7} {'q/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'avg batch':>9}")
+    for name, retrieve in (("per-call", per_call), ("batched", batcher.retrieve)):
+        for concurrency in (int(level) for level in args.levels.split(",")):
+            batches_before, items_before = batcher.batches, batcher.items
+            elapsed, latencies = run_level(retrieve, args.requests, concurrency)
+            batches = batcher.batches - batches_before
+            avg_batch = (batcher.items - items_before) / batches if batches else 1.0
+            print(f"{name:<10} {concurrency:>7} {args.requests / elapsed:>8.0f} "
+                  f"{statistics.median(latencies) * 1000:>8.2f} "
+                  f"{percentile(latencies, 99) * 1000:>8.2f} {avg_batch:>9.1f}")
+    batcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Exercise extraction: per-catalog-entry substring scans vs the token automaton.
+
+Builds long, in-depth training plans (weekly sessions of catalog exercises
+written the way the LLM writes them: plurals, hyphen variants, sets x reps,
+coaching cues from the knowledge base) and times extract_exercises against
+the previous implementation, which rebuilt the catalog list and ran one
+`in` scan per entry over the whole response. --catalog-scale adds synthetic
+catalog entries to show how each approach grows with exercise.txt.
+
+Also reports how many exercises each approach finds that the other does
+not (the substring scan also matches inside words: "Row" in "throw").
+
+Usage (from backend/):
+    python -m benchmarks.bench_exercise_extraction --weeks 1,4,16 --catalog-scale 1,10
+"""
+import argparse
+import random
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.exercise_parser import EXERCISE_ALIASES, ExerciseMatcher
+from app.youtube_db import get_all_exercises
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+
+def legacy_extract(ai_response, catalog):
+    """The extractor before the automaton (catalog list rebuilt per call in the original)"""
+    found_exercises = set()
+    response_lower = ai_response.lower()
+    for exercise in list(catalog):
+        if exercise.lower() in response_lower:
+            found_exercises.add(exercise)
+    return list(found_exercises)[:8]
+
+
+def make_plan(weeks, catalog, rng):
+    """Markdown plan: weeks x 4 sessions x 6 exercises with cues between them"""
+    cues = [line.strip() for line in (DATA_DIR / "expert_knowledge.txt").read_text(encoding="utf-8").splitlines()
+            if len(line.strip()) > 40]
+    lines = ["## Program Overview", rng.choice(cues)]
+    for week in range(1, weeks + 1):
+        lines.append(f"### Week {week}")
+        for day in range(1, 5):
+            lines.append(f"**Day {day}**")
+            for name in rng.sample(catalog, 6):
+                written = rng.choice([name, name.lower(), name.replace("-", " "), name.rstrip("s") + "s"])
+                lines.append(f"- {written}: {rng.randint(2, 5)}x{rng.randint(5, 15)} — {rng.choice(cues)}")
+    return "\n".join(lines)
+
+
+def timed(function, text, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(text)
+        latencies.append(time.perf_counter() - start)
+    return result, np.percentile(latencies, 50) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--weeks", type=lambda s: [int(v) for v in s.split(",")], default=[1, 4, 16])
+    parser.add_argument("--catalog-scale", type=lambda s: [int(v) for v in s.split(",")], default=[1, 10])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    real_catalog = get_all_exercises()
+    print(f"{'catalog':>8} {'plan chars':>10} {'compile ms':>10} {'legacy ms':>10} {'automaton ms':>13} "
+          f"{'speedup':>8} {'legacy only':>12} {'automaton only':>15}")
+    for scale in args.catalog_scale:
+        catalog = real_catalog + [f"{name} Variation {copy}" for copy in range(1, scale) for name in real_catalog]
+        start = time.perf_counter()
+        matcher = ExerciseMatcher.from_catalog(catalog, EXERCISE_ALIASES)
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        for weeks in args.weeks:
+            plan = make_plan(weeks, real_catalog, random.Random(args.seed))
+            legacy_all = {name for name in catalog if name.lower() in plan.lower()}
+            automaton_all = {exercise for _, _, exercise in matcher.find(plan)}
+            _, legacy_ms = timed(lambda text: legacy_extract(text, catalog), plan, args.repeat)
+            _, automaton_ms = timed(matcher.extract, plan, args.repeat)
+            print(f"{len(catalog):>8} {len(plan):>10} {compile_ms:>10.1f} {legacy_ms:>10.2f} {automaton_ms:>13.2f} "
+                  f"{legacy_ms / automaton_ms:>7.1f}x {len(legacy_all - automaton_all):>12} "
+                  f"{len(automaton_all - legacy_all):>15}")
+
+
+if __name__ == "__main__":
+    main()
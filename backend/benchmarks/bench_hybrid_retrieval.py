@@ -0,0 +1,110 @@
+"""
+Retrieval modes: vector (FAISS), hybrid (BM25 + FAISS, RRF) and fast (lexical-only when confident).
+
+Loads the engine with the stub LLM provider and micro-batching off, then
+runs a labelled query set through CoachCarterAI._embed_and_search +
+_context_from_ids in each COACH_RETRIEVAL_MODE, one query at a time as a
+lone chat request would. Queries are sampled from corpus facts:
+- keyword:  the sport plus 4 words of the fact ("cricket bowler rotator cuff")
+- phrased:  2 words of the fact wrapped in generic coaching phrasing
+The label is the chunk holding the fact. Reports recall@3, MRR over the
+candidates, context hit rate (the fact reaches the prompt), per-query
+latency and the share of queries that skipped the embedding.
+
+Usage (from backend/):
+    python -m benchmarks.bench_hybrid_retrieval --queries 200
+"""
+import argparse
+import contextlib
+import io
+import random
+import re
+import statistics
+import time
+
+import numpy as np
+
+from app import config
+from app.ai_engine import CoachCarterAI
+from app.context_assembly import fact_key, split_header
+
+MODES = ("vector", "hybrid", "fast")
+PHRASES = [
+    "how can I improve my {} and {} this season",
+    "what should my weekly plan look like for {} {}",
+    "any advice on {} when working on {}",
+    "best way to train {} with {} as a beginner",
+]
+
+
+def labelled_queries(store, count, rng):
+    """{"keyword": [...], "phrased": [...]} of (query, chunk id, fact key)"""
+    facts = []
+    for cid in store["ids"].tolist():
+        body = split_header(store["chunks"][cid])[1]
+        sport = store["chunk_meta"][cid]["sport"] or ""
+        for line in body.splitlines():
+            words = [word.lower() for word in re.findall(r"[A-Za-z]+", line) if len(word) > 3 and word != "Fact"]
+            if line.startswith("Fact") and len(words) >= 6:
+                facts.append((cid, sport, words, fact_key(line)))
+    sample = rng.sample(facts, count)
+    return {
+        "keyword": [(" ".join([sport] + rng.sample(words, 4)), cid, key) for cid, sport, words, key in sample],
+        "phrased": [(rng.choice(PHRASES).format(*rng.sample(words, 2)), cid, key) for cid, _, words, key in sample],
+    }
+
+
+def run_mode(engine, queries):
+    latencies, ranks, hits, skipped = [], [], [], 0
+    for query, label, key in queries:
+        start = time.perf_counter()
+        query_emb, ids = engine._embed_and_search(query)
+        context = engine._context_from_ids(ids, query_emb)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        found = [int(cid) for cid in ids]
+        ranks.append(found.index(label) + 1 if label in found else None)
+        hits.append(key in {fact_key(line) for line in context.splitlines()})
+        skipped += query_emb is None
+    return {
+        "recall@3": np.mean([rank is not None and rank <= 3 for rank in ranks]),
+        "mrr": np.mean([1.0 / rank if rank else 0.0 for rank in ranks]),
+        "context hit": np.mean(hits),
+        "p50 ms": statistics.median(latencies),
+        "p95 ms": float(np.percentile(latencies, 95)),
+        "no embed": skipped / len(queries),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--min-coverage", type=float, default=config.LEXICAL_MIN_COVERAGE)
+    parser.add_argument("--min-score", type=float, default=config.LEXICAL_MIN_SCORE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config.LLM_PROVIDER = "stub"
+    config.EMBED_BATCH_MAX_SIZE = 1  # one encode() per query, no batching window
+    config.RETRIEVAL_MODE = "hybrid"  # builds the BM25 index
+    config.LEXICAL_MIN_COVERAGE = args.min_coverage
+    config.LEXICAL_MIN_SCORE = args.min_score
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = CoachCarterAI()
+        engine.warmup()
+    query_sets = labelled_queries(engine.vector_store, args.queries, random.Random(args.seed))
+
+    print(f"{len(engine.vector_store['ids'])} chunks, {args.queries} queries per set, "
+          f"{engine._candidates()} candidates, fast path: coverage >= {args.min_coverage}, "
+          f"score >= {args.min_score}")
+    columns = ("recall@3", "mrr", "context hit", "p50 ms", "p95 ms", "no embed")
+    print(f"{'queries':<9} {'mode':<7} " + " ".join(f"{column:>11}" for column in columns))
+    for name, queries in query_sets.items():
+        for mode in MODES:
+            config.RETRIEVAL_MODE = mode
+            result = run_mode(engine, queries)
+            print(f"{name:<9} {mode:<7} " + " ".join(f"{result[column]:>11.3f}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+LLM tail latency with and without hedged requests, on the stub provider.
+
+The stub draws lognormal latencies with an occasional slow generation
+(--slow-rate calls take --slow-factor times longer), the pattern that
+dominates our p99. Each policy runs the same seeded workload through
+PromptLLM.agenerate from --concurrency clients: no hedging, hedging at
+the observed p95 (calibrated on the first --warmup calls), and hedging at
+a fixed delay. Extra load is the attempts sent per request.
+
+Usage (from backend/):
+    python -m benchmarks.bench_llm_hedging --latency-ms 100 --requests 1000 --concurrency 32
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from app.llm import CallPolicy, PromptLLM
+from app.llm_providers import StubProvider
+from app.prompts import PromptPrefix
+
+
+async def run(llm, requests, concurrency):
+    prefix = PromptPrefix("system")
+    latencies = []
+    remaining = requests
+
+    async def client():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            await llm.agenerate(prefix, "question")
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return np.array(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="Stub median latency")
+    parser.add_argument("--sigma", type=float, default=0.25)
+    parser.add_argument("--slow-rate", type=float, default=0.03)
+    parser.add_argument("--slow-factor", type=float, default=8.0)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=100, help="Calls to calibrate the p95 hedge delay")
+    parser.add_argument("--hedge-delay-ms", type=float, default=150.0, help="Delay for the fixed-delay policy")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    def provider():
+        return StubProvider(latency_ms=args.latency_ms, sigma=args.sigma, slow_rate=args.slow_rate,
+                            slow_factor=args.slow_factor, seed=args.seed)
+
+    policies = {
+        "no hedging": dict(hedge=False),
+        "hedge at p95": dict(hedge=True, hedge_delay_ms=0),
+        f"hedge at {args.hedge_delay_ms:.0f} ms": dict(hedge=True, hedge_delay_ms=args.hedge_delay_ms),
+    }
+
+    print(f"stub: median {args.latency_ms:.0f} ms, sigma {args.sigma}, "
+          f"{args.slow_rate:.0%} slow x{args.slow_factor:g} | {args.requests} requests, {args.concurrency} clients")
+    print(f"{'policy':<18} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'attempts/req':>13} {'hedge ms':>9}")
+    for name, settings in policies.items():
+        policy = CallPolicy(timeout_s=60, max_retries=0, hedge_min_samples=20, seed=args.seed, **settings)
+        llm = PromptLLM(provider(), policy=policy)
+        asyncio.run(run(llm, args.warmup, args.concurrency))
+        attempts_before, calls_before = policy.attempts, policy.calls
+        latencies = asyncio.run(run(llm, args.requests, args.concurrency))
+        stats = policy.stats()
+        attempts = (stats["attempts"] - attempts_before) / (stats["calls"] - calls_before)
+        hedge_ms = f"{stats['hedge_delay_ms']:.0f}" if stats["hedge_delay_ms"] is not None else "-"
+        print(f"{name:<18} {np.percentile(latencies, 50):>8.0f} {np.percentile(latencies, 95):>8.0f} "
+              f"{np.percentile(latencies, 99):>8.0f} {latencies.max():>8.0f} {attempts:>13.3f} {hedge_ms:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+"""
+Load test: a population of athletes against a real uvicorn server, per worker count.
+
+For each --workers count, starts `uvicorn app.main:app --workers N` with
+the stub LLM provider and a throwaway SQLite profile store (shared by all
+workers; data/profiles stays untouched), waits until every worker is
+ready, then drives it with an asyncio client:
+
+- a population of --users athletes, sampled from AthleteProfile's field
+  constraints and created before the timed steps
+- open-loop Poisson arrivals at each --rates step (requests/s) for
+  --duration seconds
+- the request mix --mix over:
+    chat            POST /api/chat as one of the athletes (quick-tip or
+                    in-depth by --quick-tip-share; --repeat-share of the
+                    questions are popular ones the response cache answers)
+    profile_get     GET /api/profile/{user_id}
+    profile_create  POST /api/profile/create for a new athlete
+
+Latency counts from each request's scheduled start, so a backed-up server
+shows up in the percentiles instead of slowing the client down.
+
+Reports, per worker count and rate: throughput, error rate and p50 / p95 /
+p99 per request type. A rate is sustained when throughput stays within
+10% of the offered rate, errors under 1% and chat p99 under --p99-slo-ms;
+the saturation point is the highest sustained rate. --url loads an
+already running server instead. Results go to --output as JSON.
+
+Usage (from backend/):
+    python -m benchmarks.bench_load --workers 1,2,4 --rates 10,20,40,80 --duration 20
+    python -m benchmarks.bench_load --url http://127.0.0.1:8000 --rates 5,10 --users 50
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, get_args, get_origin
+
+import httpx
+import numpy as np
+
+from app.athlete_profile import AthleteProfile
+from benchmarks.bench_pipeline import BACKEND_DIR, DATA_DIR, git_commit
+
+KINDS = ("chat", "profile_get", "profile_create")
+
+# Values for the free-text fields; numbers come from the schema's bounds
+TEXT_CHOICES = {
+    "gender": ["male", "female", "non-binary"],
+    "sport": ["football", "Soccer", "basketball", "athletics", "running", "swimming", "tennis",
+              "cycling", "rugby", "volleyball", "boxing", "rowing"],
+}
+LIST_CHOICES = {
+    "goals": ["strength", "endurance", "speed", "fat loss", "muscle gain", "mobility", "injury prevention"],
+    "available_equipment": ["barbell", "dumbbells", "kettlebell", "resistance bands", "pull-up bar",
+                            "bench", "treadmill", "bike"],
+    "injuries": ["left knee pain", "lower back strain", "shoulder impingement", "ankle sprain",
+                 "hamstring strain", "tennis elbow"],
+    "dietary_restrictions": ["vegetarian", "vegan", "gluten-free", "lactose intolerant"],
+}
+QUESTIONS = {
+    "quick-tip": [
+        "Best warm-up before {sport} training?",
+        "How do I recover faster after a hard {sport} session?",
+        "One exercise to improve my {goal} this week?",
+    ],
+    "in-depth": [
+        "Build me a {weeks}-week {goal} plan for {sport}, {sessions} sessions a week.",
+        "Plan my {sport} off-season around {goal}, working around {injury}.",
+    ],
+}
+
+
+# ==========================================
+# Population (from the AthleteProfile schema)
+# ==========================================
+def _bounds(field):
+    """(low, high) from the field's ge / le constraints"""
+    low = next((meta.ge for meta in field.metadata if hasattr(meta, "ge")), 0)
+    high = next((meta.le for meta in field.metadata if hasattr(meta, "le")), low + 100)
+    return low, high
+
+
+def _min_length(field):
+    return next((meta.min_length for meta in field.metadata if hasattr(meta, "min_length")), 0)
+
+
+def sample_profile(rng: random.Random, user_id: str) -> Dict:
+    """A valid random athlete: every field drawn within AthleteProfile's constraints"""
+    data = {"user_id": user_id}
+    for name, field in AthleteProfile.model_fields.items():
+        if name in data:
+            continue
+        if name in TEXT_CHOICES:
+            data[name] = rng.choice(TEXT_CHOICES[name])
+        elif field.annotation is int:
+            data[name] = rng.randint(*_bounds(field))
+        elif field.annotation is float:
+            data[name] = round(rng.uniform(*_bounds(field)), 1)
+        elif get_origin(field.annotation) is list and get_args(field.annotation) == (str,):
+            choices = LIST_CHOICES.get(name, [])
+            data[name] = rng.sample(choices, rng.randint(_min_length(field), min(3, len(choices))))
+        else:  # free text such as the name
+            data[name] = f"Athlete {user_id}"
+    return AthleteProfile(**data).model_dump(mode="json")
+
+
+def question(rng: random.Random, profile: Dict, mode: str, repeat_share: float) -> str:
+    """A chat question for the athlete; popular ones repeat across athletes"""
+    template = rng.choice(QUESTIONS[mode])
+    text = template.format(
+        sport=profile["sport"], goal=rng.choice(profile["goals"]), weeks=profile["duration_weeks"],
+        sessions=profile["sessions_per_week"], injury=(profile["injuries"] or ["no injuries"])[0],
+    )
+    if rng.random() < repeat_share:
+        return text
+    return f"{text} (ref {rng.getrandbits(32):08x})"
+
+
+# ==========================================
+# Server under test
+# ==========================================
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def build_knowledge_base(env):
+    """Builds the store once up front, so N workers don't all build it at startup"""
+    if (DATA_DIR / "kb_manifest.json").exists():
+        return
+    print("🧱 Building the knowledge base once before starting workers...")
+    subprocess.run([sys.executable, "-c", "from app import ai_engine; ai_engine.get_engine()"],
+                   cwd=BACKEND_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+
+
+def wait_until_ready(url, workers, process, log_path, timeout):
+    """Every worker answers /api/health/ready with 200 (probed until enough in a row do)"""
+    needed, in_a_row = 4 * workers, 0
+    deadline = time.monotonic() + timeout
+    with httpx.Client(base_url=url, timeout=5) as client:
+        while in_a_row < needed:
+            if process.poll() is not None or time.monotonic() > deadline:
+                tail = log_path.read_text(errors="replace")[-2000:]
+                raise RuntimeError(f"server did not become ready:\n{tail}")
+            try:
+                ready = client.get("/api/health/ready").status_code == 200
+            except httpx.HTTPError:
+                ready = False
+            in_a_row = in_a_row + 1 if ready else 0
+            if not ready:
+                time.sleep(0.5)
+
+
+@contextlib.contextmanager
+def serve(workers, args, tmp: Path, extra_env=None, name=None):
+    """Runs uvicorn with --workers workers on the stub LLM; yields its base URL and process"""
+    name = name or f"{workers}w"
+    env = dict(
+        os.environ,
+        COACH_LLM_PROVIDER="stub",
+        COACH_LLM_STUB_LATENCY_MS=str(args.llm_ms),
+        COACH_LLM_STUB_MS_PER_TOKEN=str(args.ms_per_token),
+        COACH_PROFILE_BACKEND="sqlite",
+        COACH_PROFILE_DB=str(tmp / f"profiles-{name}.db"),
+        **(extra_env or {}),
+    )
+    build_knowledge_base(env)
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    log_path = tmp / f"uvicorn-{name}.log"
+    with open(log_path, "wb") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+            cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+    try:
+        wait_until_ready(url, workers, process, log_path, args.startup_timeout)
+        yield url, process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+# ==========================================
+# Load generation
+# ==========================================
+class LoadClient:
+    """Sends one request of a given kind and records (kind, ok, latency, status)"""
+
+    def __init__(self, client: httpx.AsyncClient, population: List[Dict], args, rng: random.Random):
+        self.client = client
+        self.population = population
+        self.args = args
+        self.rng = rng
+        self.created = 0
+
+    def _request(self, kind):
+        rng = self.rng
+        if kind == "chat":
+            profile = rng.choice(self.population)
+            mode = "quick-tip" if rng.random() < self.args.quick_tip_share else "in-depth"
+            return "POST", "/api/chat", {
+                "text": question(rng, profile, mode, self.args.repeat_share),
+                "user_id": profile["user_id"], "mode": mode,
+            }
+        if kind == "profile_get":
+            return "GET", f"/api/profile/{rng.choice(self.population)['user_id']}", None
+        self.created += 1
+        return "POST", "/api/profile/create", sample_profile(rng, f"load_new_{self.created}_{rng.getrandbits(32):x}")
+
+    async def send(self, kind, scheduled):
+        method, path, body = self._request(kind)
+        try:
+            response = await self.client.request(method, path, json=body)
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 0  # timeout or connection error
+        return kind, 200 <= status < 300, time.perf_counter() - scheduled, status
+
+
+async def create_population(client: httpx.AsyncClient, population: List[Dict], concurrency=16):
+    slots = asyncio.Semaphore(concurrency)
+
+    async def create(profile):
+        async with slots:
+            (await client.post("/api/profile/create", json=profile)).raise_for_status()
+
+    await asyncio.gather(*(create(profile) for profile in population))
+
+
+async def run_step(load: LoadClient, rate: float, duration: float, mix: Dict[str, float], rng: random.Random):
+    """Poisson arrivals at rate/s for duration seconds; returns (samples, wall seconds)"""
+    kinds, weights = zip(*mix.items())
+    tasks = []
+    start = time.perf_counter()
+    offset = rng.expovariate(rate)
+    while offset < duration:
+        delay = start + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        kind = rng.choices(kinds, weights)[0]
+        tasks.append(asyncio.create_task(load.send(kind, start + offset)))
+        offset += rng.expovariate(rate)
+    samples = await asyncio.gather(*tasks)
+    return samples, time.perf_counter() - start
+
+
+def summarize(samples, elapsed, rate):
+    """One row for the step plus one per request kind"""
+    rows = []
+    for kind in ("all",) + KINDS:
+        picked = [sample for sample in samples if kind in ("all", sample[0])]
+        if not picked:
+            continue
+        latencies = np.array([latency for _, ok, latency, _ in picked if ok]) * 1000
+        errors = sum(1 for _, ok, _, _ in picked if not ok)
+        statuses: Dict[str, int] = {}
+        for _, ok, _, status in picked:
+            if not ok:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+        rows.append({
+            "rate": rate, "kind": kind, "requests": len(picked),
+            "throughput": (len(picked) - errors) / elapsed,
+            "error_rate": errors / len(picked), "errors_by_status": statuses,
+            **{f"p{q}_ms": float(np.percentile(latencies, q)) if len(latencies) else None for q in (50, 95, 99)},
+        })
+    return rows
+
+
+def sustained(rows, rate, slo_ms) -> bool:
+    """Throughput kept up, few errors, chat p99 within the SLO"""
+    overall = next(row for row in rows if row["kind"] == "all")
+    chat = next((row for row in rows if row["kind"] == "chat"), None)
+    chat_p99 = chat["p99_ms"] if chat else 0.0
+    return (overall["throughput"] >= 0.9 * rate and overall["error_rate"] < 0.01
+            and chat_p99 is not None and chat_p99 <= slo_ms)
+
+
+async def load_server(url, args, mix, seed):
+    """Every rate step against one server; returns the result rows"""
+    rng = random.Random(seed)
+    population = [sample_profile(rng, f"load_user_{i}") for i in range(args.users)]
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    results = []
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        await create_population(client, population)
+        load = LoadClient(client, population, args, rng)
+        if args.warmup:
+            await run_step(load, args.rates[0], args.warmup, mix, rng)
+        for rate in args.rates:
+            samples, elapsed = await run_step(load, rate, args.duration, mix, rng)
+            rows = summarize(samples, elapsed, rate)
+            ok = sustained(rows, rate, args.p99_slo_ms)
+            for row in rows:
+                row["sustained"] = ok
+            results.extend(rows)
+            print_step(rows)
+    return results
+
+
+# ==========================================
+# Report
+# ==========================================
+def print_header():
+    print(f"{'rate/s':>7} {'kind':<15} {'reqs':>6} {'ok/s':>8} {'errors':>7} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+
+
+def _ms(value):
+    return f"{value:>8.0f}" if value is not None else f"{'-':>8}"
+
+
+def print_step(rows):
+    for row in rows:
+        print(f"{row['rate']:>7g} {row['kind']:<15} {row['requests']:>6} {row['throughput']:>8.1f} "
+              f"{row['error_rate'] * 100:>6.1f}% {_ms(row['p50_ms'])} {_ms(row['p95_ms'])} {_ms(row['p99_ms'])}"
+              + ("   << saturated" if row["kind"] == "all" and not row["sustained"] else ""))
+
+
+def saturation(rows):
+    """(highest sustained rate, best throughput seen) for one server"""
+    overall = [row for row in rows if row["kind"] == "all"]
+    kept_up = [row["rate"] for row in overall if row["sustained"]]
+    return (max(kept_up) if kept_up else None), max(row["throughput"] for row in overall)
+
+
+def parse_mix(text) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        kind, weight = part.split("=")
+        if kind not in KINDS:
+            raise SystemExit(f"unknown request kind {kind!r} (one of {', '.join(KINDS)})")
+        mix[kind] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4", help="uvicorn worker counts to compare")
+    parser.add_argument("--url", default=None, help="Load this running server instead of starting one")
+    parser.add_argument("--rates", default="5,10,20,40", help="Offered load steps (requests/s)")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per rate step")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Untimed seconds at the first rate")
+    parser.add_argument("--users", type=int, default=200, help="Athletes created before the run")
+    parser.add_argument("--mix", default="chat=0.7,profile_get=0.25,profile_create=0.05")
+    parser.add_argument("--quick-tip-share", type=float, default=0.5, help="Share of chats in quick-tip mode")
+    parser.add_argument("--repeat-share", type=float, default=0.1, help="Share of chats asking a popular question")
+    parser.add_argument("--p99-slo-ms", type=float, default=5000.0, help="Chat p99 a sustained rate must meet")
+    parser.add_argument("--llm-ms", type=float, default=400.0, help="Stub LLM latency before the first token")
+    parser.add_argument("--ms-per-token", type=float, default=0.0, help="Stub LLM decode time per output token")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Client timeout per request (s)")
+    parser.add_argument("--max-connections", type=int, default=500)
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--output", default=None, help="Results file (default benchmarks/results/load-<commit>.json)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    args.rates = [float(rate) for rate in args.rates.split(",")]
+    mix = parse_mix(args.mix)
+
+    commit = git_commit()
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        targets = [("external", args.url)] if args.url else [(int(w), None) for w in args.workers.split(",")]
+        for workers, url in targets:
+            print(f"\n🏋️  {workers} worker(s)" if url is None else f"\n🏋️  {url}")
+            with contextlib.ExitStack() as stack:
+                if url is None:
+                    url, _ = stack.enter_context(serve(workers, args, Path(tmp)))
+                print_header()
+                rows = asyncio.run(load_server(url, args, mix, args.seed))
+            runs.append({"workers": workers, "results": rows})
+
+    print(f"\n{'workers':>8} {'saturation req/s':>17} {'peak ok/s':>10}")
+    for run in runs:
+        rate, peak = saturation(run["results"])
+        run["saturation_rate"], run["peak_throughput"] = rate, peak
+        shown = f"{rate:g}" if rate is not None else f"< {args.rates[0]:g}"
+        print(f"{run['workers']!s:>8} {shown:>17} {peak:>10.1f}")
+
+    output = Path(args.output or BACKEND_DIR / "benchmarks" / "results" / f"load-{commit}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "meta": {
+            "commit": commit, "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(), "machine": platform.platform(), "cpus": os.cpu_count(),
+            "args": vars(args),
+        },
+        "runs": runs,
+    }, indent=2), encoding="utf-8")
+    print(f"\n💾 Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
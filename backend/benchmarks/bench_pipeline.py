@@ -0,0 +1,374 @@
+"""
+Per-stage benchmark suite for /api/chat, offline against the stub LLM, with JSON results.
+
+Times every stage of the chat pipeline in isolation, on synthetic inputs
+of increasing size, then the whole endpoint through FastAPI's TestClient:
+
+- retrieval, per corpus scale (expert_knowledge.txt repeated --corpus-scale
+  times with each copy's facts made distinct, embedded into a temporary
+  store): query embedding, FAISS search, BM25 search, context assembly
+- prompt build (prefix cache cold / warm + suffix), stub generation
+  (PromptLLM + CallPolicy overhead, zero-latency provider)
+- post-processing, per catalog scale (exercise.txt plus synthetic
+  variations): extract_exercises, risk scoring, get_youtube_links and
+  AIResponse validation + JSON serialization
+- end to end: POST /api/chat with and without an athlete profile, with the
+  stub provider's latency set by --llm-ms (0 = our own overhead only)
+
+Queries are embedded by the configured model (COACH_EMBEDDING_BACKEND);
+with --embedder auto (default) the run falls back to the hashed embedder
+when that model can't be loaded (not cached and no network, e.g.
+HF_HUB_OFFLINE=1), and --embedder hashed always uses it. Hashed timings
+are not comparable with model timings: the embedder is in the results.
+
+Results (one row per stage and scale: n, mean / p50 / p95 ms) plus the
+git commit, settings, embedder and machine are written to --output;
+--compare prints the change against an earlier results file.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pipeline --corpus-scale 1,4 --catalog-scale 1,10,100
+    HF_HUB_OFFLINE=1 python -m benchmarks.bench_pipeline --embedder hashed
+    python -m benchmarks.bench_pipeline --compare benchmarks/results/pipeline-<commit>.json
+"""
+import argparse
+import contextlib
+import functools
+import io
+import json
+import logging
+import os
+import platform
+import random
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app import config
+from app.context_assembly import ContextAssembler
+from app.embedding_backends import embedding_model_id, load_embedding_model
+from app.exercise_parser import EXERCISE_ALIASES, ExerciseMatcher
+from app.knowledge_base import load_or_build_knowledge_base
+from app.lexical_index import BM25Index
+from app.llm import CallPolicy, PromptLLM
+from app.llm_providers import StubProvider
+from app.prompts import PromptPrefixCache, prompt_suffix
+from app.risk_module import RiskAssessmentEngine
+from app.schemas import AIResponse, RiskScoreItem, YouTubeLinkItem
+from app.youtube_db import YouTubeLinksDB
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BACKEND_DIR / "data"
+
+QUERIES = [
+    "Create a 4-week fat loss plan for beginners",
+    "Is a deadlift safe for someone with lower back pain?",
+    "How should cricket fast bowlers train their shoulders?",
+    "Best hamstring injury prevention drills for sprinters",
+    "Weekly basketball conditioning program for guards",
+    "How many sets and reps for hypertrophy?",
+    "Ankle sprain rehab exercises for football players",
+    "Recovery nutrition after a long match",
+]
+PROFILE = {
+    "user_id": "bench_pipeline", "name": "Bench Athlete", "age": 24, "sport": "Cricket",
+    "height_cm": 182, "weight_kg": 78, "gender": "female", "experience_years": 5, "goals": ["strength", "injury prevention"],
+    "injuries": ["lower back pain"], "duration_weeks": 8, "sessions_per_week": 4,
+    "available_equipment": ["barbell", "dumbbells"],
+}
+
+
+# ==========================================
+# Timing
+# ==========================================
+def measure(function, repeat, warmup=1):
+    """Durations (ms) of repeat calls, after warmup untimed ones"""
+    for _ in range(warmup):
+        function()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def summarize(stage, scale, times):
+    return {
+        "stage": stage, "scale": scale, "n": len(times),
+        "mean_ms": round(float(np.mean(times)), 4),
+        "p50_ms": round(float(np.percentile(times, 50)), 4),
+        "p95_ms": round(float(np.percentile(times, 95)), 4),
+    }
+
+
+def cycle(items):
+    """Callable returning the next item each call (so repeats don't hit one memo entry)"""
+    state = {"i": -1}
+
+    def next_item():
+        state["i"] = (state["i"] + 1) % len(items)
+        return items[state["i"]]
+
+    return next_item
+
+
+# ==========================================
+# Synthetic inputs
+# ==========================================
+def scaled_corpus(scale):
+    """expert_knowledge.txt scale times; copies get distinct fact text (so distinct chunk ids)"""
+    text = (DATA_DIR / "expert_knowledge.txt").read_text(encoding="utf-8")
+    copies = [text] + [re.sub(r"(?m)^(\s*Fact\b.*?)\s*$", rf"\1 (variant {copy})", text) for copy in range(1, scale)]
+    return "\n\n".join(copies)
+
+
+def scaled_catalog(path, scale):
+    """exercise.txt plus scale - 1 synthetic variations of every entry; returns the names"""
+    lines = [line for line in (DATA_DIR / "exercise.txt").read_text(encoding="utf-8").splitlines()
+             if "|||" in line and line.split("|||")[0].strip()]
+    extra = [line.replace(" |||", f" Variation {copy} |||", 1) for copy in range(1, scale) for line in lines]
+    path.write_text("\n".join(lines + extra), encoding="utf-8")
+    return [line.split("|||")[0].strip() for line in lines + extra]
+
+
+def make_answer(names, rng, weeks=4):
+    """In-depth style markdown plan naming catalog exercises"""
+    lines = ["## Program Overview", "Build strength while protecting the lower back."]
+    for week in range(1, weeks + 1):
+        lines.append(f"### Week {week}")
+        for day in range(1, 4):
+            picks = rng.sample(names, 4)
+            lines.append(f"**Day {day}**: " + ", ".join(f"{name} 3x{rng.randint(5, 12)}" for name in picks))
+    return "\n".join(lines)
+
+
+# ==========================================
+# Embedder
+# ==========================================
+def load_embedder(choice):
+    """
+    Embedding model for --embedder: "configured", "hashed", or "auto" (the
+    configured one, or hashed when it can't be loaded). Switches
+    config.EMBEDDING_BACKEND to hashed when used, so the engine the
+    end-to-end runs start embeds the same way.
+    """
+    if choice != "hashed":
+        try:
+            return load_embedding_model()
+        except (OSError, ImportError) as e:
+            if choice != "auto":
+                raise
+            print(f"⚠️  Can't load {embedding_model_id()} ({type(e).__name__}); using the hashed embedder")
+    config.EMBEDDING_BACKEND = "hashed"
+    return load_embedding_model()
+
+
+# ==========================================
+# Stages
+# ==========================================
+def retrieval_stages(model, scales, repeat, rows):
+    query_vectors = np.asarray(model.encode(QUERIES, convert_to_numpy=True), dtype=np.float32)
+    rows.append(summarize("embed_query", 1, measure(
+        lambda q=cycle(QUERIES): model.encode([q()], convert_to_numpy=True), repeat)))
+
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as tmp:
+            (Path(tmp) / "expert_knowledge.txt").write_text(scaled_corpus(scale), encoding="utf-8")
+            with contextlib.redirect_stdout(io.StringIO()):
+                store = load_or_build_knowledge_base(Path(tmp), model, embedding_model_id())
+        lexical = BM25Index.from_store(store)
+        assembler = ContextAssembler(
+            store, {"quick-tip": config.CONTEXT_BUDGET_QUICK_TIP, "in-depth": config.CONTEXT_BUDGET_IN_DEPTH},
+            mmr_lambda=config.CONTEXT_MMR_LAMBDA, dup_threshold=config.CONTEXT_DUP_THRESHOLD
+        )
+        k = config.CONTEXT_CANDIDATES
+        candidates = [store["index"].search(vector[None, :], k)[1][0] for vector in query_vectors]
+        pairs = list(zip(query_vectors, candidates))
+
+        rows.append(summarize("faiss_search", scale, measure(
+            lambda v=cycle(query_vectors): store["index"].search(v()[None, :], k), repeat)))
+        rows.append(summarize("bm25_search", scale, measure(
+            lambda q=cycle(QUERIES): lexical.search(q(), k), repeat)))
+        rows.append(summarize("context_assembly", scale, measure(
+            lambda p=cycle(pairs): assembler.assemble(*p(), "in-depth"), repeat)))
+        print(f"   retrieval x{scale}: {len(store['ids'])} chunks")
+    return rows
+
+
+def prompt_and_generation_stages(repeat, rows):
+    profile_text = "\n".join(f"- {key}: {value}" for key, value in PROFILE.items())
+    context = (DATA_DIR / "expert_knowledge.txt").read_text(encoding="utf-8")[:1200]
+    warm = PromptPrefixCache()
+
+    def build(cache):
+        return cache.get("in-depth", profile_text), prompt_suffix(QUERIES[0], context)
+
+    rows.append(summarize("prompt_build_cold", 1, measure(lambda: build(PromptPrefixCache()), repeat)))
+    rows.append(summarize("prompt_build_warm", 1, measure(lambda: build(warm), repeat)))
+
+    generator = PromptLLM(StubProvider(latency_ms=0, distribution="fixed"),
+                          policy=CallPolicy(max_retries=0, hedge=False))
+    prefix, suffix = build(warm)
+    rows.append(summarize("stub_generation", 1, measure(lambda: generator.generate(prefix, suffix), repeat)))
+    return rows
+
+
+def post_processing_stages(scales, repeat, seed, rows):
+    risk_profile = {"injuries": PROFILE["injuries"], "goal": PROFILE["goals"][0]}
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as tmp:
+            names = scaled_catalog(Path(tmp) / "exercise.txt", scale)
+            links = YouTubeLinksDB(Path(tmp) / "exercise.txt")
+        matcher = ExerciseMatcher.from_catalog(names, EXERCISE_ALIASES)
+        rng = random.Random(seed)
+        answers = [make_answer(names, rng) for _ in range(16)]
+        extracted = [matcher.extract(answer) for answer in answers]
+
+        def risk(found):
+            # As build_enrichment scores them: one RiskBatch per answer
+            batch = RiskAssessmentEngine.assess_batch(found, [risk_profile])
+            return [{"exercise": name, "risk": int(risk), "effectiveness": int(effectiveness)}
+                    for name, risk, effectiveness in zip(found, batch.risk[:, 0], batch.effectiveness[:, 0])]
+
+        def youtube(found):
+            return [links.get_links(name) for name in found]
+
+        def response(answer, found):
+            urls = [(name, link[0]) for name, link in zip(found, youtube(found)) if link]
+            model = AIResponse(
+                response_text=answer,
+                risk_scores=[RiskScoreItem(exercise=item["exercise"], risk=item["risk"],
+                                           effectiveness=item["effectiveness"]) for item in risk(found)],
+                youtube_links=[YouTubeLinkItem(exercise=name, url=url) for name, url in urls],
+            )
+            return model.model_dump_json()
+
+        rows.append(summarize("extract_exercises", scale, measure(
+            lambda a=cycle(answers): matcher.extract(a()), repeat)))
+        rows.append(summarize("risk_scoring", scale, measure(lambda f=cycle(extracted): risk(f()), repeat)))
+        rows.append(summarize("youtube_links", scale, measure(lambda f=cycle(extracted): youtube(f()), repeat)))
+        rows.append(summarize("response_model", scale, measure(
+            lambda p=cycle(list(zip(answers, extracted))): response(*p()), repeat)))
+        print(f"   post-processing x{scale}: {len(names)} catalog entries")
+    return rows
+
+
+def end_to_end(requests, llm_ms, rows):
+    config.LLM_PROVIDER = "stub"
+    config.LLM_STUB_LATENCY_MS = llm_ms
+    config.LLM_STUB_DISTRIBUTION = "fixed"
+    from fastapi.testclient import TestClient
+
+    from app import ai_engine, main
+    from app.profile_service import UserProfileService
+
+    for name in ("app.main", "httpx"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        if config.EMBEDDING_BACKEND == "hashed":
+            # Its own store, so data/'s store for the real model isn't re-embedded
+            data_dir = Path(tmp) / "data"
+            data_dir.mkdir()
+            shutil.copy(DATA_DIR / "expert_knowledge.txt", data_dir)
+            ai_engine.engine_loader = ai_engine.EngineLoader(
+                factory=functools.partial(ai_engine.CoachCarterAI, data_dir=data_dir))
+
+        with TestClient(main.app) as client:
+            main.profile_service = UserProfileService(profiles_dir=Path(tmp))  # keep data/profiles untouched
+            with contextlib.redirect_stdout(io.StringIO()):
+                ai_engine.get_engine()
+                client.post("/api/profile/create", json=PROFILE).raise_for_status()
+
+            for stage, user_id in (("e2e_chat_no_profile", "bench_nobody"), ("e2e_chat_profile", PROFILE["user_id"])):
+                asked = iter(range(10 ** 9))
+
+                def chat():
+                    # A new question each time: the response cache would answer repeats
+                    response = client.post("/api/chat", json={
+                        "text": f"{QUERIES[0]} (run {next(asked)})", "user_id": user_id, "mode": "in-depth"})
+                    response.raise_for_status()
+
+                with contextlib.redirect_stdout(io.StringIO()):
+                    rows.append(summarize(stage, 1, measure(chat, requests)))
+    return rows
+
+
+# ==========================================
+# Results
+# ==========================================
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(rows, baseline_path):
+    baseline = {(row["stage"], row["scale"]): row for row in json.loads(Path(baseline_path).read_text())["results"]}
+    print(f"\nvs {baseline_path}:")
+    print(f"{'stage':<22} {'scale':>5} {'p50 ms':>10} {'before':>10} {'change':>8}")
+    for row in rows:
+        before = baseline.get((row["stage"], row["scale"]))
+        if before is None:
+            continue
+        change = (row["p50_ms"] / before["p50_ms"] - 1) * 100 if before["p50_ms"] else 0.0
+        print(f"{row['stage']:<22} {row['scale']:>5} {row['p50_ms']:>10.3f} {before['p50_ms']:>10.3f} {change:>+7.0f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus-scale", default="1,4", help="Knowledge base sizes (x expert_knowledge.txt)")
+    parser.add_argument("--catalog-scale", default="1,10,100", help="Catalog sizes (x exercise.txt)")
+    parser.add_argument("--repeat", type=int, default=200, help="Timed calls per isolated stage")
+    parser.add_argument("--requests", type=int, default=30, help="Timed /api/chat requests per end-to-end case")
+    parser.add_argument("--llm-ms", type=float, default=0.0, help="Stub LLM latency for the end-to-end runs")
+    parser.add_argument("--skip-e2e", action="store_true")
+    parser.add_argument("--output", default=None,
+                        help="Results file (default benchmarks/results/pipeline-<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare against")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--embedder", choices=("auto", "configured", "hashed"), default="auto",
+                        help="Query embedder; auto falls back to hashed when the model can't be loaded offline")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    print("⏱️  Stage benchmarks")
+    model = load_embedder(args.embedder)
+    print(f"   embedder: {embedding_model_id()}")
+    rows = []
+    retrieval_stages(model, [int(s) for s in args.corpus_scale.split(",")], args.repeat, rows)
+    prompt_and_generation_stages(args.repeat, rows)
+    post_processing_stages([int(s) for s in args.catalog_scale.split(",")], args.repeat, args.seed, rows)
+    if not args.skip_e2e:
+        end_to_end(args.requests, args.llm_ms, rows)
+
+    print(f"\n{'stage':<22} {'scale':>5} {'n':>5} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10}")
+    for row in rows:
+        print(f"{row['stage']:<22} {row['scale']:>5} {row['n']:>5} {row['mean_ms']:>10.3f} "
+              f"{row['p50_ms']:>10.3f} {row['p95_ms']:>10.3f}")
+
+    output = Path(args.output or BACKEND_DIR / "benchmarks" / "results" / f"pipeline-{commit}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "meta": {
+            "commit": commit, "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(), "machine": platform.platform(), "cpus": os.cpu_count(),
+            "embedding_model": embedding_model_id(), "embedding_backend": config.EMBEDDING_BACKEND,
+            "retrieval_mode": config.RETRIEVAL_MODE,
+            "args": vars(args),
+        },
+        "results": rows,
+    }, indent=2), encoding="utf-8")
+    print(f"\n💾 Results saved to {output}")
+    if args.compare:
+        compare(rows, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Profile loading: read + parse + validate per request vs the profile cache.
+
+Writes --profiles athlete profiles to a temporary directory and times
+UserProfileService.get_profile the way /api/chat calls it, for a service
+with the cache disabled (every call opens, parses and validates the JSON
+file) and with the default cache (a stat() to check the file is
+unchanged). Lookups follow a skewed distribution: a few athletes chat a lot.
+
+Usage (from backend/):
+    python -m benchmarks.bench_profile_cache --profiles 500 --lookups 20000
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.athlete_profile import AthleteProfile
+from app.profile_service import UserProfileService
+
+
+def make_profile(user_id, rng):
+    return AthleteProfile(
+        user_id=user_id, name=f"Athlete {user_id}", age=rng.randint(16, 40), height_cm=rng.randint(160, 200),
+        weight_kg=rng.randint(55, 100), gender=rng.choice(["female", "male"]),
+        sport=rng.choice(["football", "cricket", "basketball", "tennis"]), experience_years=rng.randint(0, 15),
+        goals=rng.sample(["speed", "strength", "endurance", "muscle gain", "fat loss"], 2),
+        duration_weeks=rng.randint(4, 16), sessions_per_week=rng.randint(2, 6),
+        available_equipment=rng.sample(["dumbbells", "barbell", "bands", "kettlebell", "pull-up bar"], 3),
+        injuries=rng.sample(["lower back pain", "knee tendonitis", "ankle sprain"], rng.randint(0, 2)),
+    )
+
+
+def time_lookups(service, user_ids):
+    latencies = []
+    for user_id in user_ids:
+        start = time.perf_counter()
+        service.get_profile(user_id)
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=500)
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = UserProfileService(Path(tmp), cache_size=0)
+        user_ids = [f"user_{i}" for i in range(args.profiles)]
+        for user_id in user_ids:
+            writer.save_profile(make_profile(user_id, rng))
+        weights = 1 / np.arange(1, args.profiles + 1)  # Zipf-like: a few athletes chat a lot
+        lookups = rng.choices(user_ids, weights=weights, k=args.lookups)
+
+        print(f"{args.profiles} profiles, {args.lookups} lookups")
+        print(f"{'service':<12} {'p50 us':>8} {'p99 us':>8} {'mean us':>8} {'hit rate':>9}")
+        for name, service in (("no cache", UserProfileService(Path(tmp), cache_size=0)),
+                              ("cache", UserProfileService(Path(tmp)))):
+            latencies = time_lookups(service, lookups)
+            print(f"{name:<12} {np.percentile(latencies, 50):>8.1f} {np.percentile(latencies, 99):>8.1f} "
+                  f"{latencies.mean():>8.1f} {service.cache_stats()['hit_rate']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
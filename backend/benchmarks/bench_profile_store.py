@@ -0,0 +1,99 @@
+"""
+Profile storage at scale: JSON directory vs SQLite (WAL), get / save / query.
+
+Fills each backend with --profiles synthetic athletes (JSON: one file
+each through save(); SQLite: the bulk save_many() the migrate command
+uses), then times, through UserProfileService with the profile cache off
+so the storage itself is measured:
+- get_profile of random athletes
+- save_profile (update) of random athletes
+- query_profiles(sport, injury), e.g. cricket players with a knee injury
+
+Usage (from backend/):
+    python -m benchmarks.bench_profile_store --profiles 100000
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.athlete_profile import AthleteProfile
+from app.profile_service import UserProfileService
+from app.profile_store import JsonDirStore, SqliteStore
+
+SPORTS = ["football", "cricket", "basketball", "tennis", "athletics", "swimming", "rugby", "badminton"]
+INJURIES = ["left knee pain", "lower back strain", "shoulder impingement", "ankle sprain", "wrist strain",
+            "hamstring pull", "hip flexor tightness", "tennis elbow"]
+QUERIES = [("cricket", "knee"), ("football", "ankle"), ("tennis", None), (None, "shoulder"),
+           ("swimming", "back hip")]
+
+
+def make_profile(user_id, rng):
+    return AthleteProfile(
+        user_id=user_id, name=f"Athlete {user_id}", age=rng.randint(16, 40), height_cm=rng.randint(160, 200),
+        weight_kg=rng.randint(55, 100), gender=rng.choice(["female", "male"]), sport=rng.choice(SPORTS),
+        experience_years=rng.randint(0, 15), goals=rng.sample(["speed", "strength", "endurance", "fat loss"], 2),
+        duration_weeks=rng.randint(4, 16), sessions_per_week=rng.randint(2, 6),
+        available_equipment=rng.sample(["dumbbells", "barbell", "bands", "kettlebell"], 2),
+        injuries=rng.sample(INJURIES, rng.choice([0, 0, 1, 1, 2])),
+    )
+
+
+def timed(calls):
+    latencies = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000
+
+
+def fill(name, store, profiles):
+    start = time.perf_counter()
+    if name == "sqlite":
+        store.save_many(profile.model_dump() for profile in profiles)
+    else:
+        for profile in profiles:
+            store.save(profile.user_id, profile.model_dump())
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=100_000)
+    parser.add_argument("--ops", type=int, default=2000, help="get and save calls per backend")
+    parser.add_argument("--query-repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    profiles = [make_profile(f"user_{i}", rng) for i in range(args.profiles)]
+    picks = [rng.randrange(args.profiles) for _ in range(args.ops)]
+    updates = [make_profile(f"user_{i}", rng) for i in picks]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stores = {"json": JsonDirStore(Path(tmp) / "profiles"), "sqlite": SqliteStore(Path(tmp) / "profiles.db")}
+        print(f"{args.profiles} profiles, {args.ops} gets / saves, queries x{args.query_repeat} (ms)")
+        print(f"{'backend':<8} {'fill s':>7} {'get p50':>8} {'get p99':>8} {'save p50':>9} {'save p99':>9} "
+              + " ".join(f"{(sport or '*') + '/' + (injury or '*'):>18}" for sport, injury in QUERIES))
+        for name, store in stores.items():
+            fill_seconds = fill(name, store, profiles)
+            service = UserProfileService(store=store, cache_size=0)
+            gets = timed(lambda i=i: service.get_profile(f"user_{i}") for i in picks)
+            saves = timed(lambda p=p: service.save_profile(p) for p in updates)
+            queries = []
+            for sport, injury in QUERIES:
+                found = len(service.query_profiles(sport, injury))
+                best = timed(lambda: service.query_profiles(sport, injury) for _ in range(args.query_repeat)).min()
+                queries.append(f"{best:>10.1f} ({found:>5})")
+            print(f"{name:<8} {fill_seconds:>7.1f} {np.percentile(gets, 50):>8.3f} {np.percentile(gets, 99):>8.3f} "
+                  f"{np.percentile(saves, 50):>9.3f} {np.percentile(saves, 99):>9.3f} " + " ".join(queries))
+        stores["sqlite"].close()
+    print("query columns: sport/injury, best time (matching profiles)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Prompt prefix reuse: rendering per request vs PromptPrefixCache, and the
+LLM input tokens / prefill latency a context cache saves per request.
+
+Simulates --requests chats from --profiles athletes (skewed: a few
+athletes chat a lot, mixed quick/in-depth modes) with a retrieved-context
+suffix of --context-chars characters. Prompt build time is measured; the
+generation side runs on an offline model through PromptLLM with the
+"local" context cache stand-in, so tokens saved are the tokens a provider
+cache would have served (latency saved uses --prefill-ms-per-1k).
+--min-tokens applies the provider's minimum cacheable prefix size.
+
+Usage (from backend/):
+    python -m benchmarks.bench_prompt_prefix --profiles 200 --requests 20000
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from app.llm import LocalContextCache, PromptLLM
+from app.llm_providers import LLMProvider
+from app.prompts import PromptPrefixCache, build_prompt, prompt_suffix
+from benchmarks.bench_profile_cache import make_profile
+
+
+class OfflineModel(LLMProvider):
+    """Returns immediately: only the prompt side is measured"""
+
+    name = model_name = "offline"
+
+    class Response:
+        text = "ok"
+
+    def generate(self, contents, timeout=None, max_output_tokens=None):
+        return self.Response
+
+    async def agenerate(self, contents, timeout=None, max_output_tokens=None):
+        return self.Response
+
+    async def astream(self, contents, timeout=None, max_output_tokens=None):
+        async def chunks():
+            yield self.Response
+        return chunks()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--context-chars", type=int, default=1200)
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=20.0)
+    parser.add_argument("--min-tokens", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    profiles = [make_profile(f"user_{i}", rng) for i in range(args.profiles)]
+    weights = 1 / np.arange(1, args.profiles + 1)  # Zipf-like
+    workload = [
+        (profile, rng.choice(["quick-tip", "in-depth"]), f"Question {i} about my training?")
+        for i, profile in enumerate(rng.choices(profiles, weights=weights, k=args.requests))
+    ]
+    context = "knowledge " * (args.context_chars // 10)
+
+    start = time.perf_counter()
+    for profile, mode, question in workload:
+        build_prompt(question, mode, context, profile)
+    uncached_us = (time.perf_counter() - start) / len(workload) * 1e6
+
+    prefixes = PromptPrefixCache()
+    llm = PromptLLM(OfflineModel(), LocalContextCache(min_tokens=args.min_tokens),
+                    prefill_ms_per_1k_tokens=args.prefill_ms_per_1k)
+    start = time.perf_counter()
+    for profile, mode, question in workload:
+        prefixes.get(mode, profile), prompt_suffix(question, context)
+    cached_us = (time.perf_counter() - start) / len(workload) * 1e6
+    for profile, mode, question in workload:
+        llm.generate(prefixes.get(mode, profile), prompt_suffix(question, context))
+
+    stats = llm.stats()
+    print(f"{args.profiles} profiles, {args.requests} requests, {args.context_chars}-char context")
+    print(f"prompt build      render every time {uncached_us:.2f} us   prefix cache {cached_us:.2f} us "
+          f"(prefix hit rate {prefixes.stats()['hit_rate']:.3f})")
+    print(f"input tokens      {stats['input_tokens'] / stats['requests']:.1f} per request")
+    print(f"context cache     {stats['input_tokens_saved_per_request']:.1f} tokens saved per request, "
+          f"~{stats['est_latency_saved_ms_per_request']:.2f} ms prefill saved per request "
+          f"(hits {stats['context_cache']['hits']}, too small {stats['context_cache']['too_small']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Quick-tip tier vs in-depth answers on /api/chat, checked against the quick-tip p95 target.
+
+Generation uses the stub LLM provider with a per-token decode cost
+(--ttft-ms before the first token, --ms-per-token after it), and its
+reply is a full 12-week plan, so an uncapped answer costs what a real
+long plan would. Quick tips are cut at QUICK_TIP_MAX_OUTPUT_TOKENS and
+get the smaller context budget. Real embedding + FAISS retrieval runs.
+Every request asks a new question, so the response cache never answers.
+
+Before the quick-tip tier, "quick-tip" requests fell through to the
+in-depth prompt with no output cap: they cost what the in-depth row does.
+
+Exits with status 1 when the quick-tip p95 misses the target.
+
+Usage (from backend/):
+    python -m benchmarks.bench_quick_tip --requests 40 --concurrency 8 --ms-per-token 8
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import statistics
+import sys
+import time
+
+import httpx
+import numpy as np
+
+from app import ai_engine, config
+from app.main import app
+from app.prompts import estimate_tokens
+
+PLAN = "".join(
+    f"## Week {week}\n"
+    f"Day 1: Back Squat 4x6 at RPE 7, Romanian Deadlift 3x8, Walking Lunges 3x10 per leg, Plank 3x45s.\n"
+    f"Day 2: Bench Press 4x6, Pull-Ups 4x8, Dumbbell Row 3x10, Face Pulls 3x15, Side Plank 3x30s.\n"
+    f"Day 3: Sprint intervals 8x30s with 90s rest, then mobility work for hips and thoracic spine.\n"
+    f"Progression: add 2.5 kg to the main lifts when every set is completed with good technique.\n"
+    for week in range(1, 13)
+)
+
+
+async def run_mode(client, mode, requests, concurrency):
+    slots = asyncio.Semaphore(concurrency)
+
+    async def ask(i):
+        async with slots:
+            start = time.perf_counter()
+            response = await client.post("/api/chat", json={
+                "text": f"Question {i} ({mode}): how should I structure today's training?",
+                "user_id": f"bench_quick_{i}", "mode": mode,
+            })
+            response.raise_for_status()
+            return time.perf_counter() - start, response.json()["response_text"]
+
+    return await asyncio.gather(*(ask(i) for i in range(requests)))
+
+
+async def run(args):
+    engine = ai_engine.get_engine()
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        print(f"{'mode':<10} {'requests':>8} {'out tok':>8} {'in tok':>8} {'p50 ms':>8} {'p95 ms':>8}")
+        for mode in ("in-depth", "quick-tip"):
+            generator = engine._generator(mode)
+            requests_before, tokens_before = generator.requests, generator.input_tokens
+            with contextlib.redirect_stdout(io.StringIO()):  # engine prints per query
+                replies = await run_mode(client, mode, args.requests, args.concurrency)
+            latencies = [latency * 1000 for latency, _ in replies]
+            input_tokens = (generator.input_tokens - tokens_before) / max(generator.requests - requests_before, 1)
+            results[mode] = float(np.percentile(latencies, 95))
+            print(f"{mode:<10} {len(replies):>8} {statistics.mean(estimate_tokens(text) for _, text in replies):>8.0f} "
+                  f"{input_tokens:>8.0f} {statistics.median(latencies):>8.0f} {results[mode]:>8.0f}")
+
+    target = config.QUICK_TIP_TARGET_P95_MS
+    ok = results["quick-tip"] <= target
+    print(f"quick-tip p95 {results['quick-tip']:.0f} ms vs target {target:.0f} ms: {'OK' if ok else 'MISSED'} "
+          f"({results['in-depth'] / results['quick-tip']:.1f}x faster than in-depth)")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=40, help="Requests per mode")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--ttft-ms", type=float, default=400.0, help="Stub latency before the first token")
+    parser.add_argument("--ms-per-token", type=float, default=8.0, help="Stub decode time per output token")
+    args = parser.parse_args()
+
+    for name in ("app.main", "httpx"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    config.LLM_PROVIDER = "stub"
+    config.LLM_STUB_LATENCY_MS = args.ttft_ms
+    config.LLM_STUB_MS_PER_TOKEN = args.ms_per_token
+    config.LLM_STUB_TEXT = PLAN
+    sys.exit(0 if asyncio.run(run(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Total memory and chat throughput per uvicorn worker count, with and without the retrieval sidecar.
+
+For each --workers count, runs the API twice with the stub LLM:
+- in-process: every worker loads the embedding model (torch + weights)
+  and embeds + searches its own queries
+- sidecar:    one `python -m app.retrieval_service` process owns the
+  model; workers (COACH_RETRIEVAL_SIDECAR) send it batched retrieval
+  calls over a UNIX socket and never load the model
+
+then drives /api/chat with --concurrency closed-loop clients for
+--duration seconds. Every question is new, so each one is embedded and
+searched; --llm-ms defaults to 0 so retrieval and our own overhead set
+the pace.
+
+Memory is the summed PSS (proportional set size: shared pages split
+between the processes sharing them) of the uvicorn master, its workers
+and the sidecar, read from /proc after the run. Sidecar rows also show
+its average batch size across workers.
+
+Usage (from backend/):
+    python -m benchmarks.bench_retrieval_sidecar --workers 1,2,4,8 --duration 15 --concurrency 32
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+from app.retrieval_service import RetrievalClient
+from benchmarks.bench_load import serve
+from benchmarks.bench_pipeline import BACKEND_DIR, QUERIES
+
+
+def process_tree(pid):
+    """pid and all of its descendants (from the parent pids in /proc/*/stat)"""
+    children = {}
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        with contextlib.suppress(OSError, ValueError):
+            fields = stat.read_text().rsplit(")", 1)[1].split()
+            children.setdefault(int(fields[1]), []).append(int(stat.parent.name))
+    pids, index = [pid], 0
+    while index < len(pids):
+        pids.extend(children.get(pids[index], []))
+        index += 1
+    return pids
+
+
+def pss_mb(pids):
+    """Summed PSS of the processes, in MB"""
+    total = 0.0
+    for pid in pids:
+        with contextlib.suppress(OSError), open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    total += int(line.split()[1]) / 1024
+                    break
+    return total
+
+
+@contextlib.contextmanager
+def sidecar(socket_path: Path, env, timeout):
+    """Runs the retrieval sidecar until its socket answers pings"""
+    log_path = socket_path.with_suffix(".log")
+    with open(log_path, "wb") as log:
+        process = subprocess.Popen([sys.executable, "-m", "app.retrieval_service", "--socket", str(socket_path)],
+                                   cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    client = RetrievalClient(str(socket_path), pool_size=1)
+    try:
+        deadline = time.monotonic() + timeout
+        while not client.check_health():
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError(f"sidecar did not start:\n{log_path.read_text(errors='replace')[-2000:]}")
+            time.sleep(0.5)
+        yield process, client
+    finally:
+        client.close()
+        process.terminate()
+        process.wait(timeout=30)
+
+
+async def drive(url, concurrency, duration):
+    """Closed-loop /api/chat clients; returns (requests/s, latencies ms, errors)"""
+    latencies, errors = [], 0
+    stop_at = time.perf_counter() + duration
+
+    async def athlete(client, number):
+        nonlocal errors
+        asked = 0
+        while time.perf_counter() < stop_at:
+            asked += 1
+            start = time.perf_counter()
+            try:
+                response = await client.post("/api/chat", json={
+                    "text": f"{QUERIES[asked % len(QUERIES)]} (athlete {number}, question {asked})",
+                    "user_id": f"sidecar_bench_{number}", "mode": "quick-tip",
+                })
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+            except httpx.HTTPError:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(athlete(client, number) for number in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return len(latencies) / elapsed, np.array(latencies), errors
+
+
+def run_case(workers, use_sidecar, args, tmp: Path):
+    name = f"{workers}w-{'sidecar' if use_sidecar else 'local'}"
+    with contextlib.ExitStack() as stack:
+        extra_env, side_pids, side_client = {}, [], None
+        if use_sidecar:
+            socket_path = tmp / f"{name}.sock"
+            process, side_client = stack.enter_context(sidecar(socket_path, dict(os.environ), args.startup_timeout))
+            side_pids = [process.pid]
+            extra_env["COACH_RETRIEVAL_SIDECAR"] = str(socket_path)
+        url, server = stack.enter_context(serve(workers, args, tmp, extra_env=extra_env, name=name))
+        throughput, latencies, errors = asyncio.run(drive(url, args.concurrency, args.duration))
+        memory = pss_mb(process_tree(server.pid) + side_pids)
+        batch = side_client.server_stats()["batching"]["avg_batch_size"] if side_client else None
+    return {
+        "workers": workers, "sidecar": use_sidecar, "pss_mb": memory, "throughput": throughput,
+        "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+        "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else None,
+        "errors": errors, "sidecar_avg_batch": batch,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds of load per case")
+    parser.add_argument("--concurrency", type=int, default=32, help="Closed-loop chat clients")
+    parser.add_argument("--llm-ms", type=float, default=0.0, help="Stub LLM latency")
+    parser.add_argument("--ms-per-token", type=float, default=0.0)
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} {'retrieval':<10} {'PSS MB':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'errors':>6} {'batch':>6}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in (int(w) for w in args.workers.split(",")):
+            for use_sidecar in (False, True):
+                row = run_case(workers, use_sidecar, args, Path(tmp))
+                batch = f"{row['sidecar_avg_batch']:>6.1f}" if row["sidecar_avg_batch"] is not None else f"{'-':>6}"
+                print(f"{workers:>7} {'sidecar' if use_sidecar else 'in-process':<10} {row['pss_mb']:>8.0f} "
+                      f"{row['throughput']:>8.1f} {row['p50_ms']:>8.1f} {row['p99_ms']:>8.1f} "
+                      f"{row['errors']:>6} {batch}")
+
+
+if __name__ == "__main__":
+    main()
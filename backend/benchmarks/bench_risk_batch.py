@@ -0,0 +1,85 @@
+"""
+Risk scoring: scalar assess_exercise loop vs RiskAssessmentEngine.assess_batch.
+
+Scores the whole exercise.txt catalog for a synthetic roster (random
+injuries and goals drawn from the phrasing athletes use in profiles),
+the coach/team workload, and a single chat answer (8 exercises, 1
+profile), the per-request workload. assess_batch is timed for scores
+only (the risk / effectiveness arrays) and with every assessment dict
+materialised, which is what the scalar loop always produces.
+
+Usage (from backend/):
+    python -m benchmarks.bench_risk_batch --athletes 50 --repeat 5
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from app.risk_module import RiskAssessmentEngine
+from app.youtube_db import get_all_exercises
+
+INJURIES = ["lower back pain", "knee tendonitis", "shoulder impingement", "ankle sprain", "wrist strain",
+            "hip flexor tightness", "tennis elbow", "hamstring pull"]
+GOALS = ["strength", "muscle gain", "fat loss", "endurance", "general fitness", "lean and strong", "hypertrophy"]
+
+
+def make_roster(athletes, rng):
+    return [{'injuries': rng.sample(INJURIES, rng.randint(0, 3)), 'goal': rng.choice(GOALS)} for _ in range(athletes)]
+
+
+def scalar(exercises, profiles):
+    return [[RiskAssessmentEngine.assess_exercise(exercise, profile) for profile in profiles] for exercise in exercises]
+
+
+def batch_scores(exercises, profiles):
+    return RiskAssessmentEngine.assess_batch(exercises, profiles)
+
+
+def batch_dicts(exercises, profiles):
+    batch = RiskAssessmentEngine.assess_batch(exercises, profiles)
+    return [batch.for_profile(j) for j in range(len(profiles))]
+
+
+def best_ms(function, repeat, *args):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--athletes", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    catalog = get_all_exercises()
+    roster = make_roster(args.athletes, rng)
+    workloads = [
+        (f"catalog x roster ({len(catalog)} x {len(roster)})", catalog, roster),
+        ("chat answer (8 x 1)", rng.sample(catalog, 8), roster[:1]),
+    ]
+
+    RiskAssessmentEngine.assess_batch(["warmup"], [{}])  # compile the mappings outside the timings
+    batch = RiskAssessmentEngine.assess_batch(catalog, roster)
+    reference = scalar(catalog, roster)
+    assert all(batch.assessment(i, j) == reference[i][j] for i in range(len(catalog)) for j in range(len(roster)))
+    print(f"identical results on {batch.risk.size} cells, "
+          f"mean risk {np.mean(batch.risk):.2f}, mean effectiveness {np.mean(batch.effectiveness):.2f}")
+
+    print(f"\n{'workload':<32} {'scalar ms':>10} {'batch scores ms':>16} {'batch + dicts ms':>17} {'speedup':>8}")
+    for name, exercises, profiles in workloads:
+        scalar_ms = best_ms(scalar, args.repeat, exercises, profiles)
+        scores_ms = best_ms(batch_scores, args.repeat, exercises, profiles)
+        dicts_ms = best_ms(batch_dicts, args.repeat, exercises, profiles)
+        print(f"{name:<32} {scalar_ms:>10.2f} {scores_ms:>16.2f} {dicts_ms:>17.2f} {scalar_ms / scores_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Cold start: import time of app.main, time to live, time to ready.
+
+Each run is a fresh Python process (nothing warm in this interpreter):
+1. `python -X importtime -c "import app.main"`, summarised per top-level
+   package, to catch heavy imports creeping back into the import path
+2. a child that imports app.main, runs the FastAPI lifespan and polls
+   /api/health/live and /api/health/ready, reporting when each first
+   answered 200 and the engine's per-stage loading timings
+
+Before the lazy engine, importing app.main included the whole engine
+load, so "import + engine load" below is what a cold start used to cost
+before /api/health could answer.
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup --runs 3 --top 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+CHILD = r"""
+import asyncio, contextlib, io, json, logging, os, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+import httpx
+logging.disable(logging.INFO)
+
+async def main():
+    result = {"import": imported - start}
+    transport = httpx.ASGITransport(app=app.main.app)
+    async with app.main.app.router.lifespan_context(app.main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            while True:
+                now = time.perf_counter() - start
+                if "live" not in result and (await client.get("/api/health/live")).status_code == 200:
+                    result["live"] = now
+                ready = await client.get("/api/health/ready")
+                engine = ready.json()["ai_engine"]
+                if ready.status_code == 200 or engine["state"] in ("failed", "not loaded"):
+                    result["ready"] = time.perf_counter() - start
+                    result["engine"] = engine
+                    return result
+                await asyncio.sleep(0.01)
+
+with contextlib.redirect_stdout(io.StringIO()):
+    result = asyncio.run(main())
+print(json.dumps(result))
+"""
+
+
+def child_env():
+    env = dict(os.environ)
+    env.setdefault("GEMINI_API_KEY", "benchmark-stub-key")
+    env["COACH_ENGINE_PRELOAD"] = "1"
+    return env
+
+
+def import_breakdown(top):
+    """(total seconds, [(package, cumulative seconds)]) from -X importtime"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, env=child_env(), capture_output=True, text=True, check=True
+    )
+    packages = defaultdict(float)
+    total = 0.0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2  # one separator space, then 2 per level
+        name = name.strip()
+        if depth == 1:  # imported directly by app.main (app.* modules listed individually)
+            packages[name if name.startswith("app.") else name.split(".")[0]] += int(cumulative) / 1e6
+        if name == "app.main":
+            total = int(cumulative) / 1e6
+    heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return total, heaviest
+
+
+def startup_run():
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=BACKEND_DIR, env=child_env(), capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes to start")
+    parser.add_argument("--top", type=int, default=10, help="Heaviest imports to list")
+    args = parser.parse_args()
+
+    total, heaviest = import_breakdown(args.top)
+    print(f"import app.main (-X importtime): {total * 1000:.0f} ms")
+    for package, seconds in heaviest:
+        print(f"  {package:<28} {seconds * 1000:>8.0f} ms")
+
+    runs = [startup_run() for _ in range(args.runs)]
+    stages = list(runs[0]["engine"]["timings"])
+    print(f"\n{'run':<4} {'import':>8} {'live':>8} {'ready':>8} " + " ".join(f"{s:>15}" for s in stages))
+    for number, run in enumerate(runs, 1):
+        timings = run["engine"]["timings"]
+        print(f"{number:<4} {run['import']:>8.3f} {run['live']:>8.3f} {run['ready']:>8.3f} "
+              + " ".join(f"{timings.get(s, 0):>15.3f}" for s in stages))
+        if run["engine"]["state"] != "ready":
+            print(f"     engine {run['engine']['state']}: {run['engine']['error']}")
+
+    best = min(runs, key=lambda run: run["ready"])
+    engine_load = sum(best["engine"]["timings"].values())
+    print(f"\nseconds; best run: live after {best['live']:.3f}s, ready after {best['ready']:.3f}s "
+          f"(import + engine load = {best['import'] + engine_load:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
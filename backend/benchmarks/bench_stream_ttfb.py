@@ -0,0 +1,84 @@
+"""
+Time-to-first-byte of /api/chat vs /api/chat/stream, against a stub LLM.
+
+/api/chat returns nothing until the whole plan is generated;
+/api/chat/stream should deliver its first `chunk` event after roughly
+one chunk's worth of generation time.
+
+Usage (from backend/):
+    python -m benchmarks.bench_stream_ttfb --latency 2.0 --runs 5
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import statistics
+import time
+
+from app import ai_engine, config
+from app.main import app
+
+PAYLOAD = {"text": "Create a 12-week strength plan", "user_id": "bench_user", "mode": "in-depth"}
+
+
+async def asgi_post(path, payload):
+    """
+    Calls the ASGI app directly and returns (first body time, last body time).
+    httpx's ASGITransport buffers the whole response, which would hide streaming.
+    """
+    body = json.dumps(payload).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "server": ("bench", 80), "client": ("bench", 1),
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    }
+    start = time.perf_counter()
+    body_times = []
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()  # never disconnect
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            body_times.append(time.perf_counter() - start)
+
+    await app(scope, receive, send)
+    return body_times[0], body_times[-1]
+
+
+async def run(runs):
+    print(f"{'endpoint':<18} {'ttfb ms':>9} {'total ms':>9}")
+    for path in ("/api/chat", "/api/chat/stream"):
+        samples = []
+        for _ in range(runs):
+            with contextlib.redirect_stdout(io.StringIO()):
+                samples.append(await asgi_post(path, PAYLOAD))
+        print(f"{path:<18} {statistics.median(s[0] for s in samples) * 1000:>9.0f} "
+              f"{statistics.median(s[1] for s in samples) * 1000:>9.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=2.0, help="Stub LLM total generation time")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.getLogger("app.main").setLevel(logging.WARNING)
+    # Fixed-latency stub provider instead of Gemini (read when the engine loads)
+    config.LLM_PROVIDER = "stub"
+    config.LLM_STUB_LATENCY_MS = args.latency * 1000
+    config.LLM_STUB_DISTRIBUTION = "fixed"
+    ai_engine.get_engine()
+    asyncio.run(run(args.runs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Resident memory per worker: pickled store vs memory-mapped store.
+
+Builds the knowledge base for the real corpus, repeated --scale times
+(vector values don't affect memory, so a cheap deterministic encoder
+stands in for SentenceTransformer), in both on-disk formats:
+- pickle: faiss.read_index + pickle.load of {"ids", "chunks", "embeddings"}
+  (the store before STORE_FORMAT 2)
+- mmap:   load_or_build_knowledge_base (mapped .npy / text blob / FAISS)
+
+--workers processes then load the same store at the same time, run
+searches and read every chunk text, like uvicorn workers serving
+traffic. Each reports load time and RSS / PSS / private memory growth
+from /proc/self/smaps_rollup (PSS splits shared pages between workers).
+
+Usage (from backend/):
+    python -m benchmarks.bench_worker_memory --workers 4 --scale 20
+"""
+import argparse
+import multiprocessing
+import pickle
+import tempfile
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+from app.knowledge_base import chunk_id, load_or_build_knowledge_base
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+MODEL_NAME = "bench-random-encoder"
+
+
+class RandomEncoder:
+    """Deterministic per-text vectors with the dimension of all-MiniLM-L6-v2"""
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def encode(self, texts, convert_to_numpy=True, show_progress_bar=False):
+        rows = [np.random.default_rng(chunk_id(text) % (2 ** 32)).random(self.dim) for text in texts]
+        return np.array(rows, dtype=np.float32)
+
+
+def build_stores(root: Path, scale: int):
+    """Writes the mmap store under root/mmap and the legacy pickle under root/pickle"""
+    corpus = (DATA_DIR / "expert_knowledge.txt").read_text(encoding="utf-8")
+    mmap_dir = root / "mmap"
+    mmap_dir.mkdir()
+    # "Copy N" lines make every repeated fact a distinct chunk
+    (mmap_dir / "expert_knowledge.txt").write_text(
+        "\n".join(corpus.replace("Fact", f"Copy {copy} Fact") for copy in range(scale)), encoding="utf-8"
+    )
+    store = load_or_build_knowledge_base(mmap_dir, RandomEncoder(), MODEL_NAME)
+
+    pickle_dir = root / "pickle"
+    pickle_dir.mkdir()
+    faiss.write_index(store["index"], str(pickle_dir / "faiss_index.bin"))
+    ids = store["ids"].tolist()
+    with open(pickle_dir / "vector_meta.pkl", "wb") as f:
+        pickle.dump({
+            "ids": store["ids"],
+            "chunks": [store["chunks"][cid] for cid in ids],
+            "chunk_meta": [store["chunk_meta"][cid] for cid in ids],
+            "embeddings": store["embeddings"],
+        }, f)
+    return mmap_dir, pickle_dir, len(ids)
+
+
+def memory_mb():
+    """RSS, PSS and private (unshared) memory of this process in MB"""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return fields["Rss"], fields["Pss"], private
+
+
+def load_pickle_store(store_dir: Path):
+    index = faiss.read_index(str(store_dir / "faiss_index.bin"))
+    with open(store_dir / "vector_meta.pkl", "rb") as f:
+        meta = pickle.load(f)
+    ids = meta["ids"].tolist()
+    return {
+        "index": index,
+        "ids": meta["ids"],
+        "chunks": dict(zip(ids, meta["chunks"])),
+        "chunk_meta": dict(zip(ids, meta["chunk_meta"])),
+        "embeddings": meta["embeddings"],
+    }
+
+
+def worker(fmt, store_dir, queries, loaded, release, results):
+    before = memory_mb()
+    start = time.perf_counter()
+    if fmt == "pickle":
+        store = load_pickle_store(store_dir)
+    else:
+        store = load_or_build_knowledge_base(store_dir, None, MODEL_NAME)
+    load_seconds = time.perf_counter() - start
+
+    # Serve: searches touch the whole flat index, answers read chunk texts
+    store["index"].search(queries, 3)
+    text_bytes = sum(len(store["chunks"][cid]) for cid in store["ids"].tolist())
+    assert text_bytes
+
+    loaded.wait()  # every worker has its store mapped before PSS is read
+    after = memory_mb()
+    results.put((load_seconds, *(a - b for a, b in zip(after, before))))
+    release.wait()
+
+
+def run_format(fmt, store_dir, workers, queries):
+    ctx = multiprocessing.get_context("spawn")
+    loaded, release, results = ctx.Barrier(workers), ctx.Barrier(workers + 1), ctx.Queue()
+    processes = [
+        ctx.Process(target=worker, args=(fmt, store_dir, queries, loaded, release, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    rows = [results.get() for _ in processes]
+    release.wait()
+    for process in processes:
+        process.join()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--scale", type=int, default=20, help="Corpus copies (1 = real corpus size)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        mmap_dir, pickle_dir, chunks = build_stores(Path(tmp), args.scale)
+        queries = RandomEncoder().encode([f"query {i}" for i in range(64)])
+        vectors_mb = (mmap_dir / "kb_vectors.npy").stat().st_size / 1e6
+
+        print(f"\n{chunks} chunks ({vectors_mb:.1f} MB of vectors), {args.workers} workers")
+        print("memory is growth over each worker's baseline after imports (MB)")
+        print(f"{'format':<8} {'load ms':>8} {'RSS':>8} {'PSS':>8} {'private':>8} {'total PSS':>10}")
+        for fmt, store_dir in (("pickle", pickle_dir), ("mmap", mmap_dir)):
+            rows = np.array(run_format(fmt, store_dir, args.workers, queries))
+            load, rss, pss, private = rows.mean(axis=0)
+            print(f"{fmt:<8} {load * 1000:>8.1f} {rss:>8.1f} {pss:>8.1f} {private:>8.1f} "
+                  f"{rows[:, 2].sum():>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
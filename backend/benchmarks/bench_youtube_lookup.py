@@ -0,0 +1,93 @@
+"""
+YouTube link lookup: linear substring scan vs the token index.
+
+Looks up exercise names the way build_enrichment does (one get_links per
+extracted exercise) against the real exercise.txt and against catalogs
+enlarged with synthetic entries. Queries mix exact names, spelling
+variants (plurals, hyphens, lowercase) and misses. The index is timed with
+a cold memo (memo_size=0) and with the default memo.
+
+Usage (from backend/):
+    python -m benchmarks.bench_youtube_lookup --catalog-scale 1,10,100
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from app.youtube_db import YouTubeLinksDB
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+MISSES = ["Underwater Basket Weaving", "Zumba", "Quokka Hops", "xyzzy"]  # no substring of any entry
+
+
+def legacy_get_links(links_cache, exercise):
+    """get_links before the index"""
+    exercise_lower = exercise.lower().strip()
+    if exercise_lower in links_cache:
+        return links_cache[exercise_lower]['urls']
+    for key, data in links_cache.items():
+        if exercise_lower in key or key in exercise_lower:
+            return data['urls']
+    return []
+
+
+def make_catalog(path: Path, scale: int):
+    lines = [line for line in (DATA_DIR / "exercise.txt").read_text(encoding="utf-8").splitlines()
+             if "|||" in line and line.split("|||")[0].strip()]
+    extra = [line.replace(" |||", f" Variation {copy} |||", 1) for copy in range(1, scale) for line in lines]
+    path.write_text("\n".join(lines + extra), encoding="utf-8")
+
+
+def make_queries(names, count, rng):
+    variants = [
+        lambda name: name,
+        lambda name: name.lower(),
+        lambda name: name.replace("-", " ").rstrip("s"),
+        lambda name: name.lower() + "s",
+    ]
+    return [rng.choice(MISSES) if rng.random() < 0.2 else rng.choice(variants)(rng.choice(names))
+            for _ in range(count)]
+
+
+def per_lookup_us(function, queries):
+    start = time.perf_counter()
+    for query in queries:
+        function(query)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--catalog-scale", type=lambda s: [int(v) for v in s.split(",")], default=[1, 10, 100])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'catalog':>8} {'index ms':>9} {'linear us':>10} {'index cold us':>14} {'index memo us':>14} "
+          f"{'miss linear us':>15} {'miss index us':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.catalog_scale:
+            path = Path(tmp) / f"exercise_{scale}.txt"
+            make_catalog(path, scale)
+            start = time.perf_counter()
+            cold = YouTubeLinksDB(path, memo_size=0)
+            build_ms = (time.perf_counter() - start) * 1000
+            warm = YouTubeLinksDB(path)
+
+            names = [data['exercise'] for data in cold.links_cache.values()]
+            queries = make_queries(names, args.queries, random.Random(args.seed))
+            misses = MISSES * (args.queries // len(MISSES) // 10 or 1)
+            for query in queries:
+                warm.get_links(query)  # fill the memo
+
+            print(f"{len(names):>8} {build_ms:>9.1f} "
+                  f"{per_lookup_us(lambda q: legacy_get_links(cold.links_cache, q), queries):>10.1f} "
+                  f"{per_lookup_us(cold.get_links, queries):>14.1f} {per_lookup_us(warm.get_links, queries):>14.1f} "
+                  f"{per_lookup_us(lambda q: legacy_get_links(cold.links_cache, q), misses):>15.1f} "
+                  f"{per_lookup_us(cold.get_links, misses):>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
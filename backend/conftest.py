@@ -0,0 +1,52 @@
+# backend/conftest.py
+
+import numpy as np
+import pytest
+
+from app import config
+from app.ai_engine import CoachCarterAI
+from app.athlete_profile import AthleteProfile
+from app.llm_providers import StubProvider
+
+
+@pytest.fixture
+def make_profile():
+    """Factory for valid AthleteProfiles: make_profile(user_id="athlete1", **field_overrides)"""
+    def make(user_id="athlete1", **overrides):
+        data = {
+            "user_id": user_id, "name": "John", "age": 25, "height_cm": 180, "weight_kg": 75,
+            "gender": "male", "sport": "football", "experience_years": 5, "goals": ["speed", "strength"],
+            "duration_weeks": 12, "sessions_per_week": 5,
+        }
+        return AthleteProfile(**{**data, **overrides})
+    return make
+
+
+class FakeEmbedder:
+    """Constant unit embeddings in place of SentenceTransformer"""
+
+    def encode(self, texts, convert_to_numpy=True, show_progress_bar=False):
+        return np.full((len(texts), 4), 0.5, dtype=np.float32)
+
+
+@pytest.fixture
+def make_engine(monkeypatch, tmp_path):
+    """
+    Factory for a CoachCarterAI built from injected fakes:
+    make_engine(llm=None, quick_llm=None, embedding_model=None, data_dir=None).
+    Defaults are a fast stub LLM, FakeEmbedder and an empty data dir (no
+    knowledge base). Micro-batching, context assembly, the response cache
+    and the sidecar are off; tests monkeypatch config to turn them on.
+    """
+    for name, value in (("EMBED_BATCH_MAX_SIZE", 1), ("CONTEXT_ASSEMBLY", False), ("RESPONSE_CACHE_SIZE", 0),
+                        ("RESPONSE_CACHE_PATH", ""), ("RETRIEVAL_SIDECAR", ""), ("QUICK_TIP_MODEL", "")):
+        monkeypatch.setattr(config, name, value)
+
+    def make(llm=None, quick_llm=None, embedding_model=None, data_dir=None):
+        return CoachCarterAI(
+            llm=llm if llm is not None else StubProvider(latency_ms=1, distribution="fixed"),
+            quick_llm=quick_llm,
+            embedding_model=embedding_model if embedding_model is not None else FakeEmbedder(),
+            data_dir=data_dir or tmp_path / "engine-data",
+        )
+    return make
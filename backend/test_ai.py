@@ -12,7 +12,7 @@ print("-" * 70)
 
 response1 = get_ai_response(
     user_query="Is a deadlift safe for someone with lower back pain?",
-    mode="quick"
+    mode="quick-tip"
 )
 
 print("RESPONSE:")
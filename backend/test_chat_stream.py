@@ -0,0 +1,94 @@
+# backend/test_chat_stream.py
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+
+QUERY = {"text": "Leg day plan?", "user_id": "stream_test", "mode": "in-depth"}
+
+
+def events(body):
+    """(event, data) pairs of a server-sent events body"""
+    frames = []
+    for frame in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in frame.splitlines())
+        frames.append((fields["event"], json.loads(fields["data"])))
+    return frames
+
+
+class OneProfile:
+    def __init__(self, profile):
+        self.profile = profile
+
+    def get_profile(self, user_id):
+        return self.profile
+
+
+@pytest.fixture
+def client(monkeypatch, make_profile):
+    async def ready():
+        pass
+
+    monkeypatch.setattr(main, "wait_for_engine", ready)
+    monkeypatch.setattr(main, "profile_service", OneProfile(make_profile(injuries=["knee"])))
+    return TestClient(main.app)
+
+
+def test_chunks_stream_in_order_then_a_final_done_event(monkeypatch, client):
+    chunks = ["## Leg Day\n", "Back Squat 3x5\n", "Plank 3x30s\n"]
+
+    async def stream(text, mode, user_profile, profile_key, scope):
+        assert user_profile.injuries == ["knee"]
+        for chunk in chunks:
+            yield chunk
+
+    monkeypatch.setattr(main, "astream_ai_response", stream)
+    reply = client.post("/api/chat/stream", json=QUERY)
+
+    assert reply.status_code == 200
+    assert reply.headers["content-type"].startswith("text/event-stream")
+    frames = events(reply.text)
+    assert frames[:-1] == [("chunk", {"text": chunk}) for chunk in chunks]
+    name, final = frames[-1]
+    assert name == "done" and set(final) == {"risk_scores", "youtube_links"}
+    if main.RISK_MODULE_AVAILABLE:
+        assert {item["exercise"] for item in final["risk_scores"]} == {"Squat", "Plank"}
+
+
+def test_failure_mid_stream_ends_with_an_error_event(monkeypatch, client):
+    async def stream(text, mode, user_profile, profile_key, scope):
+        yield "## Leg Day\n"
+        raise RuntimeError("quota exceeded")
+
+    monkeypatch.setattr(main, "astream_ai_response", stream)
+    reply = client.post("/api/chat/stream", json=QUERY)
+
+    assert reply.status_code == 200  # headers were already sent
+    frames = events(reply.text)
+    assert [name for name, _ in frames] == ["chunk", "error"]
+    assert "quota exceeded" in frames[-1][1]["detail"]
+
+
+def test_unavailable_engine_is_a_503_before_streaming(monkeypatch, client):
+    started = []
+
+    async def failed():
+        raise main.EngineUnavailable("knowledge base failed to load")
+
+    async def stream(text, mode, user_profile, profile_key, scope):
+        started.append(text)
+        yield "never sent"
+
+    monkeypatch.setattr(main, "wait_for_engine", failed)
+    monkeypatch.setattr(main, "astream_ai_response", stream)
+    reply = client.post("/api/chat/stream", json=QUERY)
+
+    assert reply.status_code == 503
+    assert "knowledge base failed to load" in reply.json()["detail"]
+    assert started == []
+
+    monkeypatch.setattr(main, "AI_ENGINE_AVAILABLE", False)
+    assert client.post("/api/chat/stream", json=QUERY).status_code == 503
@@ -0,0 +1,139 @@
+# backend/test_context_assembly.py
+
+import hashlib
+import random
+import re
+
+import numpy as np
+
+from app.context_assembly import ContextAssembler, split_header, trim_overlap
+from app.knowledge_base import load_or_build_knowledge_base
+from app.prompts import estimate_tokens
+
+SPORTS = ["Cricket", "Tennis", "Football", "Basketball", "Swimming", "Rowing"]
+SECTIONS = ["Strength", "Conditioning", "Recovery", "Technique"]
+SHARED_ADVICE = (
+    "Sleep eight hours, hydrate before sessions and schedule one full rest day each week "
+    "so tissue adaptation can catch up with training load."
+)
+
+
+class BagOfWordsEncoder:
+    """Deterministic lexical embeddings: hashed word counts, unit length"""
+
+    def __init__(self, dim=512):
+        self.dim = dim
+
+    def encode(self, texts, convert_to_numpy=True, show_progress_bar=False):
+        rows = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in zip(rows, texts):
+            for word in re.findall(r"[a-z]+", text.lower()):
+                row[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim] += 1.0
+            row /= max(np.linalg.norm(row), 1e-12)
+        return rows
+
+
+def make_corpus(seed=0):
+    """
+    Sports x sections of facts with distinct vocabulary, the same recovery
+    advice repeated under every sport, and one long fact per sport that the
+    chunker has to window (with overlap). Returns (corpus, labelled queries).
+    """
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "mi", "ren", "tu", "vas", "pol", "dre", "shi", "nor", "bex", "qua"]
+    queries = []
+    lines = []
+    for sport in SPORTS:
+        lines.append(f"### SPORT: {sport}")
+        for section in SECTIONS:
+            lines.append(f"### {section.upper()}")
+            for number in range(1, 5):
+                words = ["".join(rng.sample(syllables, 3)) for _ in range(12)]
+                lines.append(f"Fact {number}: {sport} {section.lower()} drill uses " + " ".join(words) + ".")
+                queries.append((f"{sport} {section.lower()} " + " ".join(rng.sample(words, 4)), words[0]))
+            if section == "Recovery":
+                lines.append(f"Fact 5: {SHARED_ADVICE}")
+            if section == "Technique":
+                long_words = ["".join(rng.sample(syllables, 4)) for _ in range(110)]
+                lines.append(f"Fact 6: {sport} long technique breakdown " + " ".join(long_words) + ".")
+                queries.append((f"{sport} technique breakdown " + " ".join(long_words[-4:]), long_words[-1]))
+        lines.append("")
+    return "\n".join(lines), queries
+
+
+def build_store(tmp_path):
+    corpus, queries = make_corpus()
+    (tmp_path / "expert_knowledge.txt").write_text(corpus, encoding="utf-8")
+    encoder = BagOfWordsEncoder()
+    return load_or_build_knowledge_base(tmp_path, encoder, "bow"), encoder, queries
+
+
+def search(store, encoder, query, k):
+    query_emb = encoder.encode([query])
+    _, ids = store["index"].search(query_emb, k)
+    return query_emb[0], ids[0]
+
+
+def test_split_header_and_trim_overlap():
+    assert split_header("Tennis — Recovery\nFact 1: rest") == ("Tennis — Recovery", "Fact 1: rest")
+    assert split_header("no header") == ("", "no header")
+    assert trim_overlap("the quick brown fox jumps over", "brown fox jumps over the lazy dog") == "the lazy dog"
+    assert trim_overlap("unrelated text here", "completely different") == "completely different"
+
+
+def test_assembled_context_is_smaller_with_unchanged_or_better_hit_rate(tmp_path):
+    store, encoder, queries = build_store(tmp_path)
+    assembler = ContextAssembler(store, {"quick-tip": 160, "in-depth": 240})
+
+    baseline_tokens = assembled_tokens = baseline_hits = assembled_hits = 0
+    for query, answer_word in queries:
+        query_emb, top3 = search(store, encoder, query, 3)
+        baseline = "\n\n".join(store["chunks"][int(cid)] for cid in top3 if cid >= 0)  # previous behaviour
+        _, candidates = search(store, encoder, query, 12)
+        context = assembler.assemble(query_emb, candidates, "in-depth")
+
+        baseline_tokens += estimate_tokens(baseline)
+        assembled_tokens += estimate_tokens(context)
+        baseline_hits += answer_word in baseline
+        assembled_hits += answer_word in context
+
+    assert assembled_tokens < 0.9 * baseline_tokens
+    assert assembled_hits >= baseline_hits
+    assert assembled_hits / len(queries) > 0.9
+
+
+def test_budget_is_respected_per_mode(tmp_path):
+    store, encoder, queries = build_store(tmp_path)
+    assembler = ContextAssembler(store, {"quick-tip": 120, "in-depth": 320})
+
+    for query, _ in queries[:20]:
+        query_emb, candidates = search(store, encoder, query, 12)
+        quick = assembler.assemble(query_emb, candidates, "quick-tip")
+        in_depth = assembler.assemble(query_emb, candidates, "in-depth")
+        assert estimate_tokens(quick) <= 120 + 5  # + the blank lines between sections
+        assert estimate_tokens(in_depth) <= 320 + 5
+        assert len(quick) <= len(in_depth)
+
+
+def test_repeated_advice_appears_once(tmp_path):
+    store, encoder, _ = build_store(tmp_path)
+    assembler = ContextAssembler(store, {"in-depth": 2000})
+
+    query_emb, candidates = search(store, encoder, "sleep hydrate rest day recovery", 12)
+    context = assembler.assemble(query_emb, candidates, "in-depth")
+
+    assert context.count("Sleep eight hours") == 1
+    assert len(assembler.select(query_emb, candidates, "in-depth")) > 1  # the budget goes to other chunks
+
+
+def test_same_section_shares_one_header(tmp_path):
+    store, encoder, _ = build_store(tmp_path)
+    assembler = ContextAssembler(store, {"in-depth": 2000}, mmr_lambda=1.0)
+
+    query_emb, candidates = search(store, encoder, "Tennis long technique breakdown", 12)
+    ids = assembler.select(query_emb, candidates, "in-depth")
+    headers = [split_header(store["chunks"][cid])[0] for cid in ids]
+    context = assembler.render(ids)
+
+    for header in set(headers):
+        assert context.count(header + "\n") == 1
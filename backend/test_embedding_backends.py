@@ -0,0 +1,91 @@
+# backend/test_embedding_backends.py
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("onnx")
+pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+sentence_transformers = pytest.importorskip("sentence_transformers")
+
+from app.embedding_backends import OnnxEmbedder, export_onnx_int8
+from app.knowledge_base import chunk_corpus
+
+CORPUS = (Path(__file__).parent / "data" / "expert_knowledge.txt").read_text(encoding="utf-8")
+QUERIES = [
+    "Is a deadlift safe for someone with lower back pain?",
+    "How should cricket fast bowlers train their shoulders?",
+    "Best hamstring injury prevention drills for sprinters",
+    "Ankle sprain rehab exercises for football players",
+    "Recovery nutrition after a long match",
+]
+
+
+def make_model(model_dir: Path):
+    """Small random-weight BERT sentence-transformer (mean pooling + normalize), no download"""
+    from sentence_transformers import SentenceTransformer, models
+    from tokenizers import Tokenizer, normalizers, pre_tokenizers, trainers
+    from tokenizers.models import WordPiece
+
+    special = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+    tokenizer = Tokenizer(WordPiece(unk_token="[UNK]"))
+    tokenizer.normalizer = normalizers.BertNormalizer(lowercase=True)
+    tokenizer.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    tokenizer.train_from_iterator(CORPUS.splitlines(), trainers.WordPieceTrainer(vocab_size=2000, special_tokens=special))
+    hf_tokenizer = transformers.BertTokenizerFast(tokenizer_object=tokenizer, model_max_length=128, **{
+        f"{name}_token": f"[{name.upper()}]" for name in ("pad", "unk", "cls", "sep", "mask")
+    })
+
+    transformers.set_seed(0)
+    bert = transformers.BertModel(transformers.BertConfig(
+        vocab_size=tokenizer.get_vocab_size(), hidden_size=128, num_hidden_layers=2,
+        num_attention_heads=4, intermediate_size=256, max_position_embeddings=128,
+    ))
+    bert.save_pretrained(model_dir / "hf")
+    hf_tokenizer.save_pretrained(model_dir / "hf")
+
+    transformer = models.Transformer(str(model_dir / "hf"), max_seq_length=128)
+    pooling = models.Pooling(transformer.get_word_embedding_dimension(), "mean")
+    model = SentenceTransformer(modules=[transformer, pooling, models.Normalize()], device="cpu")
+    model.save(str(model_dir / "st"))
+    return str(model_dir / "st")
+
+
+@pytest.fixture(scope="module")
+def backends(tmp_path_factory):
+    root = tmp_path_factory.mktemp("embedding")
+    model_name = make_model(root)
+    export_onnx_int8(model_name, root / "onnx")
+    torch_model = sentence_transformers.SentenceTransformer(model_name, device="cpu")
+    return torch_model, OnnxEmbedder(root / "onnx", threads=1)
+
+
+def test_onnx_int8_embeddings_match_torch(backends):
+    torch_model, onnx_model = backends
+    texts = [chunk["text"] for chunk in chunk_corpus(CORPUS)] + QUERIES
+
+    expected = torch_model.encode(texts, convert_to_numpy=True)
+    actual = onnx_model.encode(texts, convert_to_numpy=True)
+
+    assert actual.shape == expected.shape
+    assert actual.dtype == np.float32
+    cosine = (expected * actual).sum(axis=1)  # both sides are normalized
+    assert cosine.min() > 0.98
+    assert cosine.mean() > 0.995
+    np.testing.assert_allclose(np.linalg.norm(actual, axis=1), 1.0, atol=1e-5)
+    assert onnx_model.encode(texts[0]).shape == (onnx_model.get_sentence_embedding_dimension(),)
+
+
+def test_onnx_int8_keeps_corpus_top_k(backends):
+    torch_model, onnx_model = backends
+    chunks = [chunk["text"] for chunk in chunk_corpus(CORPUS)]
+
+    def top_k(model, k=3):
+        corpus = model.encode(chunks, convert_to_numpy=True)
+        queries = model.encode(QUERIES, convert_to_numpy=True)
+        return [set(row) for row in np.argsort(-queries @ corpus.T, axis=1)[:, :k]]
+
+    assert top_k(onnx_model) == top_k(torch_model)
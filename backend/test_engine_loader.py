@@ -0,0 +1,46 @@
+# backend/test_engine_loader.py
+
+import asyncio
+
+import pytest
+
+from app.ai_engine import EngineLoader, EngineUnavailable
+
+
+class FakeEngine:
+    def __init__(self, progress):
+        for stage in ("imports", "embedding_model", "llm_client", "knowledge_base"):
+            progress(stage)
+        self.warmed_up = False
+
+    def warmup(self):
+        self.warmed_up = True
+
+
+def test_loads_in_background_and_reports_stage_timings():
+    loader = EngineLoader(FakeEngine)
+    assert loader.status()["state"] == "not started"
+
+    engine = loader.get(timeout=5)
+    status = loader.status()
+
+    assert engine.warmed_up
+    assert status["state"] == "ready"
+    assert status["progress"] == "5/5"
+    assert list(status["timings"]) == list(EngineLoader.STAGES)
+    assert asyncio.run(loader.aget()) is engine
+
+
+def test_failed_load_is_reported_and_raises():
+    def broken(progress):
+        progress("imports")
+        raise ValueError("❌ GEMINI_API_KEY not found in .env")
+
+    loader = EngineLoader(broken)
+    with pytest.raises(EngineUnavailable, match="GEMINI_API_KEY"):
+        loader.get(timeout=5)
+
+    status = loader.status()
+    assert status["state"] == "failed"
+    assert status["progress"] == "0/5"
+    assert "ValueError" in status["error"]
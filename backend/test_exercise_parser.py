@@ -0,0 +1,53 @@
+# backend/test_exercise_parser.py
+
+import pytest
+
+from app.exercise_names import tokenize
+from app.exercise_parser import ExerciseMatcher, extract_exercises
+
+CATALOG = ["Deadlift", "Romanian Deadlift", "Inverted Row", "Row", "Push-Ups", "Farmer’s Carry",
+           "Calf Raises", "1. Serve Accuracy Drill (Tennis)"]
+
+
+@pytest.fixture
+def matcher():
+    return ExerciseMatcher.from_catalog(CATALOG, {"RDL": "Romanian Deadlift", "Sled Push": "Sled Push"})
+
+
+def test_matches_respect_word_boundaries(matcher):
+    assert matcher.extract("Throw the ball, then grow your arrows") == []
+    assert matcher.extract("Row 3x10, then throw") == ["Row"]
+
+
+def test_hyphens_plurals_apostrophes_and_numbering_are_folded(matcher):
+    text = "pushup, push ups, Push-Up; farmers carry; calf raise; serve accuracy drills"
+    assert matcher.extract(text) == ["Push-Ups", "Farmer’s Carry", "Calf Raises", "1. Serve Accuracy Drill (Tennis)"]
+
+
+def test_aliases_map_to_catalog_names_only(matcher):
+    assert matcher.extract("RDLs then a sled push") == ["Romanian Deadlift"]
+
+
+def test_longest_match_wins_over_contained_names(matcher):
+    assert matcher.extract("Romanian deadlifts and inverted rows") == ["Romanian Deadlift", "Inverted Row"]
+    assert matcher.extract("Deadlift, then Romanian deadlift") == ["Deadlift", "Romanian Deadlift"]
+
+
+def test_ranking_is_deterministic(matcher):
+    text = "Row. Deadlift. Push-ups. Deadlift. Push-ups. Deadlift."
+    assert matcher.extract(text) == ["Row", "Deadlift", "Push-Ups"]
+    assert matcher.extract(text, rank="frequency") == ["Deadlift", "Push-Ups", "Row"]
+    assert matcher.extract(text, limit=2) == ["Row", "Deadlift"]
+    with pytest.raises(ValueError):
+        matcher.extract(text, rank="random")
+
+
+def test_tokenize_folds_plurals():
+    assert tokenize("Lunges, crunches & glutes-bridges") == ["lunge", "crunch", "glute", "bridge"]
+    assert tokenize("Press / Pull-Ups / Abs") == ["press", "pull", "up", "ab"]
+
+
+def test_real_catalog_keeps_mention_order():
+    text = "Start with squats, then bench press and pull-ups. Finish with a plank."
+    assert extract_exercises(text) == ["Squat", "Bench Press", "Pull-Ups", "Plank"]
+    assert extract_exercises(text) == extract_exercises(text)
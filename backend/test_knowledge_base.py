@@ -0,0 +1,209 @@
+# backend/test_knowledge_base.py
+
+import os
+
+import numpy as np
+
+from app import knowledge_base
+from app.embedding_backends import embedding_model_id, load_embedding_model
+from app.knowledge_base import (
+    ScopedSearcher, build_index, chunk_corpus, chunk_id, configure_search, load_or_build_knowledge_base,
+    retrieval_scope, store_fingerprint
+)
+
+CORPUS = """### SPORT: Cricket
+Fact 1: Cricket players require endurance, agility and explosive strength.
+Fact 2: Strength training should focus on squats, lunges and rotational power.
+
+### INJURY: Shoulder Strain (Common in bowlers and fielders)
+Fact 1: Overuse of the rotator cuff leads to shoulder strain.
+Fact 2: Safe exercises: band pull-aparts, face pulls and scapular push-ups.
+
+### INJURY: Lower Back Pain (Common in fast bowlers and batsmen)
+Fact 1: Repetitive spinal rotation during bowling causes lumbar strain.
+Fact 2: Substitute heavy deadlifts with glute bridges and bird-dogs.
+
+Sport: Basketball
+### 1️⃣ CORE SPORT OVERVIEW
+Fact 1: Basketball demands repeated jumps, sprints and lateral cuts.
+
+### INJURY: Ankle Sprain
+Fact 1: Landing on another player's foot rolls the ankle outward.
+"""
+
+
+class CountingEncoder:
+    """Deterministic stand-in for SentenceTransformer that counts encoded texts"""
+
+    def __init__(self, dim=16):
+        self.dim = dim
+        self.encoded = 0
+
+    def encode(self, texts, convert_to_numpy=True, show_progress_bar=False):
+        self.encoded += len(texts)
+        rows = [np.random.default_rng(chunk_id(text) % (2 ** 32)).random(self.dim) for text in texts]
+        return np.array(rows, dtype=np.float32)
+
+
+def build(tmp_path, text, encoder, model="model-a", force_new=False, index_spec="flat"):
+    (tmp_path / "expert_knowledge.txt").write_text(text, encoding="utf-8")
+    return load_or_build_knowledge_base(tmp_path, encoder, model, force_new=force_new, index_spec=index_spec)
+
+
+def test_chunks_carry_sport_and_section_metadata():
+    chunks = chunk_corpus(CORPUS)
+
+    shoulder = next(chunk for chunk in chunks if "rotator cuff" in chunk["text"])
+    assert shoulder["sport"] == "Cricket"
+    assert shoulder["kind"] == "injury"
+    assert shoulder["text"].startswith("Cricket — Injury: Shoulder Strain")
+
+    overview = next(chunk for chunk in chunks if "lateral cuts" in chunk["text"])
+    assert (overview["sport"], overview["kind"]) == ("Basketball", "sport")
+    assert overview["section"] == "CORE SPORT OVERVIEW"
+
+
+def test_scoped_search_only_returns_athlete_sport_and_matching_injuries(tmp_path, make_profile):
+    store = build(tmp_path, CORPUS, CountingEncoder())
+    searcher = ScopedSearcher(store)
+    scope = retrieval_scope(make_profile(sport="Basketball", injuries=["Lower back pain"]))
+    assert scope == ("basketball", ("back", "lower"))
+
+    _, ids = searcher.search(store["embeddings"], store["index"].ntotal, scope)
+    found = {store["chunk_meta"][cid]["section"] for cid in ids.ravel().tolist() if cid >= 0}
+    assert found == {"CORE SPORT OVERVIEW", "Ankle Sprain", "Lower Back Pain"}
+
+    # Sports missing from the corpus search everything
+    _, ids = searcher.search(store["embeddings"], 3, retrieval_scope(make_profile(sport="Rowing")))
+    assert (ids >= 0).all()
+
+
+def test_unchanged_corpus_is_not_re_embedded(tmp_path):
+    encoder = CountingEncoder()
+    store = build(tmp_path, CORPUS, encoder)
+    assert encoder.encoded == len(chunk_corpus(CORPUS)) == store["index"].ntotal
+
+    build(tmp_path, CORPUS, encoder)
+    assert encoder.encoded == len(chunk_corpus(CORPUS))
+
+
+def test_editing_one_section_re_embeds_only_that_section(tmp_path):
+    encoder = CountingEncoder()
+    build(tmp_path, CORPUS, encoder)
+    before = encoder.encoded
+
+    edited = CORPUS.replace("Fact 2: Safe exercises", "Fact 2: Recommended exercises")
+    store = build(tmp_path, edited, encoder)
+
+    assert encoder.encoded - before == 1
+    assert store["index"].ntotal == len(chunk_corpus(edited))
+    assert sorted(store["chunks"]) == sorted(chunk_id(chunk["text"]) for chunk in chunk_corpus(edited))
+
+
+def test_saved_store_reloads_memory_mapped(tmp_path):
+    (tmp_path / "vector_meta.pkl").write_bytes(b"legacy pickle")
+    built = build(tmp_path, CORPUS, CountingEncoder())
+    assert not (tmp_path / "vector_meta.pkl").exists()
+
+    loaded = build(tmp_path, CORPUS, CountingEncoder())
+    assert isinstance(loaded["embeddings"], np.memmap)
+    assert dict(loaded["chunks"]) == dict(built["chunks"])
+    assert loaded["chunk_meta"] == built["chunk_meta"]
+    np.testing.assert_array_equal(loaded["embeddings"], built["embeddings"])
+    assert (loaded["index"].search(built["embeddings"], 1)[1].ravel() == built["ids"]).all()
+
+
+def test_deleted_section_vectors_are_removed(tmp_path):
+    encoder = CountingEncoder()
+    build(tmp_path, CORPUS, encoder)
+    before = encoder.encoded
+
+    trimmed = CORPUS.split("### INJURY: Lower Back Pain")[0]
+    store = build(tmp_path, trimmed, encoder)
+
+    assert encoder.encoded == before
+    assert store["index"].ntotal == len(chunk_corpus(trimmed))
+    _, ids = store["index"].search(store["embeddings"][:1], store["index"].ntotal)
+    assert set(ids[0].tolist()) == set(store["chunks"])
+
+
+def test_model_change_or_corrupt_index_triggers_full_rebuild(tmp_path):
+    encoder = CountingEncoder()
+    build(tmp_path, CORPUS, encoder)
+    total = len(chunk_corpus(CORPUS))
+
+    build(tmp_path, CORPUS, encoder, model="model-b")
+    assert encoder.encoded == 2 * total
+
+    (tmp_path / "faiss_index.bin").write_bytes(b"corrupted")
+    store = build(tmp_path, CORPUS, encoder, model="model-b")
+    assert encoder.encoded == 3 * total
+    assert store["index"].ntotal == total
+
+
+def test_unchanged_store_files_are_not_re_hashed(tmp_path, monkeypatch):
+    build(tmp_path, CORPUS, CountingEncoder())
+    hashed = []
+    real_sha256 = knowledge_base.file_sha256
+    monkeypatch.setattr(knowledge_base, "file_sha256", lambda path: hashed.append(path.name) or real_sha256(path))
+
+    build(tmp_path, CORPUS, CountingEncoder())
+    assert hashed == ["expert_knowledge.txt"]  # the store files matched on size + mtime
+
+    os.utime(tmp_path / "faiss_index.bin", ns=(1, 1))  # same bytes, new mtime: hashed once, then trusted
+    hashed.clear()
+    build(tmp_path, CORPUS, CountingEncoder())
+    assert hashed == ["faiss_index.bin", "expert_knowledge.txt"]
+    hashed.clear()
+    build(tmp_path, CORPUS, CountingEncoder())
+    assert hashed == ["expert_knowledge.txt"]
+
+
+def test_store_fingerprint_follows_the_chunks(tmp_path):
+    for name in "abc":
+        (tmp_path / name).mkdir()
+    store = build(tmp_path / "a", CORPUS, CountingEncoder())
+    same = build(tmp_path / "b", CORPUS, CountingEncoder(dim=8), model="model-b")
+    edited = build(tmp_path / "c", CORPUS.replace("Safe exercises", "Recommended exercises"), CountingEncoder())
+
+    assert store_fingerprint(store) == store_fingerprint(same)  # same chunk ids, whatever the vectors
+    assert store_fingerprint(store) != store_fingerprint(edited)
+    assert store_fingerprint(None) == 0
+
+def test_index_type_change_reuses_saved_embeddings(tmp_path):
+    encoder = CountingEncoder()
+    build(tmp_path, CORPUS, encoder)
+    total = len(chunk_corpus(CORPUS))
+
+    store = build(tmp_path, CORPUS, encoder, index_spec="hnsw")
+    assert encoder.encoded == total
+    assert store["index_spec"] == "hnsw"
+    assert build(tmp_path, CORPUS, encoder, index_spec="hnsw")["index"].ntotal == total
+
+    # ANN indexes are retrained on corpus edits; only the edited chunk is embedded
+    edited = CORPUS.replace("Fact 2: Safe exercises", "Fact 2: Recommended exercises")
+    store = build(tmp_path, edited, encoder, index_spec="hnsw")
+    assert encoder.encoded == total + 1
+    _, ids = store["index"].search(store["embeddings"], 1)
+    assert ids.ravel().tolist() == store["ids"].tolist()
+
+
+def test_hashed_backend_builds_a_searchable_store_offline(tmp_path):
+    model = load_embedding_model(backend="hashed")
+    store = build(tmp_path, CORPUS, model, model=embedding_model_id(backend="hashed"))
+
+    query = model.encode(["rotator cuff overuse"], convert_to_numpy=True)
+    _, ids = store["index"].search(query, 1)
+    assert "rotator cuff" in store["chunks"][int(ids[0, 0])]
+    np.testing.assert_array_equal(model.encode(["rotator cuff overuse"]), query)  # deterministic
+
+def test_ann_presets_find_exact_neighbours():
+    rng = np.random.default_rng(0)
+    vectors = rng.random((2000, 32), dtype=np.float32)
+    ids = np.arange(len(vectors), dtype=np.int64) * 3
+
+    for spec, knobs in (("hnsw", {"ef_search": 64}), ("ivf-flat", {"nprobe": 64}), ("IVF16,SQ8", {"nprobe": 16})):
+        index = build_index(vectors, ids, spec)
+        configure_search(index, **knobs)
+        _, found = index.search(vectors[:50], 1)
+        assert (found.ravel() == ids[:50]).mean() >= 0.9, spec
@@ -0,0 +1,113 @@
+# backend/test_lexical_index.py
+
+import numpy as np
+
+from app import config
+from app.knowledge_base import load_or_build_knowledge_base
+from app.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+CORPUS = """### SPORT: Cricket
+### INJURY: Shoulder Strain (Common in bowlers)
+Fact 1: Rotator cuff strains in fast bowlers need external rotation band work.
+Fact 2: Bowlers should limit overs after a layoff.
+
+### TRAINING
+Fact 3: Cricket batting drills improve hand-eye coordination.
+
+### SPORT: Football
+### INJURY: ACL Tear
+Fact 1: ACL rehab starts with quad sets and progresses to single-leg landing drills.
+
+### TRAINING
+Fact 2: Football conditioning uses repeated sprint intervals.
+"""
+
+
+class CountingEncoder:
+    """Constant embeddings that count encode() calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts, convert_to_numpy=True, show_progress_bar=False):
+        self.calls += 1
+        rows = np.ones((len(texts), 8), dtype=np.float32)
+        return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def build_store(tmp_path):
+    (tmp_path / "expert_knowledge.txt").write_text(CORPUS, encoding="utf-8")
+    encoder = CountingEncoder()
+    return load_or_build_knowledge_base(tmp_path, encoder, "counting"), encoder
+
+
+def chunk_with(store, word):
+    return next(cid for cid, text in store["chunks"].items() if word in text)
+
+
+def test_tokenize_drops_stopwords_and_plurals():
+    assert tokenize("How should the bowlers train their Rotator Cuff?") == ["bowler", "train", "rotator", "cuff"]
+    assert tokenize("ACL") == ["acl"]
+    assert tokenize("fitness") == ["fitness"]
+
+
+def test_bm25_ranks_the_exact_match_first(tmp_path):
+    store, _ = build_store(tmp_path)
+    index = BM25Index.from_store(store)
+
+    hits = index.search("ACL rehab", 3)
+    assert hits.ids[0] == chunk_with(store, "ACL rehab")
+    assert list(hits.scores) == sorted(hits.scores, reverse=True)
+    assert hits.coverage == 1.0
+    assert index.search("rotator cuff bowlers", 3).ids[0] == chunk_with(store, "Rotator cuff")
+
+
+def test_bm25_confidence_and_unknown_terms(tmp_path):
+    store, _ = build_store(tmp_path)
+    index = BM25Index.from_store(store)
+
+    assert index.search("ACL rehab", 3).confident(0.8, 1.0)
+    vague = index.search("ACL tendinopathy plyometrics", 3)  # two terms the corpus doesn't have
+    assert vague.coverage < 0.5 and not vague.confident(0.8, 1.0)
+    assert len(index.search("zzz", 3).ids) == 0
+
+
+def test_bm25_respects_allowed_ids(tmp_path):
+    store, _ = build_store(tmp_path)
+    index = BM25Index.from_store(store)
+    football = np.array([cid for cid, meta in store["chunk_meta"].items() if meta["sport"] == "Football"])
+
+    hits = index.search("drills", 5, allowed_ids=football)
+    assert len(hits.ids) > 0 and set(hits.ids.tolist()) <= set(football.tolist())
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([[1, 2, 3, -1], [3, 1, 4]], k=60)
+    assert fused.tolist()[:2] == [1, 3]  # in both lists near the top
+    assert set(fused.tolist()) == {1, 2, 3, 4}
+
+
+def test_fast_mode_skips_the_embedding_only_when_confident(tmp_path, monkeypatch, make_engine):
+    store, encoder = build_store(tmp_path)
+    engine = make_engine(embedding_model=encoder, data_dir=tmp_path)
+    monkeypatch.setattr(config, "RETRIEVAL_MODE", "fast")
+    monkeypatch.setattr(config, "LEXICAL_MIN_SCORE", 1.0)
+    calls = encoder.calls
+
+    query_emb, ids = engine._embed_and_search("ACL rehab")
+    assert query_emb is None and encoder.calls == calls
+    assert ids[0] == chunk_with(store, "ACL rehab")
+
+    query_emb, ids = engine._embed_and_search("how do I recover from tendinopathy")
+    assert query_emb is not None and encoder.calls == calls + 1
+
+
+def test_hybrid_mode_fuses_lexical_hits_into_vector_results(tmp_path, monkeypatch, make_engine):
+    store, encoder = build_store(tmp_path)
+    engine = make_engine(embedding_model=encoder, data_dir=tmp_path)
+    monkeypatch.setattr(config, "RETRIEVAL_MODE", "hybrid")
+
+    query_emb, ids = engine._embed_and_search("ACL rehab", top_k=2)
+    assert query_emb is not None
+    assert len(ids) == 2 and chunk_with(store, "ACL rehab") in ids.tolist()  # constant vectors can't rank it
+
@@ -0,0 +1,195 @@
+# backend/test_llm_providers.py
+
+import asyncio
+import time
+
+import pytest
+
+from app import config
+from app.llm import CallPolicy, PromptLLM
+from app.llm_providers import LLMProvider, StubProvider, StubUnavailable, make_provider
+from app.prompts import PromptPrefix
+
+
+class ScriptedProvider(LLMProvider):
+    """Each call takes the next scripted latency (seconds) or raises the scripted error"""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+
+    async def agenerate(self, contents, timeout=None, max_output_tokens=None):
+        step = self.script[self.calls]
+        self.calls += 1
+        if isinstance(step, Exception):
+            raise step
+        await asyncio.sleep(step)
+        return f"answer {self.calls}"
+
+    def generate(self, contents, timeout=None, max_output_tokens=None):
+        step = self.script[self.calls]
+        self.calls += 1
+        if isinstance(step, Exception):
+            raise step
+        return f"answer {self.calls}"
+
+    async def astream(self, contents, timeout=None, max_output_tokens=None):
+        raise AssertionError("not scripted")
+
+
+def policy(**overrides):
+    settings = dict(timeout_s=1.0, max_retries=2, backoff_ms=1, max_backoff_ms=1,
+                    hedge=False, hedge_delay_ms=0, hedge_min_samples=20, seed=0)
+    settings.update(overrides)
+    return CallPolicy(**settings)
+
+
+def acall(call_policy, provider):
+    return asyncio.run(call_policy.acall(lambda timeout: provider.agenerate("prompt", timeout),
+                                         provider.is_transient))
+
+
+def test_stub_is_deterministic_for_a_seed():
+    def latencies(seed):
+        stub = StubProvider(latency_ms=100, sigma=0.5, slow_rate=0.2, seed=seed)
+        return [stub._draw()[0] for _ in range(50)]
+
+    assert latencies(1) == latencies(1)
+    assert latencies(1) != latencies(2)
+    assert max(latencies(1)) > 5 * min(latencies(1))  # the slow tail shows up
+
+
+def test_stub_generates_and_streams_its_text():
+    stub = StubProvider(latency_ms=10, distribution="fixed", text="line one\nline two\n")
+
+    assert stub.generate("prompt").text == "line one\nline two\n"
+
+    async def collect():
+        return [chunk.text async for chunk in await stub.astream("prompt")]
+
+    assert asyncio.run(collect()) == ["line one\n", "line two\n"]
+
+
+def test_stub_respects_the_deadline():
+    stub = StubProvider(latency_ms=1000, distribution="fixed")
+    start = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        asyncio.run(stub.agenerate("prompt", timeout=0.05))
+    assert time.perf_counter() - start < 0.5
+
+
+def test_make_provider_stub_needs_no_api_key(monkeypatch):
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    assert make_provider("stub").name == "stub"
+    with pytest.raises(ValueError):
+        make_provider("nope")
+
+
+def test_transient_failures_are_retried():
+    provider = ScriptedProvider([StubUnavailable("down"), 0.0])
+    call_policy = policy()
+
+    assert acall(call_policy, provider) == "answer 2"
+    assert call_policy.stats()["retries"] == 1
+
+
+def test_deadline_retries_then_gives_up():
+    provider = ScriptedProvider([1.0, 1.0])
+    call_policy = policy(timeout_s=0.05, max_retries=1)
+
+    with pytest.raises(TimeoutError):
+        acall(call_policy, provider)
+    stats = call_policy.stats()
+    assert stats["attempts"] == 2 and stats["timeouts"] == 2 and stats["failures"] == 1
+
+
+def test_non_transient_errors_are_not_retried():
+    provider = ScriptedProvider([ValueError("bad request"), 0.0])
+    call_policy = policy()
+
+    with pytest.raises(ValueError):
+        call_policy.call(lambda timeout: provider.generate("prompt", timeout), provider.is_transient)
+    assert provider.calls == 1
+
+
+def test_hedge_fires_after_the_delay_and_fastest_wins():
+    provider = ScriptedProvider([1.0, 0.01])  # the first attempt is a slow one
+    call_policy = policy(hedge=True, hedge_delay_ms=50)
+
+    start = time.perf_counter()
+    assert acall(call_policy, provider) == "answer 2"
+    assert time.perf_counter() - start < 0.5
+    stats = call_policy.stats()
+    assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+
+
+def test_hedge_delay_tracks_p95_once_calibrated():
+    call_policy = policy(hedge=True, hedge_min_samples=20)
+    assert call_policy.hedge_delay() is None
+
+    for i in range(100):
+        call_policy._observe((i + 1) / 1000)
+    assert call_policy.hedge_delay() == pytest.approx(0.095, abs=0.001)
+
+
+def test_prompt_llm_runs_through_the_policy():
+    provider = StubProvider(latency_ms=5, distribution="fixed", failure_rate=0.0)
+    llm = PromptLLM(provider, policy=policy())
+
+    assert asyncio.run(llm.agenerate(PromptPrefix("system"), "question")) == StubProvider.DEFAULT_TEXT
+    stats = llm.stats()
+    assert stats["provider"] == "stub" and stats["calls"]["attempts"] == 1
+
+
+def test_stub_output_cap_cuts_text_and_decode_time():
+    stub = StubProvider(latency_ms=10, distribution="fixed", text="x" * 4000, ms_per_token=1.0)
+
+    capped_start = time.perf_counter()
+    capped = stub.generate("prompt", max_output_tokens=50)
+    capped_time = time.perf_counter() - capped_start
+    full_start = time.perf_counter()
+    full = stub.generate("prompt")
+    full_time = time.perf_counter() - full_start
+
+    assert len(capped.text) == 200 and len(full.text) == 4000
+    assert capped_time < 0.2 < full_time  # 10 ms + 50 tokens vs 10 ms + 1000 tokens
+
+
+def test_quick_tips_use_their_own_tier(monkeypatch, make_engine):
+    in_depth = StubProvider(latency_ms=1, distribution="fixed", text="plan " * 400)
+    quick = StubProvider(latency_ms=1, distribution="fixed", text="plan " * 400)
+    monkeypatch.setattr(config, "QUICK_TIP_MAX_OUTPUT_TOKENS", 20)
+    engine = make_engine(in_depth, quick_llm=quick)
+
+    tip = engine.get_ai_response("Best warm-up before sprints?", "quick-tip")
+    plan = engine.get_ai_response("Build me a 12-week plan", "in-depth")
+
+    assert (quick.calls, in_depth.calls) == (1, 1)
+    assert len(tip) == 80 and len(plan) == 2000
+    assert "QUICK TIP MODE" in engine.prompt_prefixes.get("quick-tip").text
+    assert "IN-DEPTH PLAN MODE" in engine.prompt_prefixes.get("in-depth").text
+
+
+def test_quick_tips_retrieve_their_own_top_k(tmp_path, monkeypatch, make_engine):
+    facts = "\n\n".join(f"### TRAINING\nFact {n}: ACL rehab drill number {n}." for n in range(1, 5))
+    (tmp_path / "expert_knowledge.txt").write_text(f"### SPORT: Football\n{facts}\n", encoding="utf-8")
+    engine = make_engine(data_dir=tmp_path)  # no context assembly
+    monkeypatch.setattr(config, "RETRIEVAL_MODE", "vector")
+    monkeypatch.setattr(config, "RETRIEVAL_TOP_K_QUICK_TIP", 1)
+    monkeypatch.setattr(config, "RETRIEVAL_TOP_K_IN_DEPTH", 3)
+
+    assert len(engine._embed_and_search("ACL rehab", mode="quick-tip")[1]) == 1
+    assert len(engine._embed_and_search("ACL rehab", mode="in-depth")[1]) == 3
+    assert engine._retrieve_context("ACL rehab", mode="quick-tip").count("\n\n") == 0
+
+
+def test_incomplete_provider_fails_when_built():
+    class NoStreaming(LLMProvider):
+        def generate(self, contents, timeout=None, max_output_tokens=None):
+            return "answer"
+
+        async def agenerate(self, contents, timeout=None, max_output_tokens=None):
+            return "answer"
+
+    with pytest.raises(TypeError, match="astream"):
+        NoStreaming()
@@ -0,0 +1,153 @@
+# backend/test_metrics.py
+
+import logging
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app import config, main
+from app.metrics import REGISTRY, stage, track_request
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_stages_are_timed_into_the_request_trace():
+    before = sample("coach_stage_duration_seconds_count", stage="retrieval", mode="quick-tip")
+
+    with track_request("chat", "quick-tip") as trace:
+        with stage("retrieval"):
+            time.sleep(0.01)
+        with stage("generation"):
+            pass
+        with stage("retrieval"):
+            pass
+
+    assert list(trace.breakdown()) == ["retrieval", "generation"]
+    assert trace.breakdown()["retrieval"] >= 10
+    assert sample("coach_stage_duration_seconds_count", stage="retrieval", mode="quick-tip") == before + 2
+    assert sample("coach_requests_in_flight", endpoint="chat") == 0
+
+
+def test_stages_outside_a_request_use_their_own_mode():
+    before = sample("coach_stage_duration_seconds_count", stage="embedding", mode="batch")
+    with stage("embedding", "batch"):
+        pass
+    assert sample("coach_stage_duration_seconds_count", stage="embedding", mode="batch") == before + 1
+
+
+def test_errors_are_counted_by_status_and_mode():
+    before = sample("coach_errors_total", endpoint="chat", mode="in-depth", error="503")
+
+    with pytest.raises(HTTPException):
+        with track_request("chat", "in-depth"):
+            raise HTTPException(status_code=503, detail="engine loading")
+
+    assert sample("coach_errors_total", endpoint="chat", mode="in-depth", error="503") == before + 1
+
+
+def test_slow_requests_log_their_stage_breakdown(monkeypatch, caplog):
+    monkeypatch.setattr(config, "SLOW_REQUEST_MS", 5.0)
+
+    with caplog.at_level(logging.WARNING, logger="app.metrics"):
+        with track_request("chat", "in-depth"):
+            with stage("generation"):
+                time.sleep(0.01)
+        with track_request("chat", "in-depth"):
+            pass
+
+    slow = [record.getMessage() for record in caplog.records]
+    assert len(slow) == 1 and "generation" in slow[0] and "other" in slow[0]
+
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(config, "METRICS_ENABLED", False)
+    before = sample("coach_stage_duration_seconds_count", stage="retrieval", mode="in-depth")
+
+    with track_request("chat", "in-depth") as trace:
+        with stage("retrieval"):
+            pass
+
+    assert trace is None
+    assert sample("coach_stage_duration_seconds_count", stage="retrieval", mode="in-depth") == before
+    assert TestClient(main.app).get("/metrics").status_code == 404
+
+
+class NoProfiles:
+    def get_profile(self, user_id):
+        return None
+
+    def cache_stats(self):
+        return {"hit_rate": 0.25}
+
+
+def test_metrics_endpoint_exposes_chat_stages(monkeypatch):
+    async def answer(text, mode, user_profile, profile_key, scope):
+        with stage("generation"):
+            return "Start with Back Squat 3x5, then Plank 3x30s."
+
+    monkeypatch.setattr(main, "aget_ai_response", answer)
+    monkeypatch.setattr(main, "profile_service", NoProfiles())
+    client = TestClient(main.app)
+
+    reply = client.post("/api/chat", json={"text": "Leg day?", "user_id": "metrics_test", "mode": "quick-tip"})
+    assert reply.status_code == 200
+
+    scrape = client.get("/metrics")
+    assert scrape.headers["content-type"].startswith("text/plain")
+    for line in (
+        'coach_request_duration_seconds_count{endpoint="chat",mode="quick-tip"}',
+        'coach_stage_duration_seconds_count{mode="quick-tip",stage="profile_load"}',
+        'coach_stage_duration_seconds_count{mode="quick-tip",stage="generation"}',
+        'coach_stage_duration_seconds_count{mode="quick-tip",stage="extraction"}',
+        'coach_stage_duration_seconds_count{mode="quick-tip",stage="youtube"}',
+        'coach_cache_hit_ratio{cache="profile"} 0.25',
+    ):
+        assert line in scrape.text
+
+
+def test_both_chat_endpoints_label_profile_load_by_mode(monkeypatch):
+    async def stream(text, mode, user_profile, profile_key, scope):
+        yield "Try Plank 3x30s."
+
+    async def ready():
+        pass
+
+    monkeypatch.setattr(main, "astream_ai_response", stream)
+    monkeypatch.setattr(main, "wait_for_engine", ready)
+    monkeypatch.setattr(main, "profile_service", NoProfiles())
+    client = TestClient(main.app)
+    before = sample("coach_stage_duration_seconds_count", stage="profile_load", mode="in-depth")
+
+    reply = client.post("/api/chat/stream", json={"text": "Core?", "user_id": "metrics_test", "mode": "in-depth"})
+    assert reply.status_code == 200 and "event: done" in reply.text
+    assert sample("coach_stage_duration_seconds_count", stage="profile_load", mode="in-depth") == before + 1
+
+
+def test_stream_latency_includes_the_profile_load(monkeypatch, caplog):
+    class SlowProfiles(NoProfiles):
+        def get_profile(self, user_id):
+            time.sleep(0.02)
+
+    async def stream(text, mode, user_profile, profile_key, scope):
+        yield "Try Plank 3x30s."
+
+    async def ready():
+        pass
+
+    monkeypatch.setattr(main, "astream_ai_response", stream)
+    monkeypatch.setattr(main, "wait_for_engine", ready)
+    monkeypatch.setattr(main, "profile_service", SlowProfiles())
+    monkeypatch.setattr(config, "SLOW_REQUEST_MS", 10.0)
+
+    with caplog.at_level(logging.WARNING, logger="app.metrics"):
+        reply = TestClient(main.app).post(
+            "/api/chat/stream", json={"text": "Core?", "user_id": "metrics_test", "mode": "quick-tip"}
+        )
+
+    assert reply.status_code == 200
+    slow = [record.getMessage() for record in caplog.records]
+    assert len(slow) == 1 and "chat_stream" in slow[0] and "profile_load" in slow[0]
@@ -0,0 +1,146 @@
+# backend/test_profile_service.py
+
+import json
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import config, main
+from app.profile_service import UserProfileService
+from app.profile_store import JsonDirStore, SqliteStore, migrate_json_to_sqlite
+
+
+def test_saved_profile_is_served_from_cache(tmp_path, make_profile):
+    service = UserProfileService(tmp_path)
+    profile = make_profile()
+    assert service.save_profile(profile)
+
+    assert service.get_profile("athlete1") is profile  # write-through
+    assert service.get_profile("athlete1") is profile
+    assert service.get_profile("missing") is None
+    stats = service.cache_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 0, 1)
+
+
+def test_out_of_band_edit_invalidates(tmp_path, make_profile):
+    service = UserProfileService(tmp_path)
+    service.save_profile(make_profile())
+    path = tmp_path / "athlete1.json"
+    stat = path.stat()
+
+    data = json.loads(path.read_text())
+    data["sport"] = "rugby"
+    path.write_text(json.dumps(data, indent=2))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert service.get_profile("athlete1").sport == "rugby"
+    assert service.cache_stats()["invalidations"] == 1
+    assert service.get_profile("athlete1").sport == "rugby"
+    assert service.cache_stats()["hits"] == 1
+
+    path.unlink()
+    assert service.get_profile("athlete1") is None
+    assert service.cache_stats()["entries"] == 0
+
+
+def test_cache_is_bounded_lru(tmp_path, make_profile):
+    service = UserProfileService(tmp_path, cache_size=2)
+    for user_id in ("a", "b", "c"):
+        service.save_profile(make_profile(user_id))
+    service.get_profile("a")  # evicted: read from disk again
+
+    stats = service.cache_stats()
+    assert (stats["entries"], stats["evictions"], stats["misses"]) == (2, 2, 1)
+    assert service.get_profile("c").user_id == "c"
+    assert service.cache_stats()["hits"] == 1
+
+
+def test_cache_disabled(tmp_path, make_profile):
+    service = UserProfileService(tmp_path, cache_size=0)
+    service.save_profile(make_profile())
+    assert service.get_profile("athlete1") == make_profile()
+    assert service.cache_stats()["entries"] == 0
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "json":
+        yield JsonDirStore(tmp_path / "profiles")
+    else:
+        store = SqliteStore(tmp_path / "profiles.db", pool_size=2)
+        yield store
+        store.close()
+
+
+def test_backends_save_get_and_query(store, make_profile):
+    service = UserProfileService(store=store)
+    service.save_profile(make_profile("a", sport="Cricket", injuries=["Left knee pain"]))
+    service.save_profile(make_profile("b", sport="cricket", injuries=["lower back strain", "knee"]))
+    service.save_profile(make_profile("c", sport="soccer", injuries=["knee"]))
+    service.save_profile(make_profile("d", sport="cricket"))
+    service.save_profile(make_profile("b", sport="cricket", injuries=["lower back strain"]))  # update
+
+    assert service.get_profile("b").injuries == ["lower back strain"]
+    assert service.profile_exists("a") and not service.profile_exists("zz")
+    assert [p.user_id for p in service.query_profiles(sport="cricket", injury="knee injury")] == ["a"]
+    assert [p.user_id for p in service.query_profiles(sport="cricket")] == ["a", "b", "d"]
+    assert [p.user_id for p in service.query_profiles(injury="knee")] == ["a", "c"]
+    assert [p.user_id for p in service.query_profiles(sport="Football")] == ["c"]  # soccer alias
+    assert service.query_profiles(sport="cricket", injury="back knee") == []
+    assert [p.user_id for p in service.query_profiles(sport="cricket", limit=1, offset=1)] == ["b"]
+
+
+def test_sqlite_cache_sees_writes_from_other_services(tmp_path, make_profile):
+    store = SqliteStore(tmp_path / "profiles.db")
+    reader, writer = UserProfileService(store=store), UserProfileService(store=SqliteStore(tmp_path / "profiles.db"))
+    writer.save_profile(make_profile(sport="football"))
+    assert reader.get_profile("athlete1").sport == "football"
+    writer.save_profile(make_profile(sport="rugby"))
+    assert reader.get_profile("athlete1").sport == "rugby"
+    assert reader.cache_stats()["invalidations"] == 1
+
+
+def test_migrate_json_profiles_to_sqlite(tmp_path, make_profile):
+    source = UserProfileService(tmp_path / "profiles")
+    for user_id in ("a", "b"):
+        source.save_profile(make_profile(user_id, injuries=["ankle sprain"]))
+    (tmp_path / "profiles" / "broken.json").write_text('{"user_id": "broken"}')
+
+    imported, skipped = migrate_json_to_sqlite(tmp_path / "profiles", tmp_path / "profiles.db")
+
+    assert imported == 2
+    assert len(skipped) == 1 and skipped[0].startswith("broken.json")
+    migrated = UserProfileService(store=SqliteStore(tmp_path / "profiles.db"))
+    assert migrated.get_profile("a") == source.get_profile("a")
+    assert [p.user_id for p in migrated.query_profiles(injury="ankle")] == ["a", "b"]
+
+
+def test_json_saves_keep_file_permissions(tmp_path, make_profile):
+    store = JsonDirStore(tmp_path / "profiles")
+    path = tmp_path / "profiles" / "athlete1.json"
+    plain = tmp_path / "plain.json"
+    plain.write_text("{}")
+
+    store.save("athlete1", make_profile().model_dump())
+    assert path.stat().st_mode & 0o777 == plain.stat().st_mode & 0o777  # like a file written with open()
+
+    os.chmod(path, 0o640)
+    store.save("athlete1", make_profile(sport="rugby").model_dump())
+    assert path.stat().st_mode & 0o777 == 0o640
+    assert [p.name for p in path.parent.iterdir()] == ["athlete1.json"]
+
+
+def test_profiles_endpoint_returns_capped_pages(tmp_path, monkeypatch, make_profile):
+    service = UserProfileService(store=SqliteStore(tmp_path / "profiles.db"))
+    for n in range(5):
+        service.save_profile(make_profile(f"a{n}", sport="cricket"))
+    monkeypatch.setattr(main, "profile_service", service)
+    client = TestClient(main.app)
+
+    first = client.get("/api/profiles", params={"limit": 2}).json()
+    assert [p["user_id"] for p in first["profiles"]] == ["a0", "a1"] and first["next_offset"] == 2
+    last = client.get("/api/profiles", params={"sport": "cricket", "limit": 2, "offset": 4}).json()
+    assert [p["user_id"] for p in last["profiles"]] == ["a4"] and last["next_offset"] is None
+    assert client.get("/api/profiles").json()["limit"] == config.PROFILE_QUERY_LIMIT
+    assert client.get("/api/profiles", params={"limit": config.PROFILE_QUERY_MAX_LIMIT + 1}).status_code == 422
@@ -0,0 +1,107 @@
+# backend/test_prompt_cache.py
+
+from app.llm import LocalContextCache, PromptLLM
+from app.llm_providers import LLMProvider
+from app.prompts import PromptPrefix, PromptPrefixCache, build_prompt, prompt_suffix
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeProvider(LLMProvider):
+    """Records the contents it was called with"""
+
+    def __init__(self, name="base"):
+        self.name = name
+        self.calls = []
+
+    def generate(self, contents, timeout=None, max_output_tokens=None):
+        self.calls.append(contents)
+        return FakeResponse(f"{self.name} answer")
+
+    async def agenerate(self, contents, timeout=None, max_output_tokens=None):
+        self.calls.append(contents)
+        return FakeResponse(f"{self.name} answer")
+
+    async def astream(self, contents, timeout=None, max_output_tokens=None):
+        response = await self.agenerate(contents, timeout, max_output_tokens)
+
+        async def chunks():
+            yield response
+        return chunks()
+
+
+def test_prefix_rendered_once_per_profile_version(make_profile):
+    prefixes = PromptPrefixCache()
+    profile = make_profile()
+
+    first = prefixes.get("in-depth", profile)
+    assert prefixes.get("in-depth", make_profile()) is first  # equal profile, same version
+    assert prefixes.get("quick-tip", profile) is not first
+    assert prefixes.stats()["hits"] == 1
+
+    teammate = make_profile("athlete2", name="Jane", age=27, weight_kg=62, height_cm=168, gender="female")
+    assert prefixes.get("in-depth", teammate) is first  # same training needs, same prefix
+    assert "John" not in first.text and "75" not in first.text
+
+    updated = prefixes.get("in-depth", make_profile(sessions_per_week=3))
+    assert updated is not first and "Sessions/Week: 3" in updated.text
+    assert prefixes.stats()["misses"] == 3
+
+
+def test_prefix_plus_suffix_is_the_full_prompt(make_profile):
+    profile = make_profile(injuries=["knee"])
+    prefix = PromptPrefixCache().get("in-depth", profile)
+
+    prompt = prefix.text + prompt_suffix("Plan my week", "KB")
+    assert prompt == build_prompt("Plan my week", "in-depth", "KB", profile)
+    assert prompt.index("ATHLETE PROFILE") < prompt.index("Relevant Knowledge") < prompt.index("Plan my week")
+
+
+def test_local_context_cache_records_would_be_hits():
+    cache = LocalContextCache(ttl_seconds=3600)
+    prefix = PromptPrefix("system + profile " * 50)
+
+    assert cache.lookup(prefix) == False
+    assert cache.lookup(prefix) == True
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_local_context_cache_expiry_and_minimum_size():
+    expired = LocalContextCache(ttl_seconds=0)
+    prefix = PromptPrefix("x" * 400)
+    expired.lookup(prefix)
+    assert expired.lookup(prefix) == False
+
+    small = LocalContextCache(min_tokens=1000)
+    small.lookup(prefix)
+    assert small.lookup(prefix) == False
+    assert small.stats()["too_small"] == 2 and small.stats()["entries"] == 0
+
+
+def test_prompt_llm_reports_tokens_saved_with_local_cache():
+    provider = FakeProvider()
+    llm = PromptLLM(provider, LocalContextCache(), prefill_ms_per_1k_tokens=100.0)
+    prefix = PromptPrefix("p" * 4000)  # 1000 tokens
+
+    for question in ("one", "two", "three", "four"):
+        assert llm.generate(prefix, prompt_suffix(question)) == "base answer"
+
+    assert all(call.startswith(prefix.text) for call in provider.calls)  # stand-in sends everything
+    stats = llm.stats()
+    assert stats["requests"] == 4
+    assert stats["cached_input_tokens"] == 3000
+    assert stats["input_tokens_saved_per_request"] == 750.0
+    assert stats["est_latency_saved_ms_per_request"] == 75.0
+
+
+def test_prompt_llm_without_cache_sends_whole_prompt():
+    provider = FakeProvider()
+    llm = PromptLLM(provider)
+    prefix = PromptPrefix("system")
+
+    llm.generate(prefix, "suffix")
+    assert provider.calls == ["systemsuffix"]
+    assert llm.stats()["context_cache"] == "off"
@@ -0,0 +1,99 @@
+# backend/test_response_cache.py
+
+import time
+
+import numpy as np
+
+from app.response_cache import ResponseCache, profile_fingerprint
+
+
+def test_exact_hit_ignores_case_and_whitespace():
+    cache = ResponseCache()
+    cache.put("4-week fat loss plan", "in-depth", "p1", "PLAN")
+
+    assert cache.get("  4-Week   FAT loss plan ", "in-depth", "p1") == "PLAN"
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_scoped_by_mode_and_profile():
+    cache = ResponseCache()
+    vector = np.ones(4)
+    cache.put("fat loss plan", "in-depth", "p1", "PLAN", vector)
+
+    assert cache.get("fat loss plan", "quick-tip", "p1", vector) is None
+    assert cache.get("fat loss plan", "in-depth", "p2", vector) is None
+    assert cache.stats()["misses"] == 2
+
+
+def test_semantic_hit_above_threshold_only():
+    cache = ResponseCache(similarity_threshold=0.9)
+    cache.put("fat loss plan for beginners", "in-depth", "p1", "PLAN", np.array([1.0, 0.0, 0.0]))
+
+    close = np.array([0.95, 0.05, 0.0])
+    far = np.array([0.5, 0.5, 0.5])
+    assert cache.get("beginner fat loss program", "in-depth", "p1", close) == "PLAN"
+    assert cache.get("marathon taper", "in-depth", "p1", far) is None
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_lru_and_ttl_eviction():
+    cache = ResponseCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", "in-depth", "p", "A")
+    cache.put("b", "in-depth", "p", "B")
+    cache.get("a", "in-depth", "p")        # a is now most recently used
+    cache.put("c", "in-depth", "p", "C")   # evicts b
+
+    assert cache.get("b", "in-depth", "p") is None
+    assert cache.get("a", "in-depth", "p") == "A"
+
+    cache._entries[("in-depth", "p", "a")]["created_at"] = time.time() - 120
+    assert cache.get("a", "in-depth", "p") is None
+
+
+def test_semantic_slots_are_reused_after_eviction():
+    cache = ResponseCache(max_entries=2, similarity_threshold=0.9)
+    cache.put("a", "in-depth", "p1", "A", np.array([1.0, 0.0, 0.0]))
+    cache.put("b", "in-depth", "p1", "B", np.array([0.0, 1.0, 0.0]))
+    cache.put("c", "in-depth", "p2", "C", np.array([0.0, 0.0, 1.0]))  # evicts a, takes its slot
+
+    assert cache._vectors.shape == (2, 3)
+    assert cache.get("like a", "in-depth", "p1", np.array([1.0, 0.0, 0.0])) is None
+    assert cache.get("like c", "in-depth", "p1", np.array([0.0, 0.0, 1.0])) is None  # other profile
+    assert cache.get("like c", "in-depth", "p2", np.array([0.0, 0.1, 1.0])) == "C"
+    assert cache.get("like b", "in-depth", "p1", np.array([0.0, 1.0, 0.1])) == "B"
+
+
+def test_persistence_round_trip(tmp_path):
+    path = tmp_path / "response_cache.json"
+    cache = ResponseCache(persist_path=path)
+    cache.put("fat loss plan", "in-depth", "p1", "PLAN", np.array([1.0, 0.0]))
+    cache.save()
+
+    reloaded = ResponseCache(persist_path=path)
+    assert reloaded.get("fat loss plan", "in-depth", "p1") == "PLAN"
+    assert reloaded.get("other wording", "in-depth", "p1", np.array([1.0, 0.01])) == "PLAN"
+
+
+def test_profile_fingerprint_covers_the_training_fields_only(make_profile):
+    base = make_profile()
+
+    assert profile_fingerprint(base) == profile_fingerprint(make_profile())
+    for change in ({"sport": "rugby"}, {"goals": ["endurance"]}, {"duration_weeks": 4}, {"sessions_per_week": 3},
+                   {"available_equipment": ["barbell"]}, {"injuries": ["shoulder"]}, {"age": 45},
+                   {"experience_years": 1}):
+        assert profile_fingerprint(base) != profile_fingerprint(make_profile(**change))
+    for personal in ({"name": "Jane"}, {"age": 30}, {"weight_kg": 80}, {"height_cm": 170}, {"gender": "female"},
+                     {"experience_years": 4}):
+        assert profile_fingerprint(base) == profile_fingerprint(make_profile(**personal))
+    assert profile_fingerprint(None) == "no-profile"
+
+
+def test_answers_are_shared_between_athletes_with_the_same_training_needs(make_profile):
+    cache = ResponseCache(similarity_threshold=0.9)
+    john = make_profile("athlete1")
+    jane = make_profile("athlete2", name="Jane", age=28, weight_kg=61, gender="female")
+    cache.put("4-week fat loss plan", "in-depth", profile_fingerprint(john), "PLAN", np.array([1.0, 0.0]))
+
+    assert cache.get("4-week fat loss plan", "in-depth", profile_fingerprint(jane)) == "PLAN"
+    assert cache.get("fat loss plan, 4 weeks", "in-depth", profile_fingerprint(jane), np.array([1.0, 0.05])) == "PLAN"
+    assert cache.get("4-week fat loss plan", "in-depth", profile_fingerprint(make_profile(injuries=["knee"]))) is None
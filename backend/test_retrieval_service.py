@@ -0,0 +1,160 @@
+# backend/test_retrieval_service.py
+
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from app import config
+from app.embedding_batcher import RetrievalBatcher, encode_and_search
+from app.knowledge_base import store_fingerprint
+from app.retrieval_service import (
+    PROTOCOL_VERSION, RetrievalClient, RetrievalServer, SidecarError, decode_request, decode_result, encode_request,
+    encode_result
+)
+
+DIM = 8
+STORE = 0x5EED
+
+
+def fake_encode(texts):
+    return np.array([[len(text) + column for column in range(DIM)] for text in texts], dtype=np.float32)
+
+
+def fake_search(matrix, k, scope=None):
+    """ids 100 * row-length + rank, 1000 more when scoped"""
+    base = (matrix[:, :1].astype(np.int64) * 100) + (1000 if scope else 0)
+    return None, base + np.arange(k)
+
+
+class Sidecar:
+    """RetrievalServer on its own event loop thread, over a socket in tmp_path"""
+
+    def __init__(self, path, store_id=STORE):
+        batcher = RetrievalBatcher(encode=fake_encode, search=fake_search, max_batch_size=8, max_wait_ms=1)
+        self.server = RetrievalServer(str(path), batcher, DIM, 42, "test-model", store_id)
+        self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(self.server.start())
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    async def _shutdown(self):
+        self.server.close()
+        await asyncio.sleep(0)  # let connection handlers finish
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return tmp_path / "retrieval.sock"
+
+
+def test_request_and_result_round_trip():
+    queries = ["Squat form?", "Knie-Schmerzen beim Laufen"]
+    scopes = [None, ("football", ("ankle", "knee"))]
+    assert decode_request(encode_request(queries, [3, 5], scopes)) == (queries, [3, 5], scopes)
+
+    matrix = fake_encode(queries)
+    indices = [np.array([4, 1, 7]), np.array([2, 9, -1, 3, 5])]
+    decoded_matrix, decoded_ids = decode_result(encode_result(matrix, indices), [3, 5])
+    assert np.array_equal(decoded_matrix, matrix)
+    assert [ids.tolist() for ids in decoded_ids] == [[4, 1, 7], [2, 9, -1, 3, 5]]
+
+    _, no_ids = decode_result(encode_result(matrix, [None, None]), [3, 5])
+    assert no_ids == [None, None]
+
+
+def test_sidecar_matches_in_process_retrieval(socket_path):
+    sidecar = Sidecar(socket_path)
+    client = RetrievalClient(str(socket_path), pool_size=2, expected_model="test-model", expected_store=STORE)
+    try:
+        assert client.check_health()
+        assert client.info == {"version": PROTOCOL_VERSION, "dim": DIM, "chunks": 42, "store": STORE,
+                               "model": "test-model"}
+
+        queries, top_ks, scopes = ["a", "bb", "ccc"], [2, 3, 1], [None, ("rowing", ()), None]
+        matrix, indices = client.retrieve(queries, top_ks, scopes)
+        local_matrix, local_indices = encode_and_search(fake_encode, fake_search, queries, top_ks, scopes)
+
+        assert np.array_equal(matrix, local_matrix)
+        assert [ids.tolist() for ids in indices] == [ids.tolist() for ids in local_indices]
+        assert client.stats()["calls"] == 1 and client.server_stats()["queries"] == 3
+    finally:
+        client.close()
+        sidecar.stop()
+
+
+def test_falls_back_while_the_sidecar_is_down(socket_path):
+    local_calls = []
+
+    def fallback(queries, top_ks, scopes):
+        local_calls.append(queries)
+        return encode_and_search(fake_encode, fake_search, queries, top_ks, scopes)
+
+    client = RetrievalClient(str(socket_path), timeout=0.5, fallback=fallback)
+    try:
+        assert not client.check_health()
+        client.retrieve(["before"], [2], [None])
+        assert local_calls == [["before"]]
+
+        sidecar = Sidecar(socket_path)
+        assert client.check_health()
+        client.retrieve(["up"], [2], [None])
+        assert len(local_calls) == 1 and client.calls == 1
+
+        sidecar.stop()
+        client.retrieve(["after"], [2], [None])  # fails over mid-call
+        assert local_calls[-1] == ["after"] and not client.healthy
+        assert client.stats()["failures"] == 1 and client.stats()["fallbacks"] == 2
+    finally:
+        client.close()
+
+
+def test_no_fallback_raises(socket_path):
+    client = RetrievalClient(str(socket_path), timeout=0.5)
+    with pytest.raises(SidecarError):
+        client.retrieve(["query"], [3], [None])
+
+
+def test_incompatible_sidecar_is_unhealthy(socket_path):
+    sidecar = Sidecar(socket_path)
+    client = RetrievalClient(str(socket_path), expected_model="another-model")
+    try:
+        assert not client.check_health()
+    finally:
+        client.close()
+        sidecar.stop()
+
+
+def test_sidecar_with_another_knowledge_base_is_unhealthy(socket_path):
+    sidecar = Sidecar(socket_path, store_id=STORE + 1)  # expert_knowledge.txt rebuilt on one side only
+    local_calls = []
+
+    def fallback(queries, top_ks, scopes):
+        local_calls.append(queries)
+        return encode_and_search(fake_encode, fake_search, queries, top_ks, scopes)
+
+    client = RetrievalClient(str(socket_path), fallback=fallback, expected_model="test-model", expected_store=STORE)
+    try:
+        assert not client.check_health()
+        client.retrieve(["query"], [3], [None])
+        assert local_calls == [["query"]] and client.calls == 0
+    finally:
+        client.close()
+        sidecar.stop()
+
+
+def test_engine_expects_the_sidecar_to_serve_its_own_store(tmp_path, socket_path, monkeypatch, make_engine):
+    (tmp_path / "expert_knowledge.txt").write_text("### SPORT: Rowing\nFact 1: Row long and easy.\n", encoding="utf-8")
+    monkeypatch.setattr(config, "RETRIEVAL_SIDECAR", str(socket_path))
+    engine = make_engine(data_dir=tmp_path)
+    try:
+        assert engine.sidecar.expected_store == store_fingerprint(engine.vector_store) != 0
+    finally:
+        engine.sidecar.close()
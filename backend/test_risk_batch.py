@@ -0,0 +1,55 @@
+# backend/test_risk_batch.py
+
+import itertools
+
+from app.risk_module import RiskAssessmentEngine
+from app.youtube_db import get_all_exercises
+
+PROFILES = [
+    {'injuries': [], 'goal': 'strength'},
+    {'injuries': None, 'goal': None},
+    {'goal': 'Build muscle mass'},
+    {'injuries': ['lower back pain'], 'goal': 'fat loss'},
+    {'injuries': ['Knee injury', 'hip and back stiffness'], 'goal': 'Cardio endurance'},
+    {'injuries': ['shoulder impingement', 'wrist sprain', 'ankle'], 'goal': 'lean and strong'},
+    {'injuries': ['knee', 'knee'], 'goal': 'general'},
+    {'injuries': ['tennis elbow'], 'goal': 'hypertrophy'},
+]
+
+EXTRA_EXERCISES = ["Front Squat Clean", "Box Jump Burpee", "Dumbbell Press", "Neck Exercise", "", "HIIT Rowing"]
+
+
+def test_batch_matches_scalar_assessment_on_catalog():
+    exercises = get_all_exercises() + EXTRA_EXERCISES
+    batch = RiskAssessmentEngine.assess_batch(exercises, PROFILES)
+
+    assert batch.risk.shape == batch.effectiveness.shape == (len(exercises), len(PROFILES))
+    for (i, exercise), (j, profile) in itertools.product(enumerate(exercises), enumerate(PROFILES)):
+        expected = RiskAssessmentEngine.assess_exercise(exercise, profile)
+        assert batch.assessment(i, j) == expected
+        assert (batch.risk[i, j], batch.effectiveness[i, j]) == (expected['risk'], expected['effectiveness'])
+
+
+def test_for_profile_and_empty_batches():
+    batch = RiskAssessmentEngine.assess_batch(["Squat", "Plank"], [{}])
+    assert batch.for_profile(0) == [RiskAssessmentEngine.assess_exercise(name, {}) for name in ("Squat", "Plank")]
+
+    assert RiskAssessmentEngine.assess_batch([], PROFILES).risk.shape == (0, len(PROFILES))
+    assert RiskAssessmentEngine.assess_batch(["Squat"], []).effectiveness.shape == (1, 0)
+
+
+def test_chat_enrichment_scores_match_scalar_assessment(make_profile):
+    from app import main
+
+    profile = make_profile(injuries=["lower back pain", "knee"], goals=["fat loss"])
+    answer = "Warm up, then Back Squat 3x5, Deadlift 3x5, Plank 3x30s and Box Jump 3x8."
+    risk_scores, _ = main.build_enrichment(answer, profile)
+
+    expected = [
+        RiskAssessmentEngine.assess_exercise(name, {'injuries': profile.injuries, 'goal': 'fat loss'})
+        for name in main.extract_exercises(answer)
+    ]
+    assert len(risk_scores) == len(expected) > 0
+    assert [(item.exercise, item.risk, item.effectiveness) for item in risk_scores] == [
+        (item['exercise'], item['risk'], item['effectiveness']) for item in expected
+    ]
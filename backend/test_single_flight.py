@@ -0,0 +1,161 @@
+# backend/test_single_flight.py
+
+import asyncio
+
+import httpx
+
+from app import ai_engine, main
+from app.llm_providers import StubProvider
+from app.profile_service import UserProfileService
+from app.response_cache import profile_fingerprint
+from app.single_flight import FlightAborted, SingleFlight
+
+N = 20
+
+
+def test_identical_concurrent_chats_call_the_llm_once(make_engine, make_profile):
+    stub = StubProvider(latency_ms=100, distribution="fixed")
+    engine = make_engine(stub)
+    questions = ["Plan my week", "plan my  week", "  PLAN my week"] * N
+    team = [make_profile(f"athlete{n}", name=f"Athlete {n}", weight_kg=60 + n) for n in range(N)]
+
+    async def burst():
+        return await asyncio.gather(*(
+            engine.aget_ai_response(question, "in-depth", athlete, profile_fingerprint(athlete))
+            for question, athlete in zip(questions, team)
+        ))
+
+    answers = asyncio.run(burst())
+
+    assert stub.calls == 1
+    assert answers == [StubProvider.DEFAULT_TEXT] * N
+    stats = engine.in_flight.stats()
+    assert stats["leaders"] == 1 and stats["calls_saved"] == N - 1 and stats["in_flight"] == 0
+
+
+def test_different_mode_or_profile_is_not_coalesced(make_engine):
+    stub = StubProvider(latency_ms=50, distribution="fixed")
+    engine = make_engine(stub)
+
+    async def burst():
+        await asyncio.gather(
+            engine.aget_ai_response("Plan my week", "in-depth", None, "profile-a"),
+            engine.aget_ai_response("Plan my week", "in-depth", None, "profile-b"),
+            engine.aget_ai_response("Plan my week", "quick-tip", None, "profile-a"),
+            engine.aget_ai_response("Plan my week", "in-depth", None, None),  # opted out
+        )
+
+    asyncio.run(burst())
+    assert stub.calls == 4
+
+
+def test_identical_concurrent_streams_share_one_generation(make_engine):
+    stub = StubProvider(latency_ms=100, distribution="fixed")
+    engine = make_engine(stub)
+
+    async def collect():
+        return "".join([text async for text in engine.astream_ai_response("Plan my week", "in-depth", None, "p")])
+
+    async def burst():
+        first = asyncio.ensure_future(collect())
+        await asyncio.sleep(0.05)  # later streams join mid-generation and replay what they missed
+        return list(await asyncio.gather(first, *(collect() for _ in range(N - 1))))
+
+    assert asyncio.run(burst()) == [StubProvider.DEFAULT_TEXT] * N
+    assert stub.calls == 1
+
+
+def test_cancelled_leader_does_not_fail_followers():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(scenario()) == "done"
+    assert calls == [1]
+
+
+def test_errors_reach_every_waiter_and_the_next_call_retries():
+    flight = SingleFlight()
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    async def scenario():
+        results = await asyncio.gather(*(flight.do("key", failing) for _ in range(3)), return_exceptions=True)
+        assert len(calls) == 1
+        retry = await asyncio.gather(flight.do("key", failing), return_exceptions=True)
+        return results + retry
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(calls) == 2  # a failed flight is not cached
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_cancelled_stream_fails_its_followers_instead_of_ending_them():
+    flight = SingleFlight()
+
+    async def work():
+        yield "Week 1\n"
+        await asyncio.sleep(10)
+        yield "Week 2\n"
+
+    async def scenario():
+        received = []
+
+        async def follow():
+            async for chunk in flight.stream("key", work):
+                received.append(chunk)
+
+        followers = [asyncio.ensure_future(follow()) for _ in range(2)]
+        while len(received) < 2:
+            await asyncio.sleep(0.001)
+        (pump,) = flight._pumps  # held until it finishes
+        pump.cancel()
+        results = await asyncio.gather(*followers, return_exceptions=True)
+        return received, results
+
+    received, results = asyncio.run(scenario())
+    assert received == ["Week 1\n"] * 2
+    assert all(isinstance(result, FlightAborted) for result in results)
+    assert flight.stats()["in_flight"] == 0 and not flight._pumps
+
+
+def test_teammates_share_one_flight_through_the_chat_endpoint(tmp_path, monkeypatch, make_engine, make_profile):
+    stub = StubProvider(latency_ms=200, distribution="fixed")
+    engine = make_engine(stub)
+    monkeypatch.setattr(ai_engine, "engine_loader", ai_engine.EngineLoader(factory=lambda progress: engine))
+    profiles = UserProfileService(tmp_path / "profiles")
+    profiles.save_profile(make_profile("ann", name="Ann", age=24, weight_kg=61, gender="female"))
+    profiles.save_profile(make_profile("bo", name="Bo", age=29, weight_kg=88))
+    monkeypatch.setattr(main, "profile_service", profiles)
+
+    async def burst():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(
+                client.post("/api/chat", json={"text": "Plan my week", "user_id": user_id, "mode": "in-depth"})
+                for user_id in ("ann", "bo")
+            ))
+
+    replies = asyncio.run(burst())
+
+    assert [reply.status_code for reply in replies] == [200, 200]
+    assert stub.calls == 1
+    assert engine.in_flight.stats()["calls_saved"] == 1
+    assert replies[0].json()["response_text"] == replies[1].json()["response_text"]
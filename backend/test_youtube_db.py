@@ -0,0 +1,50 @@
+# backend/test_youtube_db.py
+
+from app.youtube_db import YouTubeLinksDB
+
+CATALOG = """# Strength
+Pull-Ups ||| https://yt/pull-ups
+Wide Grip Pull-Ups ||| https://yt/wide-grip
+Bench Press ||| https://yt/bench
+Incline Bench Press ||| https://yt/incline
+Farmer’s Carry ||| https://yt/carry
+3. Serve Accuracy Drill (Tennis) ||| https://yt/serve
+ ||| https://yt/continuation-line-without-a-name
+Headers Without Links
+"""
+
+
+def make_db(tmp_path, memo_size=2048):
+    path = tmp_path / "exercise.txt"
+    path.write_text(CATALOG, encoding="utf-8")
+    return YouTubeLinksDB(path, memo_size=memo_size)
+
+
+def test_exact_and_folded_names(tmp_path):
+    db = make_db(tmp_path)
+    assert db.get_links("Bench Press") == ["https://yt/bench"]
+    for spelling in ("pull up", "pullups", "PULL-UP", "Pull Ups"):
+        assert db.get_links(spelling) == ["https://yt/pull-ups"]
+    assert db.get_links("farmers carries") == ["https://yt/carry"]
+    assert db.get_links("serve accuracy drills") == ["https://yt/serve"]
+
+
+def test_best_match_prefers_closest_name(tmp_path):
+    db = make_db(tmp_path)
+    assert db.get_links("wide grip pull-up") == ["https://yt/wide-grip"]
+    assert db.get_links("close grip incline bench press") == ["https://yt/incline"]
+    assert db.get_links("bench") == ["https://yt/bench"]  # ties go to the earlier, closer entry
+
+
+def test_misses_and_partial_overlap(tmp_path):
+    db = make_db(tmp_path)
+    assert db.get_links("xyzzy") == []  # not the nameless continuation line
+    assert db.get_links("") == []
+    assert db.get_links("bench pull") == []  # shares words with both, contained in neither
+
+
+def test_memo_is_bounded(tmp_path):
+    db = make_db(tmp_path, memo_size=2)
+    for query in ("pull up", "bench", "xyzzy", "pull up"):
+        db.get_links(query)
+    assert list(db._memo) == [("xyzzy",), ("pull", "up")]
@@ -316,14 +316,7 @@ Ready to generate your personalized training program?`;
         completeProfile.injuries.length > 0 ? `Important - avoid exercises that aggravate: ${completeProfile.injuries.join(', ')}` : ''
       } Include specific exercises, drills, duration and frequency of workouts tailored to ${completeProfile.sport}.`;
 
-      const response = await chatAPI.sendQuery(query, userId, "in-depth");
-
-      setMessages(prev => [...prev, {
-        from: "bot",
-        text: response.response_text,
-        riskScores: response.risk_scores,
-        youtubeLinks: response.youtube_links
-      }]);
+      await streamBotReply(query, "in-depth");
 
       setChatStage(CHAT_STAGES.CHAT);
       setMode("in-depth");
@@ -334,6 +327,33 @@ Ready to generate your personalized training program?`;
     }
   };
 
+  // Streams the answer into one bot message, then attaches risk/YouTube data
+  const streamBotReply = async (query, chatMode) => {
+    let started = false;
+    const updateLast = (fields) =>
+      setMessages(prev => [...prev.slice(0, -1), { ...prev[prev.length - 1], ...fields }]);
+
+    const response = await chatAPI.streamQuery(query, userId, chatMode, (_, textSoFar) => {
+      if (!started) {
+        started = true;
+        setMessages(prev => [...prev, { from: "bot", text: textSoFar }]);
+      } else {
+        updateLast({ text: textSoFar });
+      }
+    });
+
+    const final = {
+      text: response.response_text,
+      riskScores: response.risk_scores,
+      youtubeLinks: response.youtube_links,
+    };
+    if (started) {
+      updateLast(final);
+    } else {
+      setMessages(prev => [...prev, { from: "bot", ...final }]);
+    }
+  };
+
   const handleRegularChat = async () => {
     if (!input.trim() || !connected) return;
 
@@ -342,14 +362,7 @@ Ready to generate your personalized training program?`;
     setLoading(true);
 
     try {
-      const response = await chatAPI.sendQuery(input, userId, mode);
-
-      setMessages(prev => [...prev, {
-        from: "bot",
-        text: response.response_text,
-        riskScores: response.risk_scores,
-        youtubeLinks: response.youtube_links,
-      }]);
+      await streamBotReply(input, mode);
     } catch (error) {
       setMessages(prev => [...prev, {
         from: "bot",
@@ -36,6 +36,68 @@ export const chatAPI = {
     }
   },
 
+  // Stream query via SSE: onChunk(text) fires as Gemini generates,
+  // resolves with the final { response_text, risk_scores, youtube_links }
+  streamQuery: async (text, userId, mode, onChunk) => {
+    console.log('📤 Streaming query:', { text, userId, mode });
+
+    const response = await fetch(`${API_BASE}/api/chat/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        text: text,
+        user_id: userId,
+        mode: mode || 'in-depth'
+      })
+    });
+
+    if (!response.ok || !response.body) {
+      const error = await response.json().catch(() => ({}));
+      throw new Error(error.detail || `Stream failed (${response.status})`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let responseText = '';
+    let result = null;
+
+    while (result === null) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // SSE frames are separated by a blank line
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const frame = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+
+        const event = frame.match(/^event: (.*)$/m)?.[1];
+        const data = JSON.parse(frame.match(/^data: (.*)$/m)?.[1] || '{}');
+
+        if (event === 'chunk') {
+          responseText += data.text;
+          onChunk?.(data.text, responseText);
+        } else if (event === 'done') {
+          result = {
+            response_text: responseText,
+            risk_scores: data.risk_scores || [],
+            youtube_links: data.youtube_links || []
+          };
+        } else if (event === 'error') {
+          throw new Error(data.detail || 'Failed to get response from Coach Carter');
+        }
+      }
+    }
+
+    if (result === null) {
+      throw new Error('Stream ended before the response was complete');
+    }
+    console.log('📥 Stream complete:', result);
+    return result;
+  },
+
   // Health check
   healthCheck: async () => {
     try {